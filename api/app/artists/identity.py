@@ -0,0 +1,35 @@
+from typing import Dict, Iterable, Optional
+
+from app.database import supabase
+
+BATCH_SIZE = 500
+
+
+def normalize_artist_name(name: str) -> str:
+    """Python mirror of the SQL normalize_artist_key(): lowercase, spaces trimmed."""
+    return (name or "").strip(" ").lower()
+
+
+def get_artist_keys(names: Iterable[str]) -> Dict[str, int]:
+    """
+    Resolve artist names to their integer artist_key via artist_name_variants.
+
+    Returns {normalized name: artist_key}; names with no identity yet are omitted.
+    """
+    norms = sorted({normalize_artist_name(n) for n in names if n})
+    keys: Dict[str, int] = {}
+    for i in range(0, len(norms), BATCH_SIZE):
+        batch = norms[i:i + BATCH_SIZE]
+        result = (
+            supabase.table("artist_name_variants")
+            .select("name_norm, artist_key")
+            .in_("name_norm", batch)
+            .execute()
+        )
+        for row in result.data or []:
+            keys[row["name_norm"]] = row["artist_key"]
+    return keys
+
+
+def get_artist_key(name: str) -> Optional[int]:
+    return get_artist_keys([name]).get(normalize_artist_name(name))
@@ -8,6 +8,7 @@ class ArtistOut(BaseModel):
     id: Optional[str] = None
     spotify_artist_id: str
     artist_name: str
+    artist_key: Optional[int] = None
     artist_image_url: Optional[str] = None
     genres: Optional[List[str]] = None
     popularity: Optional[int] = None
@@ -3,7 +3,9 @@ from typing import List, Optional
 
 import spotipy
 
-from app.database import supabase
+from app import cache
+from app.artists.identity import get_artist_keys, normalize_artist_name
+from app.database import rpc, scan, supabase
 
 TIME_RANGES = {"short_term", "medium_term", "long_term"}
 
@@ -38,10 +40,11 @@ def sync_top_artists(sp: spotipy.Spotify, user_id: str, time_range: str) -> List
         })
 
     supabase.table("top_artists").delete().eq("user_id", user_id).eq("time_range", time_range).execute()
+    inserted: List[dict] = []
     if rows:
-        result = supabase.table("top_artists").insert(rows).execute()
-        return result.data or []
-    return []
+        inserted = supabase.table("top_artists").insert(rows).execute().data or []
+    cache.bump([cache.DATA_TOP], user_id)
+    return inserted
 
 
 def get_top_artists(user_id: str, time_range: str) -> List[dict]:
@@ -62,18 +65,26 @@ def get_top_artists(user_id: str, time_range: str) -> List[dict]:
         return artists
 
     try:
+        # Rows synced before the artist_identities migration have no artist_key yet
+        missing = [a["artist_name"] for a in artists if not a.get("artist_key")]
+        if missing:
+            keys = get_artist_keys(missing)
+            for artist in artists:
+                if not artist.get("artist_key"):
+                    artist["artist_key"] = keys.get(normalize_artist_name(artist["artist_name"]))
+
         if time_range == "long_term":
-            history_result = supabase.rpc("history_top_artists", {
+            history_rows = rpc("history_top_artists", {
                 "p_user_id": str(user_id),
                 "p_limit": 50,
-            }).execute()
-            history_by_name = {
-                row["artist_name"].lower(): row
-                for row in (history_result.data or [])
+            })
+            history_by_key = {
+                row["artist_key"]: row
+                for row in (history_rows or [])
             }
 
             for artist in artists:
-                hist = history_by_name.get(artist["artist_name"].lower())
+                hist = history_by_key.get(artist.get("artist_key"))
                 if hist:
                     artist["total_plays"] = hist["plays"]
                     artist["total_minutes"] = round(hist["total_ms"] / 60000)
@@ -92,30 +103,23 @@ def get_top_artists(user_id: str, time_range: str) -> List[dict]:
 
         else:
             cutoff = _get_date_cutoff(time_range)
-            artist_names = [a["artist_name"] for a in artists]
-
-            sh_query = (
-                supabase.table("streaming_history")
-                .select("artist_name, ms_played")
-                .eq("user_id", user_id)
-                .in_("artist_name", artist_names)
-                .limit(100000)
-            )
-            if cutoff:
-                sh_query = sh_query.gte("played_at", cutoff.isoformat())
-            sh_result = sh_query.execute()
+            artist_keys = [a["artist_key"] for a in artists if a.get("artist_key")]
+
+            def where(query):
+                query = query.eq("user_id", user_id).in_("artist_key", artist_keys)
+                return query.gte("played_at", cutoff.isoformat()) if cutoff else query
 
             artist_stats: dict = {}
-            for row in sh_result.data or []:
-                name = (row["artist_name"] or "").lower()
-                if name not in artist_stats:
-                    artist_stats[name] = {"plays": 0, "ms": 0}
-                artist_stats[name]["plays"] += 1
-                artist_stats[name]["ms"] += row["ms_played"]
+            for row in scan("streaming_history", "artist_key, ms_played", where=where):
+                key = row["artist_key"]
+                if key not in artist_stats:
+                    artist_stats[key] = {"plays": 0, "ms": 0}
+                artist_stats[key]["plays"] += 1
+                artist_stats[key]["ms"] += row["ms_played"]
 
             enriched = 0
             for artist in artists:
-                stats = artist_stats.get(artist["artist_name"].lower())
+                stats = artist_stats.get(artist.get("artist_key"))
                 if stats and stats["plays"] > 0:
                     artist["total_plays"] = stats["plays"]
                     artist["total_minutes"] = round(stats["ms"] / 60000)
@@ -4,6 +4,7 @@ import spotipy
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.responses import RedirectResponse
 
+from app import metrics
 from app.auth.session import create_session_token, get_current_user
 from app.auth.spotify import get_oauth_handler
 from app.config import settings
@@ -37,7 +38,7 @@ async def callback(code: str):
     except Exception:
         raise HTTPException(status_code=400, detail="Failed to exchange authorization code")
 
-    sp = spotipy.Spotify(auth=token_info["access_token"])
+    sp = spotipy.Spotify(auth=token_info["access_token"], requests_session=metrics.spotify_session())
     profile = sp.current_user()
 
     spotify_id = profile["id"]
@@ -1,6 +1,7 @@
 from datetime import datetime, timedelta, timezone
+from typing import Optional
 
-from fastapi import Depends, HTTPException
+from fastapi import Depends, HTTPException, Request
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from jose import JWTError, jwt
 
@@ -10,6 +11,14 @@ from app.database import supabase
 ALGORITHM = "HS256"
 TOKEN_EXPIRE_HOURS = 24 * 7  # 7 days
 
+# Admin-only request profiling (app/profiling.py)
+PROFILE_HEADER = "x-profile"
+PROFILE_USER_HEADER = "x-profile-user"
+# request.state flags: set by ProfilingMiddleware once the profiler is running,
+# and by get_current_user when the request runs as another user
+PROFILING_STATE = "profiling"
+PROFILED_AS_STATE = "profiled_as"
+
 bearer_scheme = HTTPBearer()
 
 
@@ -51,13 +60,26 @@ def decode_session_token(token: str) -> dict:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
 
 
+def is_admin(spotify_id: Optional[str]) -> bool:
+    """Whether the Spotify account is listed in ADMIN_SPOTIFY_IDS."""
+    admins = {s.strip() for s in settings.admin_spotify_ids.split(",") if s.strip()}
+    return bool(spotify_id) and spotify_id in admins
+
+
 async def get_current_user(
+    request: Request,
     credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
 ) -> dict:
     """
     FastAPI dependency that verifies the Bearer JWT and returns the user row.
 
+    An admin profiling a GET request may send X-Profile-User with another
+    user's Spotify ID to run it as that user — only while ProfilingMiddleware
+    is actually profiling it. Routes check is_profiled_as() to skip side
+    effects such as background pool rebuilds for such requests.
+
     Args:
+        request: The incoming request.
         credentials: Bearer token extracted from the Authorization header.
 
     Returns:
@@ -69,14 +91,26 @@ async def get_current_user(
     payload = decode_session_token(credentials.credentials)
     user_id = payload.get("user_id")
 
-    result = (
-        supabase.table("users")
-        .select("*")
-        .eq("id", user_id)
-        .maybe_single()
-        .execute()
-    )
+    query = supabase.table("users").select("*")
+    profile_as = request.headers.get(PROFILE_USER_HEADER)
+    if (
+        profile_as
+        and request.method == "GET"
+        and getattr(request.state, PROFILING_STATE, False)
+        and is_admin(payload.get("sub"))
+    ):
+        setattr(request.state, PROFILED_AS_STATE, profile_as)
+        query = query.eq("spotify_id", profile_as)
+    else:
+        query = query.eq("id", user_id)
+
+    result = query.maybe_single().execute()
     if not result.data:
         raise HTTPException(status_code=401, detail="User not found")
 
     return result.data
+
+
+def is_profiled_as(request: Request) -> bool:
+    """Whether an admin is profiling this request as another user."""
+    return bool(getattr(request.state, PROFILED_AS_STATE, None))
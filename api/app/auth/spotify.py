@@ -4,6 +4,7 @@ import spotipy
 from spotipy.cache_handler import MemoryCacheHandler
 from spotipy.oauth2 import SpotifyOAuth
 
+from app import metrics
 from app.config import settings
 from app.database import supabase
 
@@ -19,6 +20,7 @@ def get_oauth_handler() -> SpotifyOAuth:
         scope=SCOPES,
         cache_handler=MemoryCacheHandler(),
         open_browser=False,
+        requests_session=metrics.spotify_session(),
     )
 
 
@@ -57,4 +59,4 @@ def get_spotify_client_for_user(user: dict) -> spotipy.Spotify:
 
     supabase.table("users").update(update_data).eq("id", user["id"]).execute()
 
-    return spotipy.Spotify(auth=token_info["access_token"])
+    return spotipy.Spotify(auth=token_info["access_token"], requests_session=metrics.spotify_session())
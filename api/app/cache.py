@@ -0,0 +1,410 @@
+import contextlib
+import functools
+import hashlib
+import inspect
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Iterable, List, Optional
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Thread-safe in-process LRU cache with a per-entry time-to-live.
+
+    Entries expire `ttl` seconds after they are written; the least recently
+    used entry is evicted once `maxsize` is exceeded.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is None:
+                return default
+            if hit[0] <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return hit[1]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_set(self, key: Hashable, build: Callable[[], Any]) -> Any:
+        """Return the cached value for key, building and storing it on a miss."""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = build()
+            self.set(key, value)
+        return value
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def keys(self) -> List[Hashable]:
+        """Keys of all unexpired entries, least recently used first."""
+        with self._lock:
+            now = time.monotonic()
+            for key in [k for k, (expires, _) in self._data.items() if expires <= now]:
+                del self._data[key]
+            return list(self._data)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# ── Shared result cache ──────────────────────────────────────────────────────
+# Service results are cached per (namespace, user, params) in the backend
+# chosen by CACHE_BACKEND: "memory" (per process), "disk" (CACHE_DIR, shared
+# by the processes on one host), "redis" (REDIS_URL, shared by every node) or
+# "none". Writers bump() the data domains they change, which retires the
+# entries of every namespace that reads them (NAMESPACE_DOMAINS).
+
+HISTORY = "history"
+GENRES = "genres"
+GENRE_MAP = "genre_map"
+ARTIST_MAP = "artist_map"
+LAYOUT = "layout"
+
+# User slot for entries that aren't per user (e.g. layouts keyed by graph hash)
+SHARED = "_shared"
+
+# Data domains with a per-user version in user_data_versions (migration 014),
+# plus a shared version for writes that affect everyone (migration 019).
+# Writers bump() the domains they change; every per-user cache key includes
+# the versions of the domains its namespace reads, so after a write on any
+# node, every node misses — even on per-process memory caches.
+DATA_HISTORY = "history"
+DATA_TOP = "top"
+DATA_GENRES = "genres"
+DATA_RECOMMENDATIONS = "recommendations"  # read only by ETags (app/conditional.py)
+
+NAMESPACE_DOMAINS = {
+    HISTORY: (DATA_HISTORY, DATA_TOP),  # top_tracks supplies album art
+    GENRES: (DATA_HISTORY, DATA_TOP, DATA_GENRES),
+    GENRE_MAP: (DATA_HISTORY, DATA_GENRES),
+    ARTIST_MAP: (DATA_TOP,),
+}
+
+# Versions are re-read at most this often per user and node, which bounds how
+# long another node's write can go unnoticed.
+VERSION_TTL_SECS = 1.0
+
+DEFAULT_TTL_SECS = 300
+MEMORY_CACHE_SIZE = 2_048
+# Redis index sets outlive any entry they list; stale members are harmless.
+REDIS_INDEX_TTL_SECS = 24 * 3600
+REDIS_PREFIX = "syv:cache:"
+
+_SAFE_PATH = re.compile(r"[^A-Za-z0-9_.-]")
+
+_versions = TTLCache(maxsize=10_000, ttl=VERSION_TTL_SECS)
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    return str(value)
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, separators=(",", ":"), default=_json_default)
+
+
+class NullBackend:
+    name = "none"
+
+    def get(self, namespace: str, user: str, key: str) -> Any:
+        return _MISSING
+
+    def set(self, namespace: str, user: str, key: str, value: Any, ttl: float) -> None:
+        pass
+
+    def invalidate(self, namespace: str, user: Optional[str] = None) -> None:
+        pass
+
+
+class MemoryBackend:
+    """
+    Per-process LRU. Values are stored as JSON, like on disk and in Redis, so
+    every read returns a fresh copy with the same types on any backend.
+    """
+
+    name = "memory"
+
+    def __init__(self, maxsize: int = MEMORY_CACHE_SIZE):
+        self._cache = TTLCache(maxsize=maxsize, ttl=DEFAULT_TTL_SECS)
+
+    def get(self, namespace: str, user: str, key: str) -> Any:
+        raw = self._cache.get((namespace, user, key))
+        return _MISSING if raw is None else json.loads(raw)
+
+    def set(self, namespace: str, user: str, key: str, value: Any, ttl: float) -> None:
+        self._cache.set((namespace, user, key), _dumps(value), ttl=ttl)
+
+    def invalidate(self, namespace: str, user: Optional[str] = None) -> None:
+        for k in self._cache.keys():
+            if k[0] == namespace and (user is None or k[1] == user):
+                self._cache.delete(k)
+
+
+class DiskBackend:
+    """JSON files under root/<namespace>/<user>/; expired files are dropped on read."""
+
+    name = "disk"
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _dir(self, namespace: str, user: Optional[str] = None) -> str:
+        parts = [self.root, _SAFE_PATH.sub("_", namespace)]
+        if user is not None:
+            parts.append(_SAFE_PATH.sub("_", user))
+        return os.path.join(*parts)
+
+    def get(self, namespace: str, user: str, key: str) -> Any:
+        path = os.path.join(self._dir(namespace, user), f"{key}.json")
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return _MISSING
+        if entry["expires_at"] <= time.time():
+            with contextlib.suppress(OSError):
+                os.remove(path)
+            return _MISSING
+        return entry["value"]
+
+    def set(self, namespace: str, user: str, key: str, value: Any, ttl: float) -> None:
+        directory = self._dir(namespace, user)
+        os.makedirs(directory, exist_ok=True)
+        tmp = os.path.join(directory, f".{key}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, "w") as f:
+            f.write(_dumps({"expires_at": time.time() + ttl, "value": value}))
+        os.replace(tmp, os.path.join(directory, f"{key}.json"))
+
+    def invalidate(self, namespace: str, user: Optional[str] = None) -> None:
+        shutil.rmtree(self._dir(namespace, user), ignore_errors=True)
+
+
+class RedisBackend:
+    """
+    Entries under REDIS_PREFIX<namespace>:<user>:<key>; a set per
+    (namespace, user) lists them so invalidation needs no keyspace scan.
+    """
+
+    name = "redis"
+
+    def __init__(self, url: str):
+        import redis
+
+        self._redis = redis.Redis.from_url(url)
+        self._redis.ping()
+
+    def get(self, namespace: str, user: str, key: str) -> Any:
+        raw = self._redis.get(f"{REDIS_PREFIX}{namespace}:{user}:{key}")
+        return _MISSING if raw is None else json.loads(raw)
+
+    def set(self, namespace: str, user: str, key: str, value: Any, ttl: float) -> None:
+        entry = f"{REDIS_PREFIX}{namespace}:{user}:{key}"
+        index = f"{REDIS_PREFIX}{namespace}:{user}"
+        pipe = self._redis.pipeline(transaction=False)
+        pipe.set(entry, _dumps(value), ex=max(1, int(ttl)))
+        pipe.sadd(index, entry)
+        pipe.expire(index, REDIS_INDEX_TTL_SECS)
+        pipe.execute()
+
+    def invalidate(self, namespace: str, user: Optional[str] = None) -> None:
+        if user is not None:
+            index = f"{REDIS_PREFIX}{namespace}:{user}"
+            self._redis.delete(*self._redis.smembers(index), index)
+            return
+        batch = []
+        for key in self._redis.scan_iter(match=f"{REDIS_PREFIX}{namespace}:*", count=1_000):
+            batch.append(key)
+            if len(batch) >= 1_000:
+                self._redis.unlink(*batch)
+                batch = []
+        if batch:
+            self._redis.unlink(*batch)
+
+
+_backend: Any = None
+_backend_lock = threading.Lock()
+
+
+def get_cache():
+    """The configured cache backend; falls back to memory if Redis or the cache dir is unusable."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                from app.config import settings
+
+                kind = settings.cache_backend
+                try:
+                    if kind == "redis":
+                        _backend = RedisBackend(settings.redis_url)
+                    elif kind == "disk":
+                        _backend = DiskBackend(settings.cache_dir)
+                    elif kind == "none":
+                        _backend = NullBackend()
+                except Exception as e:
+                    print(f"{kind} cache unavailable, using memory: {e}")
+                if _backend is None:
+                    _backend = MemoryBackend()
+    return _backend
+
+
+def make_key(params: dict) -> str:
+    """Stable digest of call parameters."""
+    return hashlib.sha1(_dumps(sorted(params.items())).encode()).hexdigest()
+
+
+def get_or_set(namespace: str, user: Optional[str], params: dict, build: Callable[[], Any],
+               ttl: Optional[float] = None) -> Any:
+    """
+    Return the cached result for (namespace, user, params), building and
+    storing it on a miss. Cache errors are logged and treated as misses.
+    """
+    backend = get_cache()
+    if backend.name == "none":
+        return build()
+    domains = NAMESPACE_DOMAINS.get(namespace)
+    if user and domains:
+        versions = data_versions(user)
+        params = {**params, "__versions__": [versions.get(d, 0) for d in domains]}
+    user = user or SHARED
+    key = make_key(params)
+    try:
+        value = backend.get(namespace, user, key)
+    except Exception as e:
+        print(f"Cache read failed ({namespace}): {e}")
+        value = _MISSING
+    if value is not _MISSING:
+        return value
+
+    value = build()
+    try:
+        backend.set(namespace, user, key, value, DEFAULT_TTL_SECS if ttl is None else ttl)
+    except Exception as e:
+        print(f"Cache write failed ({namespace}): {e}")
+    return value
+
+
+def cached(namespace: str, ttl: Optional[float] = None, ignore: Iterable[str] = ()):
+    """
+    Cache a service function taking `user_id` per user, keyed by its name and
+    other arguments. Arguments in `ignore` (e.g. a Spotify client) are keyed
+    only by whether they were passed, since results built without them differ.
+    """
+    ignore = set(ignore)
+
+    def decorate(fn: Callable) -> Callable:
+        signature = inspect.signature(fn)
+        name = f"{fn.__module__}.{fn.__qualname__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            params = {
+                k: (v is not None) if k in ignore else v
+                for k, v in bound.arguments.items() if k != "user_id"
+            }
+            params["__fn__"] = name
+            return get_or_set(namespace, bound.arguments["user_id"], params, lambda: fn(*args, **kwargs), ttl)
+        return wrapper
+    return decorate
+
+
+def invalidate(namespaces: Iterable[str], user_id: Optional[str] = None) -> None:
+    """Drop cached results in each namespace for one user, or for everyone when user_id is None."""
+    backend = get_cache()
+    for namespace in namespaces:
+        try:
+            backend.invalidate(namespace, user_id)
+        except Exception as e:
+            print(f"Cache invalidation failed ({namespace}): {e}")
+
+
+def _read_versions(user_id: str) -> dict:
+    from app.database import rpc
+
+    return rpc("get_data_versions", {"p_user_id": user_id}) or {}
+
+
+def current_data_versions(user_id: str) -> Optional[dict]:
+    """
+    The user's {domain: version} read from the database now, or None if they
+    can't be read. Also refreshes this node's copy, so cached reads later in
+    the same request use the same versions.
+    """
+    try:
+        versions = _read_versions(user_id)
+    except Exception as e:
+        print(f"Could not read data versions for {user_id}: {e}")
+        return None
+    _versions.set(user_id, versions)
+    return versions
+
+
+def data_versions(user_id: str) -> dict:
+    """The user's {domain: version}, re-read from the database every VERSION_TTL_SECS."""
+    versions = _versions.get(user_id)
+    if versions is None:
+        try:
+            versions = _read_versions(user_id)
+        except Exception as e:
+            # Without versions keys fall back to 0; local invalidation still applies
+            print(f"Could not read data versions for {user_id}: {e}")
+            versions = {}
+        _versions.set(user_id, versions)
+    return versions
+
+
+def bump(domains: Iterable[str], user_id: Optional[str] = None) -> None:
+    """
+    Record a write to the given data domains for one user (or every user
+    when user_id is None, via the shared version row): increment their
+    versions and drop this node's cached results in the namespaces that
+    read them.
+    """
+    from app.database import rpc
+
+    domains = list(domains)
+    try:
+        versions = rpc("bump_data_versions", {"p_user_id": user_id, "p_domains": domains}) or {}
+    except Exception as e:
+        print(f"Could not bump data versions {domains} for {user_id or 'all users'}: {e}")
+        versions = None
+    if user_id is None:
+        _versions.clear()
+    elif versions:
+        _versions.set(user_id, {**(_versions.get(user_id) or {}), **versions})
+    else:
+        _versions.delete(user_id)
+
+    invalidate([ns for ns, reads in NAMESPACE_DOMAINS.items() if set(reads) & set(domains)], user_id)
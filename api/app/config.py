@@ -10,6 +10,13 @@ class Settings(BaseSettings):
     jwt_secret: str
     frontend_url: str = "http://localhost:3000"
     lastfm_api_key: str = ""
+    database_url: str = ""
+    admin_spotify_ids: str = ""
+    metrics_token: str = ""
+    profile_dir: str = "profiles"
+    cache_backend: str = "memory"
+    cache_dir: str = ".cache"
+    redis_url: str = ""
 
     class Config:
         env_file = ".env"
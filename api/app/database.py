@@ -1,4 +1,255 @@
+import queue
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, Iterator, List, Optional, Tuple
+from uuid import UUID
+
 from supabase import create_client, Client
+from app import metrics
 from app.config import settings
 
 supabase: Client = create_client(settings.supabase_url, settings.supabase_service_key)
+metrics.instrument_postgrest(supabase.postgrest.session)
+
+POOL_MIN_SIZE = 1
+POOL_MAX_SIZE = 10
+# A bad DATABASE_URL fails startup within this, instead of stalling every rpc()
+POOL_CONNECT_TIMEOUT_SECS = 5
+# Waiting longer than this for a pooled connection sends the call to PostgREST
+POOL_ACQUIRE_TIMEOUT_SECS = 2
+
+_IDENTIFIER = re.compile(r"^[a-z_][a-z0-9_]*$")
+
+
+class BackendUnavailable(Exception):
+    """The direct backend couldn't provide a connection; nothing was sent."""
+
+
+class PostgrestBackend:
+    """Calls RPCs through supabase-py / PostgREST — works with only the service key."""
+
+    name = "postgrest"
+
+    def rpc(self, fn: str, params: dict) -> Any:
+        return supabase.rpc(fn, params).execute().data
+
+
+def _json_value(value: Any) -> Any:
+    """Match PostgREST's JSON encoding of binary-decoded values."""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, list):
+        return [_json_value(v) for v in value]
+    return value
+
+
+class PostgresBackend:
+    """
+    Calls RPCs over a direct psycopg connection pool (settings.database_url).
+
+    Statements are prepared server-side on first use per connection and
+    results come back in binary format, skipping PostgREST's HTTP hop and
+    JSON encoding. Return values have the same shape as PostgREST's: the
+    value itself for scalar functions, a list of row dicts for set-returning
+    ones. Use a session-mode connection string — transaction-mode poolers
+    don't support prepared statements.
+
+    The constructor raises if no connection can be made within
+    POOL_CONNECT_TIMEOUT_SECS. rpc() raises BackendUnavailable when it can't
+    get a connection, before anything is sent.
+    """
+
+    name = "postgres"
+
+    def __init__(self, dsn: str):
+        from psycopg.rows import dict_row
+        from psycopg_pool import ConnectionPool
+
+        self._pool = ConnectionPool(
+            dsn,
+            min_size=POOL_MIN_SIZE,
+            max_size=POOL_MAX_SIZE,
+            timeout=POOL_ACQUIRE_TIMEOUT_SECS,
+            kwargs={"row_factory": dict_row, "autocommit": True, "connect_timeout": POOL_CONNECT_TIMEOUT_SECS},
+            open=True,
+        )
+        try:
+            self._pool.wait(timeout=POOL_CONNECT_TIMEOUT_SECS)
+        except Exception:
+            self._pool.close()
+            raise
+
+    def rpc(self, fn: str, params: dict) -> Any:
+        from psycopg.types.json import Jsonb
+
+        if not _IDENTIFIER.match(fn) or not all(_IDENTIFIER.match(k) for k in params):
+            raise ValueError(f"Invalid RPC identifier in {fn}({', '.join(params)})")
+
+        args = ", ".join(f"{k} => %({k})s" for k in params)
+        # Lists of scalars bind as Postgres arrays; objects go over as jsonb.
+        values = {
+            k: Jsonb(v) if isinstance(v, dict) or (isinstance(v, list) and v and isinstance(v[0], dict)) else v
+            for k, v in params.items()
+        }
+        from psycopg_pool import PoolClosed, PoolTimeout, TooManyRequests
+
+        started = time.perf_counter()
+        try:
+            conn = self._pool.getconn()
+        except (PoolClosed, PoolTimeout, TooManyRequests) as e:
+            raise BackendUnavailable(str(e)) from e
+        try:
+            cur = conn.execute(f"SELECT * FROM {fn}({args})", values, prepare=True, binary=True)
+            rows = cur.fetchall()
+            columns = [c.name for c in cur.description or []]
+        finally:
+            self._pool.putconn(conn)
+        # libpq doesn't expose the wire size of a result, so no bytes here
+        metrics.record("rpc", time.perf_counter() - started, rows=len(rows))
+
+        if columns == [fn]:
+            return _json_value(rows[0][fn]) if rows else None
+        return [{k: _json_value(v) for k, v in row.items()} for row in rows]
+
+
+_backend: Any = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """
+    The configured data backend: direct Postgres when DATABASE_URL is set and
+    psycopg is installed, otherwise PostgREST.
+    """
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = PostgrestBackend()
+                if settings.database_url:
+                    try:
+                        _backend = PostgresBackend(settings.database_url)
+                    except Exception as e:
+                        print(f"Postgres backend unavailable, using PostgREST: {e}")
+    return _backend
+
+
+def rpc(fn: str, params: dict) -> Any:
+    """
+    Call a database function through the configured backend. If the direct
+    backend has no connection to give, the call goes through PostgREST
+    instead. Errors after the call was sent are raised as-is: retrying could
+    apply a non-idempotent function (bump_data_versions,
+    merge_item_cooccurrence) twice.
+    """
+    backend = get_backend()
+    try:
+        return backend.rpc(fn, params)
+    except BackendUnavailable as e:
+        print(f"Postgres rpc {fn} couldn't get a connection, falling back to PostgREST: {e}")
+        return PostgrestBackend().rpc(fn, params)
+
+
+# PostgREST caps every response at max-rows (1,000 on Supabase), so pages
+# must not be larger or a short page would look like the end of the table.
+PAGE_SIZE = 1_000
+
+_UUID_SPACE = 16 ** 8
+
+
+def _uuid_bounds(partitions: int) -> List[Tuple[Optional[str], Optional[str]]]:
+    """Split the UUID keyspace into contiguous [lo, hi) ranges on the first 32 bits."""
+    cuts = [f"{i * _UUID_SPACE // partitions:08x}-0000-0000-0000-000000000000" for i in range(1, partitions)]
+    return list(zip([None] + cuts, cuts + [None]))
+
+
+def _pages(
+    table: str,
+    columns: str,
+    where: Optional[Callable[[Any], Any]],
+    key: str,
+    page_size: int,
+    lo: Optional[str] = None,
+    hi: Optional[str] = None,
+) -> Iterator[List[dict]]:
+    last = None
+    while True:
+        query = supabase.table(table).select(columns)
+        if where:
+            query = where(query)
+        if lo is not None:
+            query = query.gte(key, lo)
+        if hi is not None:
+            query = query.lt(key, hi)
+        if last is not None:
+            query = query.gt(key, last)
+        rows = query.order(key).limit(page_size).execute().data or []
+        if rows:
+            yield rows
+        if len(rows) < page_size:
+            return
+        last = rows[-1][key]
+
+
+def scan(
+    table: str,
+    columns: str = "*",
+    where: Optional[Callable[[Any], Any]] = None,
+    key: str = "id",
+    page_size: int = PAGE_SIZE,
+    partitions: int = 1,
+) -> Iterator[dict]:
+    """
+    Stream every row of `table` matching `where` using keyset pagination.
+
+    Each page is fetched with `key > last seen key ORDER BY key LIMIT page_size`,
+    so rows inserted or deleted mid-scan can't shift later pages. `key` must
+    be unique and is added to `columns` if missing. A page is only an index
+    seek when an index leads with the equality filters in `where` and ends
+    in `key`, e.g. streaming_history (user_id, id) from migration 018.
+
+    `where` receives the select builder and returns it with filters applied,
+    e.g. `where=lambda q: q.eq("user_id", user_id)`.
+
+    With partitions > 1 the (UUID) key space is split into that many ranges
+    scanned concurrently; rows then arrive in no particular order.
+    """
+    if columns != "*" and key not in [c.strip() for c in columns.split(",")]:
+        columns = f"{columns}, {key}"
+
+    if partitions <= 1:
+        for rows in _pages(table, columns, where, key, page_size):
+            yield from rows
+        return
+
+    pages: queue.Queue = queue.Queue()
+
+    def run(lo: Optional[str], hi: Optional[str]) -> None:
+        try:
+            for rows in _pages(table, columns, where, key, page_size, lo, hi):
+                pages.put(rows)
+        except Exception as e:
+            pages.put(e)
+        else:
+            pages.put(None)
+
+    with ThreadPoolExecutor(max_workers=partitions, thread_name_prefix=f"scan-{table}") as pool:
+        for lo, hi in _uuid_bounds(partitions):
+            pool.submit(metrics.bind(run), lo, hi)
+        remaining = partitions
+        while remaining:
+            item = pages.get()
+            if item is None:
+                remaining -= 1
+            elif isinstance(item, Exception):
+                raise item
+            else:
+                yield from item
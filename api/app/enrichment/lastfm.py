@@ -0,0 +1,184 @@
+import asyncio
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import httpx
+
+from app import cache
+from app.config import settings
+from app.database import supabase
+from app.ratelimit import AsyncTokenBucket
+
+LASTFM_URL = "https://ws.audioscrobbler.com/2.0/"
+REQUESTS_PER_SEC = 5  # Last.fm allows 5 req/sec
+CONCURRENCY = 8
+MAX_ATTEMPTS = 4
+RATE_LIMIT_PAUSE_SECS = 5
+MIN_TAG_COUNT = 10  # ignore tags with very low counts (noise)
+BATCH_SIZE = 500
+
+# Last.fm error codes worth retrying: operation failed, service offline,
+# temporarily unavailable, rate limit exceeded
+RETRYABLE_ERRORS = {8, 11, 16, 29}
+RATE_LIMIT_ERROR = 29
+
+CACHE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    ".checkpoints", "lastfm_toptags.sqlite",
+)
+
+# Tags that are not genres — Last.fm is community-sourced so these slip in
+NON_GENRE_TAGS = {
+    "seen live", "favorites", "favourite", "love", "amazing", "great",
+    "awesome", "cool", "good", "best", "beautiful", "sexy", "hot",
+    "my music", "all", "music", "songs", "albums", "bands", "artists",
+    "spotify", "youtube", "soundcloud", "heard on pandora",
+    "under 2000 listeners", "via lastfm",
+    "singer-songwriter", "singer songwriter",
+}
+
+
+# ── Response cache ────────────────────────────────────────────────────────────
+
+def open_cache() -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+    conn = sqlite3.connect(CACHE_PATH)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS toptags ("
+        " artist TEXT PRIMARY KEY, response TEXT NOT NULL, fetched_at REAL NOT NULL)"
+    )
+    return conn
+
+
+def cached_responses(conn: sqlite3.Connection, names: List[str]) -> Dict[str, dict]:
+    found: Dict[str, dict] = {}
+    for i in range(0, len(names), BATCH_SIZE):
+        batch = names[i:i + BATCH_SIZE]
+        placeholders = ",".join("?" * len(batch))
+        for artist, response in conn.execute(
+            f"SELECT artist, response FROM toptags WHERE artist IN ({placeholders})", batch
+        ):
+            found[artist] = json.loads(response)
+    return found
+
+
+def parse_tags(data: dict) -> List[str]:
+    """Genre-like tag names from a getTopTags response, filtered at read time."""
+    genres = []
+    for tag in data.get("toptags", {}).get("tag", []):
+        name = tag.get("name", "").strip().lower()
+        count = int(tag.get("count", 0))
+        if count >= MIN_TAG_COUNT and name not in NON_GENRE_TAGS and len(name) > 1:
+            genres.append(name)
+    return genres
+
+
+# ── Fetching ──────────────────────────────────────────────────────────────────
+
+async def fetch_top_tags(
+    client: httpx.AsyncClient,
+    limiter: AsyncTokenBucket,
+    artist_name: str,
+) -> Optional[dict]:
+    """Raw getTopTags response, or None if the request kept failing."""
+    for attempt in range(MAX_ATTEMPTS):
+        await limiter.acquire()
+        try:
+            resp = await client.get(LASTFM_URL, params={
+                "method": "artist.getTopTags",
+                "artist": artist_name,
+                "api_key": settings.lastfm_api_key,
+                "format": "json",
+                "autocorrect": 1,
+            })
+            data = resp.json()
+        except (httpx.HTTPError, ValueError) as e:
+            error = str(e)
+        else:
+            code = data.get("error")
+            if code is None or code not in RETRYABLE_ERRORS:
+                return data  # includes "artist not found" — worth caching too
+            if code == RATE_LIMIT_ERROR or resp.status_code == 429:
+                limiter.pause(RATE_LIMIT_PAUSE_SECS)
+            error = data.get("message", f"error {code}")
+        await asyncio.sleep(2 ** attempt)
+
+    print(f"  Last.fm error for {artist_name!r}: {error}")
+    return None
+
+
+async def fetch_all(names: List[str], conn: sqlite3.Connection) -> Dict[str, dict]:
+    """Fetch and cache responses for every name; returns {name: response}."""
+    limiter = AsyncTokenBucket(rate=REQUESTS_PER_SEC, capacity=1)
+    queue: asyncio.Queue = asyncio.Queue()
+    for name in names:
+        queue.put_nowait(name)
+
+    fetched: Dict[str, dict] = {}
+    started = time.monotonic()
+
+    async def worker(client: httpx.AsyncClient) -> None:
+        while True:
+            try:
+                name = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            data = await fetch_top_tags(client, limiter, name)
+            if data is None:
+                continue
+            fetched[name] = data
+            conn.execute(
+                "INSERT OR REPLACE INTO toptags (artist, response, fetched_at) VALUES (?, ?, ?)",
+                (name, json.dumps(data), time.time()),
+            )
+            if len(fetched) % 50 == 0 or len(fetched) == len(names):
+                conn.commit()
+                rate = len(fetched) / max(time.monotonic() - started, 1e-9)
+                print(f"  {len(fetched):,}/{len(names):,} fetched ({rate:.1f} req/s)")
+
+    async with httpx.AsyncClient(timeout=10) as client:
+        await asyncio.gather(*(worker(client) for _ in range(CONCURRENCY)))
+    conn.commit()
+    return fetched
+
+
+def lookup_genres(names: List[str], refresh_cache: bool = False) -> Dict[str, List[str]]:
+    """
+    {name: genre tags} for every artist name, from the local cache where
+    possible and Last.fm otherwise. Names whose request kept failing are
+    omitted so callers can retry them later.
+    """
+    conn = open_cache()
+    try:
+        responses = {} if refresh_cache else cached_responses(conn, names)
+        to_fetch = [n for n in names if n not in responses]
+        print(f"  {len(responses):,} cached, {len(to_fetch):,} to fetch")
+        if to_fetch:
+            responses.update(asyncio.run(fetch_all(to_fetch, conn)))
+    finally:
+        conn.close()
+    return {name: parse_tags(responses[name]) for name in names if name in responses}
+
+
+def save_lastfm_genres(genres_by_name: Dict[str, List[str]], bump: bool = True) -> int:
+    """
+    Write looked-up tags to artist_genres and mark the artists as checked so
+    the enrichment worker doesn't look them up again. Returns artists filled in.
+    With bump=False the caller bumps the genres version itself.
+    """
+    now = datetime.now(tz=timezone.utc).isoformat()
+    rows = [
+        {"artist_name": name, "genres": genres, "lastfm_checked_at": now}
+        for name, genres in genres_by_name.items()
+    ]
+    for i in range(0, len(rows), BATCH_SIZE):
+        supabase.table("artist_genres").upsert(
+            rows[i:i + BATCH_SIZE], on_conflict="artist_name"
+        ).execute()
+    if rows and bump:
+        cache.bump([cache.DATA_GENRES])
+    return sum(1 for genres in genres_by_name.values() if genres)
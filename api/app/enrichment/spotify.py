@@ -0,0 +1,229 @@
+import heapq
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import spotipy
+from spotipy.oauth2 import SpotifyClientCredentials
+
+from app import cache
+from app.config import settings
+from app.database import supabase
+from app.ratelimit import TokenBucket
+
+TRACK_BATCH = 50
+ARTIST_BATCH = 50
+UPSERT_BATCH = 500
+
+WORKERS = 4
+REQUESTS_PER_SEC = 10
+MAX_ATTEMPTS = 5
+BACKOFF_BASE_SECS = 1.0
+DEFAULT_RETRY_AFTER_SECS = 5
+CHECKPOINT_EVERY = 20  # batches
+
+
+def make_client() -> spotipy.Spotify:
+    """Client-credentials Spotify client. Retries are handled by run_batches
+    so 429s surface with their Retry-After."""
+    return spotipy.Spotify(
+        auth_manager=SpotifyClientCredentials(
+            client_id=settings.spotify_client_id,
+            client_secret=settings.spotify_client_secret,
+        ),
+        retries=0,
+        status_forcelist=(),
+    )
+
+
+def _retry_after(e: spotipy.SpotifyException) -> float:
+    headers = getattr(e, "headers", None) or {}
+    try:
+        return float(headers.get("Retry-After", DEFAULT_RETRY_AFTER_SECS))
+    except (TypeError, ValueError):
+        return DEFAULT_RETRY_AFTER_SECS
+
+
+def run_batches(
+    label: str,
+    batches: List[List[str]],
+    fetch: Callable[[List[str]], dict],
+    on_result: Callable[[List[str], dict], None],
+    limiter: TokenBucket,
+    workers: int,
+    checkpoint: Callable[[], None],
+) -> List[List[str]]:
+    """
+    Run fetch() over batches on a worker pool and feed results to on_result()
+    on the calling thread. Returns the batches that still failed after
+    MAX_ATTEMPTS; the caller leaves them for the next run.
+    """
+    def call(batch: List[str]) -> dict:
+        limiter.acquire()
+        return fetch(batch)
+
+    pending = deque((batch, 0) for batch in batches)
+    retries: List[Tuple[float, int, List[str], int]] = []  # (ready_at, seq, batch, attempt)
+    failed: List[List[str]] = []
+    in_flight: Dict = {}
+    done = seq = 0
+    total = len(batches)
+    started = time.monotonic()
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"enrich-{label}") as pool:
+            while pending or retries or in_flight:
+                now = time.monotonic()
+                while retries and retries[0][0] <= now:
+                    _, _, batch, attempt = heapq.heappop(retries)
+                    pending.append((batch, attempt))
+                while pending and len(in_flight) < workers:
+                    batch, attempt = pending.popleft()
+                    in_flight[pool.submit(call, batch)] = (batch, attempt)
+
+                if not in_flight:
+                    time.sleep(max(0.0, retries[0][0] - time.monotonic()))
+                    continue
+
+                timeout = max(0.0, retries[0][0] - time.monotonic()) if retries else None
+                finished, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    batch, attempt = in_flight.pop(future)
+                    try:
+                        on_result(batch, future.result())
+                    except spotipy.SpotifyException as e:
+                        if e.http_status == 429:
+                            delay = _retry_after(e)
+                            print(f"  {label}: rate limited — pausing {delay:.0f}s")
+                            limiter.pause(delay)
+                            pending.appendleft((batch, attempt))
+                            continue
+                        error: Exception = e
+                    except Exception as e:
+                        error = e
+                    else:
+                        done += 1
+                        if done % CHECKPOINT_EVERY == 0:
+                            checkpoint()
+                            rate = done / max(time.monotonic() - started, 1e-9)
+                            print(f"  {label} {done:,}/{total:,} batches ({rate:.1f}/s)")
+                        continue
+
+                    if attempt + 1 >= MAX_ATTEMPTS:
+                        print(f"  {label} batch failed after {MAX_ATTEMPTS} attempts: {error}")
+                        failed.append(batch)
+                    else:
+                        seq += 1
+                        ready_at = time.monotonic() + BACKOFF_BASE_SECS * 2 ** attempt
+                        heapq.heappush(retries, (ready_at, seq, batch, attempt + 1))
+    finally:
+        checkpoint()  # also on Ctrl-C, so an interrupted run resumes from here
+    return failed
+
+
+def save_track_artists(rows: List[dict]) -> None:
+    for i in range(0, len(rows), UPSERT_BATCH):
+        supabase.table("track_artist").upsert(rows[i:i + UPSERT_BATCH], on_conflict="spotify_track_id").execute()
+
+
+def resolve_track_artists(
+    sp: spotipy.Spotify,
+    track_ids: List[str],
+    limiter: TokenBucket,
+    workers: int,
+) -> List[str]:
+    """Batch-fetch tracks and record their primary artist in track_artist. Returns the ids resolved."""
+    buffer: List[dict] = []
+    resolved: List[str] = []
+
+    def on_result(batch: List[str], result: dict) -> None:
+        now = datetime.now(tz=timezone.utc).isoformat()
+        for track_id, track in zip(batch, result.get("tracks") or []):
+            artists = (track or {}).get("artists") or []
+            buffer.append({
+                "spotify_track_id": track_id,
+                "spotify_artist_id": artists[0]["id"] if artists else None,
+                "artist_name": artists[0]["name"] if artists else None,
+                "resolved_at": now,
+            })
+        resolved.extend(batch)
+
+    def flush() -> None:
+        save_track_artists(buffer)
+        buffer.clear()
+
+    failed = run_batches(
+        "tracks",
+        [track_ids[i:i + TRACK_BATCH] for i in range(0, len(track_ids), TRACK_BATCH)],
+        sp.tracks, on_result, limiter, workers, flush,
+    )
+    if failed:
+        print(f"  {sum(len(b) for b in failed):,} tracks unresolved — re-run to retry them")
+    return resolved
+
+
+def fetch_genre_map(
+    sp: spotipy.Spotify,
+    artist_ids: List[str],
+    limiter: TokenBucket,
+    workers: int,
+    genres: Optional[Dict[str, List[str]]] = None,
+    checkpoint: Callable[[], None] = lambda: None,
+) -> Dict[str, List[str]]:
+    """
+    Batch-fetch artists and return {artist_id: [genres]}.
+
+    `genres` holds results already known (e.g. from a checkpoint); it is
+    filled in place and only missing artists are fetched.
+    """
+    genres = {} if genres is None else genres
+    todo = [a for a in artist_ids if a not in genres]
+
+    def on_result(batch: List[str], result: dict) -> None:
+        for artist in result.get("artists") or []:
+            if artist:
+                genres[artist["id"]] = artist.get("genres") or []
+
+    failed = run_batches(
+        "artists",
+        [todo[i:i + ARTIST_BATCH] for i in range(0, len(todo), ARTIST_BATCH)],
+        sp.artists, on_result, limiter, workers, checkpoint,
+    )
+    if failed:
+        print(f"  {sum(len(b) for b in failed):,} artists not fetched — re-run to retry them")
+
+    return {a: genres[a] for a in artist_ids if a in genres}
+
+
+def upsert_artist_genres(
+    artists: Iterable[Tuple[str, str]],
+    genre_map: Dict[str, List[str]],
+    bump: bool = True,
+) -> List[dict]:
+    """
+    Write fetched genres for (artist_id, artist_name) pairs; returns the rows written.
+
+    Deduplicates by lowercase name — two Spotify artist IDs can share a name —
+    preferring the entry that has genres over one that doesn't. Artists
+    missing from genre_map (failed batches) are skipped so they stay pending.
+    With bump=False the caller bumps the genres version itself.
+    """
+    deduped: Dict[str, dict] = {}
+    for aid, aname in artists:
+        if aid not in genre_map:
+            continue
+        key = aname.lower()
+        row = {"artist_name": key, "spotify_artist_id": aid, "genres": genre_map[aid]}
+        if key not in deduped or (not deduped[key]["genres"] and row["genres"]):
+            deduped[key] = row
+    rows = list(deduped.values())
+
+    for i in range(0, len(rows), UPSERT_BATCH):
+        supabase.table("artist_genres").upsert(
+            rows[i:i + UPSERT_BATCH], on_conflict="artist_name"
+        ).execute()
+    if rows and bump:
+        cache.bump([cache.DATA_GENRES])
+    return rows
@@ -0,0 +1,93 @@
+from app import cache
+from app.database import supabase
+
+BLOCKED_TAGS = {
+    # ── Countries / nationalities ─────────────────────────────────────────────
+    "american", "united states", "usa", "u.s.a.", "us",
+    "british", "uk", "united kingdom", "england", "english", "scottish", "welsh",
+    "canadian", "canada",
+    "australian", "australia",
+    "german", "germany", "deutsch",
+    "french", "france",
+    "swedish", "sweden",
+    "norwegian", "norway",
+    "danish", "denmark",
+    "finnish", "finland",
+    "japanese", "japan",
+    "korean", "korea", "south korea",
+    "spanish", "spain",
+    "italian", "italy",
+    "brazilian", "brazil",
+    "mexican", "mexico",
+    "irish", "ireland",
+    "dutch", "netherlands", "holland",
+    "new zealand",
+    "russian", "russia",
+    "polish", "poland",
+    "portuguese", "portugal",
+    "greek", "greece",
+    "turkish", "turkey",
+    "indian", "india",
+    "chinese", "china",
+    "nigerian", "nigeria",
+    "ghanaian", "ghana",
+    "jamaican", "jamaica",
+    "cuban", "cuba",
+    "puerto rican", "puerto rico",
+    "colombian", "colombia",
+    "argentinian", "argentina",
+    "chilean", "chile",
+    "venezuelan", "venezuela",
+    "icelandic", "iceland",
+    "belgian", "belgium",
+    "swiss", "switzerland",
+    "austrian", "austria",
+    "czech", "czech republic",
+    "hungarian", "hungary",
+    "romanian", "romania",
+    "ukrainian", "ukraine",
+    # ── Regions / cities ─────────────────────────────────────────────────────
+    "west coast", "east coast", "southern", "midwest", "new england",
+    "los angeles", "new york", "nyc", "london", "paris", "berlin",
+    "chicago", "nashville", "tennessee", "virginia", "florida",
+    "texas", "atlanta", "detroit", "toronto", "montreal",
+    "columbus", "philadelphia", "miami", "houston", "boston",
+    "seattle", "portland", "denver", "minneapolis", "cleveland",
+    "pittsburgh", "baltimore", "memphis", "new orleans", "cincinnati",
+    "oakland", "san francisco", "las vegas", "phoenix", "st. louis",
+    "louisville", "charlotte", "raleigh", "richmond", "birmingham",
+    "brighton", "manchester", "glasgow", "edinburgh", "bristol",
+    "melbourne", "sydney", "auckland", "dublin", "amsterdam",
+    "stockholm", "oslo", "copenhagen", "helsinki", "tokyo",
+    "seoul", "beijing", "shanghai", "mumbai", "lagos",
+    "scandinavia", "nordic", "latin america", "latin",
+    "appalachia", "pacific northwest", "deep south",
+    # ── Demographics / format descriptors ────────────────────────────────────
+    "female vocalists", "male vocalists", "female vocalist", "male vocalist",
+    "women", "men",
+    "singer-songwriter", "singer songwriter",
+    # ── Noise / meta tags ────────────────────────────────────────────────────
+    "seen live", "live",
+    "favorites", "favourite", "favorites", "favourites",
+    "love", "loved", "amazing", "awesome", "great", "good",
+    "best", "beautiful", "sexy", "hot", "cool", "chill",
+    "my music", "my top songs", "my favorites", "my favourite",
+    "heard on pandora", "spotify", "youtube", "soundcloud",
+    "via lastfm", "lastfm", "last.fm",
+    "disney", "disney channel",
+    "under 2000 listeners", "under 5000 listeners",
+    "all", "music", "songs", "albums", "bands", "artists",
+    "american music", "british music",
+    "diy", "local",
+}
+
+
+def clean_genre_tags(full: bool = False, bump: bool = True) -> dict:
+    """Run the in-database clean; returns {cleaned, emptied, since}."""
+    result = supabase.rpc("clean_genre_tags", {
+        "p_blocked": sorted(BLOCKED_TAGS),
+        "p_full": full,
+    }).execute().data or {}
+    if bump and (result.get("cleaned") or result.get("emptied")):
+        cache.bump([cache.DATA_GENRES])
+    return result
@@ -1,6 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 
 from app.auth.session import get_current_user
+from app.cache import DATA_GENRES, DATA_HISTORY, DATA_TOP
+from app.conditional import etag
 from app.genres import service
 
 router = APIRouter(prefix="/genres", tags=["genres"])
@@ -8,7 +10,7 @@ router = APIRouter(prefix="/genres", tags=["genres"])
 VALID_RANGES = {"short_term", "medium_term", "long_term"}
 
 
-@router.get("/")
+@router.get("/", dependencies=[Depends(etag(DATA_HISTORY, DATA_TOP, DATA_GENRES, rolling=True))])
 async def get_genres(
     range: str = Query("short_term"),
     user: dict = Depends(get_current_user),
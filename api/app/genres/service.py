@@ -1,7 +1,8 @@
 from datetime import datetime, timedelta, timezone
 from typing import List, Optional
 
-from app.database import supabase
+from app import cache
+from app.database import scan, supabase
 
 THRESHOLD = 1.0
 TOP_N = 12
@@ -51,47 +52,39 @@ def _get_genres_from_history(user_id: str, time_range: str, snapshot_at: str) ->
     """Build genre distribution from streaming_history weighted by ms_played."""
     cutoff = _get_date_cutoff(time_range)
 
-    sh_query = (
-        supabase.table("streaming_history")
-        .select("artist_name, ms_played")
-        .eq("user_id", user_id)
-        .gte("ms_played", 30000)
-        .limit(500_000)
-    )
-    if cutoff:
-        sh_query = sh_query.gte("played_at", cutoff.isoformat())
-    sh_result = sh_query.execute()
+    def where(query):
+        query = query.eq("user_id", user_id).gte("ms_played", 30000)
+        return query.gte("played_at", cutoff.isoformat()) if cutoff else query
 
     artist_ms: dict = {}
-    for row in sh_result.data or []:
-        name = (row["artist_name"] or "").strip().lower()
-        if name:
-            artist_ms[name] = artist_ms.get(name, 0) + row["ms_played"]
+    for row in scan("streaming_history", "artist_key, ms_played", where=where):
+        key = row.get("artist_key")
+        if key:
+            artist_ms[key] = artist_ms.get(key, 0) + row["ms_played"]
 
     if not artist_ms:
         return []
 
     # Look up genres from artist_genres in batches of 500
-    artist_names = list(artist_ms.keys())
+    artist_keys = list(artist_ms.keys())
     genre_lookup: dict = {}
-    for i in range(0, len(artist_names), 500):
-        batch = artist_names[i:i + 500]
+    for i in range(0, len(artist_keys), 500):
+        batch = artist_keys[i:i + 500]
         res = (
             supabase.table("artist_genres")
-            .select("artist_name, genres")
-            .in_("artist_name", batch)
+            .select("artist_key, genres")
+            .in_("artist_key", batch)
             .execute()
         )
         for row in res.data or []:
-            name = (row["artist_name"] or "").lower()
             genres = row.get("genres") or []
-            if genres:
-                genre_lookup[name] = genres
+            if genres and len(genres) > len(genre_lookup.get(row["artist_key"], [])):
+                genre_lookup[row["artist_key"]] = genres
 
     # Weight genres by ms_played
     genre_weights: dict = {}
-    for artist_name, ms in artist_ms.items():
-        for genre in genre_lookup.get(artist_name, []):
+    for artist_key, ms in artist_ms.items():
+        for genre in genre_lookup.get(artist_key, []):
             genre_weights[_normalize_genre(genre)] = genre_weights.get(_normalize_genre(genre), 0) + ms
 
     if not genre_weights:
@@ -144,6 +137,7 @@ def _get_genres_from_top_tracks(user_id: str, time_range: str, snapshot_at: str)
     return _bucket_genres(genres, snapshot_at)
 
 
+@cache.cached(cache.GENRES)
 def get_genre_distribution(user_id: str, time_range: str) -> List[dict]:
     snapshot_at = datetime.now(tz=timezone.utc).isoformat()
 
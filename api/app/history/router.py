@@ -4,22 +4,27 @@ from fastapi import APIRouter, Depends, Query
 
 from app.auth.session import get_current_user
 from app.auth.spotify import get_spotify_client_for_user
+from app.cache import DATA_HISTORY, DATA_TOP
+from app.conditional import etag
 from app.history import service
 
 router = APIRouter(prefix="/history", tags=["history"])
 
+# History results change with imports; top-track syncs supply album art.
+history_etag = Depends(etag(DATA_HISTORY, DATA_TOP))
 
-@router.get("/stats")
+
+@router.get("/stats", dependencies=[history_etag])
 async def get_stats(user: dict = Depends(get_current_user)):
     return service.get_stats(user["id"])
 
 
-@router.get("/yearly")
+@router.get("/yearly", dependencies=[history_etag])
 async def get_yearly(user: dict = Depends(get_current_user)):
     return service.get_yearly(user["id"])
 
 
-@router.get("/heatmap")
+@router.get("/heatmap", dependencies=[history_etag])
 async def get_heatmap(
     year: Optional[int] = Query(None),
     user: dict = Depends(get_current_user),
@@ -27,14 +32,14 @@ async def get_heatmap(
     return service.get_heatmap(user["id"], year=year)
 
 
-@router.get("/patterns")
+@router.get("/patterns", dependencies=[history_etag])
 async def get_patterns(user: dict = Depends(get_current_user)):
     hours = service.get_hour_pattern(user["id"])
     dow = service.get_dow_pattern(user["id"])
     return {"hours": hours, "dow": dow}
 
 
-@router.get("/top-artists")
+@router.get("/top-artists", dependencies=[history_etag])
 async def get_top_artists(
     year: Optional[int] = Query(None),
     limit: int = Query(25, ge=1, le=100),
@@ -43,7 +48,7 @@ async def get_top_artists(
     return service.get_top_artists(user["id"], year=year, limit=limit)
 
 
-@router.get("/top-tracks")
+@router.get("/top-tracks", dependencies=[history_etag])
 async def get_top_tracks(
     year: Optional[int] = Query(None),
     limit: int = Query(25, ge=1, le=100),
@@ -53,7 +58,7 @@ async def get_top_tracks(
     return service.get_top_tracks(user["id"], year=year, limit=limit, sp=sp)
 
 
-@router.get("/artist-top-tracks")
+@router.get("/artist-top-tracks", dependencies=[history_etag])
 async def get_artist_top_tracks(
     artist_name: str = Query(..., min_length=1),
     limit: int = Query(25, ge=1, le=100),
@@ -3,43 +3,47 @@ from typing import Optional
 
 import spotipy
 
-from app.database import supabase
-
-
-def _rpc(fn: str, params: dict):
-    result = supabase.rpc(fn, params).execute()
-    return result.data
+from app import cache
+from app.artists.identity import get_artist_key
+from app.database import rpc, scan, supabase
 
 
+@cache.cached(cache.HISTORY)
 def get_stats(user_id: str) -> dict:
-    return _rpc("history_stats", {"p_user_id": user_id}) or {}
+    return rpc("history_stats", {"p_user_id": user_id}) or {}
 
 
+@cache.cached(cache.HISTORY)
 def get_yearly(user_id: str) -> list:
-    return _rpc("history_yearly", {"p_user_id": user_id}) or []
+    return rpc("history_yearly", {"p_user_id": user_id}) or []
 
 
+@cache.cached(cache.HISTORY)
 def get_heatmap(user_id: str, year: Optional[int] = None) -> list:
     params = {"p_user_id": user_id, "p_year": year}
-    return _rpc("history_heatmap", params) or []
+    return rpc("history_heatmap", params) or []
 
 
+@cache.cached(cache.HISTORY)
 def get_hour_pattern(user_id: str) -> list:
-    return _rpc("history_hour_pattern", {"p_user_id": user_id}) or []
+    return rpc("history_hour_pattern", {"p_user_id": user_id}) or []
 
 
+@cache.cached(cache.HISTORY)
 def get_dow_pattern(user_id: str) -> list:
-    return _rpc("history_dow_pattern", {"p_user_id": user_id}) or []
+    return rpc("history_dow_pattern", {"p_user_id": user_id}) or []
 
 
+@cache.cached(cache.HISTORY)
 def get_top_artists(user_id: str, year: Optional[int] = None, limit: int = 25) -> list:
     params = {"p_user_id": user_id, "p_year": year, "p_limit": limit}
-    return _rpc("history_top_artists", params) or []
+    return rpc("history_top_artists", params) or []
 
 
+@cache.cached(cache.HISTORY, ignore=("sp",))
 def get_top_tracks(user_id: str, year: Optional[int] = None, limit: int = 25, sp: Optional[spotipy.Spotify] = None) -> list:
     params = {"p_user_id": user_id, "p_year": year, "p_limit": limit}
-    tracks = _rpc("history_top_tracks", params) or []
+    tracks = rpc("history_top_tracks", params) or []
     _attach_album_art_from_saved_tracks(user_id, tracks)
     _attach_album_art_from_spotify(tracks, sp)
     return tracks
@@ -133,18 +137,17 @@ def _attach_album_art_from_saved_tracks(user_id: str, tracks: list) -> None:
                 break
 
 
+@cache.cached(cache.HISTORY, ignore=("sp",))
 def get_artist_top_tracks(user_id: str, artist_name: str, limit: int = 25, sp: Optional[spotipy.Spotify] = None) -> list:
-    result = (
-        supabase.table("streaming_history")
-        .select("track_name, artist_name, spotify_track_uri, ms_played")
-        .eq("user_id", user_id)
-        .ilike("artist_name", artist_name)
-        .limit(50000)
-        .execute()
-    )
+    artist_key = get_artist_key(artist_name)
+
+    def where(query):
+        query = query.eq("user_id", user_id)
+        # Index seek on the artist identity; ILIKE only for names not resolved yet
+        return query.eq("artist_key", artist_key) if artist_key else query.ilike("artist_name", artist_name)
 
     tracks: dict[str, dict] = {}
-    for row in result.data or []:
+    for row in scan("streaming_history", "track_name, artist_name, spotify_track_uri, ms_played", where=where):
         track_name = row.get("track_name") or "Unknown Track"
         artist = row.get("artist_name") or artist_name
         uri = row.get("spotify_track_uri") or f"{artist}:{track_name}"
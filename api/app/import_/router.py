@@ -3,6 +3,8 @@ from typing import List, Optional
 from fastapi import APIRouter, Depends
 
 from app.auth.session import get_current_user
+from app.cache import DATA_HISTORY
+from app.conditional import etag
 from app.import_.models import ImportResult, ImportStatus, StreamingHistoryItemIn
 from app.import_ import service
 
@@ -25,7 +27,11 @@ async def import_streaming_history(
     return result
 
 
-@router.get("/status", response_model=Optional[ImportStatus])
+@router.get(
+    "/status",
+    response_model=Optional[ImportStatus],
+    dependencies=[Depends(etag(DATA_HISTORY))],
+)
 async def get_import_status(
     user: dict = Depends(get_current_user),
 ):
@@ -1,7 +1,8 @@
 from datetime import datetime, timezone
 from typing import List, Optional
 
-from app.database import supabase
+from app import cache
+from app.database import scan, supabase
 from app.import_.models import StreamingHistoryItemIn
 
 
@@ -30,30 +31,34 @@ def upsert_streaming_history(user_id: str, items: List[StreamingHistoryItemIn])
     )
 
     inserted = len(result.data) if result.data else 0
+    if inserted:
+        cache.bump([cache.DATA_HISTORY], user_id)
+
     duplicates_skipped = len(items) - inserted
     return {"imported": inserted, "duplicates_skipped": duplicates_skipped}
 
 
 def get_import_status(user_id: str) -> Optional[dict]:
-    result = (
-        supabase.table("streaming_history")
-        .select("played_at, ms_played")
-        .eq("user_id", user_id)
-        .order("played_at", desc=False)
-        .execute()
-    )
+    # Count plus the two ends of the (user_id, played_at) index — no full scan
+    def edge(desc: bool):
+        return (
+            supabase.table("streaming_history")
+            .select("played_at", count="exact")
+            .eq("user_id", user_id)
+            .order("played_at", desc=desc)
+            .limit(1)
+            .execute()
+        )
 
-    rows = result.data or []
-    if not rows:
+    first = edge(desc=False)
+    if not first.data:
         return None
-
-    dates = [r["played_at"] for r in rows]
-    last_import = max(dates)
+    last = edge(desc=True)
 
     return {
-        "total_streams": len(rows),
-        "date_range": {"from": dates[0][:10], "to": dates[-1][:10]},
-        "last_import": last_import,
+        "total_streams": first.count or 0,
+        "date_range": {"from": first.data[0]["played_at"][:10], "to": last.data[0]["played_at"][:10]},
+        "last_import": last.data[0]["played_at"],
     }
 
 
@@ -62,15 +67,11 @@ def get_play_stats_for_tracks(user_id: str, spotify_track_uris: List[str]) -> di
     if not spotify_track_uris:
         return {}
 
-    result = (
-        supabase.table("streaming_history")
-        .select("spotify_track_uri, ms_played, played_at")
-        .eq("user_id", user_id)
-        .in_("spotify_track_uri", spotify_track_uris)
-        .execute()
+    rows = scan(
+        "streaming_history",
+        "spotify_track_uri, ms_played, played_at",
+        where=lambda q: q.eq("user_id", user_id).in_("spotify_track_uri", spotify_track_uris),
     )
-
-    rows = result.data or []
     stats: dict = {}
     for row in rows:
         uri = row["spotify_track_uri"]
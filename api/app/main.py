@@ -1,5 +1,11 @@
-from fastapi import FastAPI
+import hmac
+from typing import Optional
+
+from fastapi import FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
+from app import metrics
+from app.profiling import ProfilingMiddleware
 from app.config import settings
 from app.auth.router import router as auth_router
 from app.users.router import router as users_router
@@ -19,7 +25,11 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Profile-Id", "ETag"],
 )
+app.add_middleware(ProfilingMiddleware)
+# Added last so it wraps CORS and times the whole request
+app.add_middleware(metrics.MetricsMiddleware)
 
 API_PREFIX = "/api/v1"
 
@@ -37,3 +47,15 @@ app.include_router(history_router, prefix=API_PREFIX)
 @app.get("/health")
 async def health():
     return {"status": "ok"}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics(authorization: Optional[str] = Header(None)):
+    """
+    Prometheus scrape endpoint: per-route request and upstream histograms.
+    Needs `Authorization: Bearer <METRICS_TOKEN>`; without a token set it is off.
+    """
+    expected = f"Bearer {settings.metrics_token}"
+    if not settings.metrics_token or not hmac.compare_digest((authorization or "").encode(), expected.encode()):
+        raise HTTPException(status_code=404, detail="Not Found")
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
@@ -0,0 +1,75 @@
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence
+
+# Mirrors getGenreColor() priority order in GenreMap.tsx
+FAMILY_CHECKS = [
+    ("hip-hop",    ["rap", "hip hop", "hip-hop", "trap", "drill", "grime", "crunk", "bounce", "dirty south"]),
+    ("r-and-b",    ["r&b", "rnb", "soul", "funk", "gospel", "motown", "neo soul", "quiet storm", "contemporary r", "urban"]),
+    ("pop",        ["pop", "boy band", "girl group", "bubblegum", "europop", "k-pop", "j-pop", "c-pop"]),
+    ("rock",       ["rock", "metal", "punk", "grunge", "hardcore", "emo", "screamo", "post-hardcore", "nu metal", "garage"]),
+    ("indie",      ["indie", "alternative", "alt ", "lo-fi", "lo fi", "bedroom", "college", "jangle"]),
+    ("electronic", ["electronic", "edm", "house", "techno", "trance", "dubstep", "drum and bass", "dnb", "electro", "ambient", "synthwave", "synth", "dance", "club", "rave", "bass", "beats", "chillwave", "vaporwave", "vapor", "wave"]),
+    ("folk",       ["folk", "country", "americana", "bluegrass", "western", "cowboy", "outlaw", "red dirt", "roots"]),
+    ("jazz",       ["jazz", "blues", "swing", "bebop", "bossa", "soul jazz", "latin jazz"]),
+    ("classical",  ["classical", "baroque", "orchestra", "opera", "chamber", "symphony", "choral", "choir", "piano", "string"]),
+    ("dream",      ["dream", "shoegaze", "slowcore", "witch", "goth", "dark", "atmospheric", "ethereal", "noise", "post rock", "post-rock"]),
+    ("latin",      ["latin", "reggaeton", "salsa", "cumbia", "bachata", "samba", "flamenco", "tropical"]),
+    ("reggae",     ["reggae", "ska", "dub", "dancehall", "afrobeat", "afropop"]),
+]
+
+FAMILY_LABELS = {
+    "hip-hop":    "Hip-Hop",
+    "r-and-b":    "R&B",
+    "pop":        "Pop",
+    "rock":       "Rock",
+    "indie":      "Indie / Alt",
+    "electronic": "Electronic",
+    "folk":       "Folk",
+    "jazz":       "Jazz",
+    "classical":  "Classical",
+    "dream":      "Dream",
+    "latin":      "Latin",
+    "reggae":     "Reggae",
+}
+
+OTHER = "other"
+
+# keyword → priority index of the first family that lists it
+_KEYWORD_PRIORITY: Dict[str, int] = {}
+for _i, (_family, _keywords) in enumerate(FAMILY_CHECKS):
+    for _kw in _keywords:
+        _KEYWORD_PRIORITY.setdefault(_kw, _i)
+
+# One zero-width lookahead alternation, keywords ordered by family priority.
+# At each offset the regex engine returns the highest-priority keyword that
+# starts there, so the minimum over all offsets is the same family the old
+# per-family `any(kw in g ...)` scan picked.
+_FAMILY_PATTERN = re.compile(
+    "(?=({}))".format("|".join(
+        re.escape(kw) for kw in sorted(_KEYWORD_PRIORITY, key=lambda k: _KEYWORD_PRIORITY[k])
+    ))
+)
+
+
+@lru_cache(maxsize=16_384)
+def classify_family(genre: str) -> str:
+    """Return the genre family for a raw genre tag, or 'other' if nothing matches."""
+    best = len(FAMILY_CHECKS)
+    for match in _FAMILY_PATTERN.finditer(genre.lower()):
+        best = min(best, _KEYWORD_PRIORITY[match.group(1)])
+        if best == 0:
+            break
+    return FAMILY_CHECKS[best][0] if best < len(FAMILY_CHECKS) else OTHER
+
+
+def resolve_families(genres: Sequence[str], families: Optional[Sequence[Optional[str]]]) -> List[str]:
+    """
+    Pair each genre with its family, preferring the value persisted in genre_families.
+
+    Genres that have not been classified in the database yet (NULL family, or an
+    older RPC that returns no families at all) fall back to classify_family().
+    """
+    stored = list(families or [])
+    stored.extend([None] * (len(genres) - len(stored)))
+    return [fam or classify_family(g) for g, fam in zip(genres, stored)]
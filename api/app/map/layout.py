@@ -0,0 +1,128 @@
+import hashlib
+import json
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from app import cache
+
+LAYOUT_ITERATIONS = 120
+# Layouts depend only on graph structure, so they are cached by graph hash in
+# the shared slot of the LAYOUT namespace — users with identical graphs share one.
+LAYOUT_CACHE_TTL_SECS = 24 * 3600
+GRAVITY = 0.5
+
+
+def graph_hash(node_ids: Iterable[str], links: Iterable[Tuple[str, str]]) -> str:
+    """Stable hash of a graph's structure — node ids plus undirected links, order-independent."""
+    payload = json.dumps(
+        [sorted(set(node_ids)), sorted({tuple(sorted(l)) for l in links})],
+        separators=(",", ":"),
+    )
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def _force_directed(n: int, src: np.ndarray, dst: np.ndarray, seed: int) -> np.ndarray:
+    """
+    Vectorized Fruchterman–Reingold layout in the [-1, 1] square.
+
+    Repulsion for all node pairs is one n×n weight matrix per iteration
+    (Σ_j w_ij (p_i − p_j) = p_i Σ_j w_ij − W·p), attraction is only evaluated
+    along links, and a weak pull towards the origin keeps disconnected
+    components on screen.
+    """
+    if n == 1:
+        return np.zeros((1, 2))
+
+    rng = np.random.default_rng(seed)
+    pos = rng.uniform(-1.0, 1.0, size=(n, 2))
+
+    k = np.sqrt(4.0 / n)
+    k2 = k * k
+    temperature = 0.2
+    cooling = temperature / (LAYOUT_ITERATIONS + 1)
+
+    for _ in range(LAYOUT_ITERATIONS):
+        sq = (pos * pos).sum(axis=1)
+        dist2 = np.maximum(sq[:, None] + sq[None, :] - 2.0 * pos @ pos.T, 1e-6)
+        weights = k2 / dist2
+        np.fill_diagonal(weights, 0.0)
+        disp = pos * weights.sum(axis=1)[:, None] - weights @ pos
+
+        if len(src):
+            edge = pos[src] - pos[dst]
+            edge_len = np.sqrt((edge * edge).sum(axis=1))
+            pull = edge * (edge_len / k)[:, None]
+            np.add.at(disp, src, -pull)
+            np.add.at(disp, dst, pull)
+
+        disp -= pos * (GRAVITY * np.sqrt(sq) / k)[:, None]
+
+        length = np.maximum(np.sqrt((disp * disp).sum(axis=1)), 1e-9)
+        pos += disp * (np.minimum(length, temperature) / length)[:, None]
+        temperature -= cooling
+
+    pos -= pos.mean(axis=0)
+    scale = np.abs(pos).max()
+    return pos / scale if scale > 0 else pos
+
+
+def compute_layout(node_ids: List[str], links: List[Tuple[str, str]]) -> Tuple[str, Dict[str, Tuple[float, float]], bool]:
+    """
+    Return (graph_hash, {node_id: (x, y)}, cache_hit) for a graph.
+
+    Coordinates are normalized to [-1, 1]; the client scales them to its viewport.
+    """
+    ids = list(dict.fromkeys(node_ids))
+    index = {node_id: i for i, node_id in enumerate(ids)}
+    edges = [(s, t) for s, t in links if s in index and t in index and s != t]
+    key = graph_hash(ids, edges)
+    if not ids:
+        return key, {}, False
+
+    hit = True
+
+    def build() -> Dict[str, Tuple[float, float]]:
+        nonlocal hit
+        hit = False
+        src = np.array([index[s] for s, _ in edges], dtype=np.intp)
+        dst = np.array([index[t] for _, t in edges], dtype=np.intp)
+        pos = _force_directed(len(ids), src, dst, seed=int(key[:8], 16))
+        return {node_id: (round(float(x), 4), round(float(y), 4)) for node_id, (x, y) in zip(ids, pos)}
+
+    positions = cache.get_or_set(cache.LAYOUT, None, {"graph": key}, build, ttl=LAYOUT_CACHE_TTL_SECS)
+    return key, positions, hit
+
+
+def _attach(nodes: List[dict], positions: Dict[str, Tuple[float, float]]) -> List[dict]:
+    """Copies of nodes with x/y added — the input may be a cached payload."""
+    placed = []
+    for node in nodes:
+        pos = positions.get(node["id"])
+        placed.append({**node, "x": pos[0], "y": pos[1]} if pos else node)
+    return placed
+
+
+def apply_genre_map_layout(data: dict) -> dict:
+    """A copy of a get_genre_map() payload with x/y on every node and the layout hash."""
+    node_ids = [n["id"] for key in ("parent_nodes", "genre_nodes", "artist_nodes") for n in data[key]]
+    links = [
+        (l["source"], l["target"])
+        for key in ("parent_genre_links", "genre_artist_links", "parent_artist_links")
+        for l in data[key]
+    ]
+    key, positions, cached = compute_layout(node_ids, links)
+    data = {**data, **{k: _attach(data[k], positions) for k in ("parent_nodes", "genre_nodes", "artist_nodes")}}
+    data["layout"] = {"hash": key, "cached": cached}
+    return data
+
+
+def apply_artist_map_layout(data: dict) -> dict:
+    """A copy of a get_artist_map() payload with x/y on every node and the layout hash."""
+    node_ids = [n["id"] for key in ("artist_nodes", "track_nodes") for n in data[key]]
+    links = [(l["source"], l["target"]) for l in data["artist_links"]]
+    links += [(t["artist_id"], t["id"]) for t in data["track_nodes"]]
+    key, positions, cached = compute_layout(node_ids, links)
+    data = {**data, **{k: _attach(data[k], positions) for k in ("artist_nodes", "track_nodes")}}
+    data["layout"] = {"hash": key, "cached": cached}
+    return data
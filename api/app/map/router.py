@@ -1,31 +1,71 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 
 from app.auth.session import get_current_user
+from app.cache import DATA_GENRES, DATA_HISTORY, DATA_TOP
+from app.conditional import etag
+from app.map import layout as map_layout
 from app.map import service
 
 router = APIRouter(prefix="/map", tags=["map"])
 
 VALID_RANGES = {"short_term", "medium_term", "long_term"}
 
+# The genre map reads history over a rolling window plus artist genres; the
+# artist map reads only the synced top lists.
+genre_map_etag = Depends(etag(DATA_HISTORY, DATA_GENRES, rolling=True))
+artist_map_etag = Depends(etag(DATA_TOP))
+
 
 def _validate_range(range: str) -> None:
     if range not in VALID_RANGES:
         raise HTTPException(status_code=400, detail=f"range must be one of {VALID_RANGES}")
 
 
-@router.get("/genres")
+@router.get("/genres", dependencies=[genre_map_etag])
 async def get_genre_map(
+    range: str = Query("short_term"),
+    layout: bool = Query(False),
+    user: dict = Depends(get_current_user),
+):
+    _validate_range(range)
+    data = service.get_genre_map(user_id=user["id"], time_range=range)
+    return map_layout.apply_genre_map_layout(data) if layout else data
+
+
+@router.get("/genres/families", dependencies=[genre_map_etag])
+async def get_genre_map_families(
+    range: str = Query("short_term"),
+    user: dict = Depends(get_current_user),
+):
+    """Top level of the genre map: families with aggregate listening weight."""
+    _validate_range(range)
+    return service.get_genre_map_families(user_id=user["id"], time_range=range)
+
+
+@router.get("/genres/families/{family}", dependencies=[genre_map_etag])
+async def get_genre_map_family(
+    family: str,
     range: str = Query("short_term"),
     user: dict = Depends(get_current_user),
 ):
+    """Expand one family into its subgenres and artists."""
     _validate_range(range)
-    return service.get_genre_map(user_id=user["id"], time_range=range)
+    data = service.get_genre_map_family(user_id=user["id"], time_range=range, family=family)
+    if data is None:
+        raise HTTPException(status_code=404, detail=f"no genre family '{family}' in this range")
+    return data
 
 
-@router.get("/artists")
+@router.get("/artists", dependencies=[artist_map_etag])
 async def get_artist_map(
     range: str = Query("short_term"),
+    top_k: int = Query(service.ARTIST_LINK_TOP_K, ge=1, le=50),
+    metric: str = Query("jaccard"),
+    layout: bool = Query(False),
     user: dict = Depends(get_current_user),
 ):
     _validate_range(range)
-    return service.get_artist_map(user_id=user["id"], time_range=range)
+    if metric not in service.SIMILARITY_METRICS:
+        raise HTTPException(status_code=400, detail=f"metric must be one of {service.SIMILARITY_METRICS}")
+    data = service.get_artist_map(user_id=user["id"], time_range=range, top_k=top_k, metric=metric)
+    return map_layout.apply_artist_map_layout(data) if layout else data
@@ -3,47 +3,11 @@ from datetime import datetime, timedelta, timezone
 from itertools import combinations
 from typing import List, Optional
 
-from app.database import supabase
-
-# Mirrors getGenreColor() priority order in GenreMap.tsx
-_FAMILY_CHECKS = [
-    ("hip-hop",    ["rap", "hip hop", "hip-hop", "trap", "drill", "grime", "crunk", "bounce", "dirty south"]),
-    ("r-and-b",    ["r&b", "rnb", "soul", "funk", "gospel", "motown", "neo soul", "quiet storm", "contemporary r", "urban"]),
-    ("pop",        ["pop", "boy band", "girl group", "bubblegum", "europop", "k-pop", "j-pop", "c-pop"]),
-    ("rock",       ["rock", "metal", "punk", "grunge", "hardcore", "emo", "screamo", "post-hardcore", "nu metal", "garage"]),
-    ("indie",      ["indie", "alternative", "alt ", "lo-fi", "lo fi", "bedroom", "college", "jangle"]),
-    ("electronic", ["electronic", "edm", "house", "techno", "trance", "dubstep", "drum and bass", "dnb", "electro", "ambient", "synthwave", "synth", "dance", "club", "rave", "bass", "beats", "chillwave", "vaporwave", "vapor", "wave"]),
-    ("folk",       ["folk", "country", "americana", "bluegrass", "western", "cowboy", "outlaw", "red dirt", "roots"]),
-    ("jazz",       ["jazz", "blues", "swing", "bebop", "bossa", "soul jazz", "latin jazz"]),
-    ("classical",  ["classical", "baroque", "orchestra", "opera", "chamber", "symphony", "choral", "choir", "piano", "string"]),
-    ("dream",      ["dream", "shoegaze", "slowcore", "witch", "goth", "dark", "atmospheric", "ethereal", "noise", "post rock", "post-rock"]),
-    ("latin",      ["latin", "reggaeton", "salsa", "cumbia", "bachata", "samba", "flamenco", "tropical"]),
-    ("reggae",     ["reggae", "ska", "dub", "dancehall", "afrobeat", "afropop"]),
-]
-
-_FAMILY_LABELS = {
-    "hip-hop":    "Hip-Hop",
-    "r-and-b":    "R&B",
-    "pop":        "Pop",
-    "rock":       "Rock",
-    "indie":      "Indie / Alt",
-    "electronic": "Electronic",
-    "folk":       "Folk",
-    "jazz":       "Jazz",
-    "classical":  "Classical",
-    "dream":      "Dream",
-    "latin":      "Latin",
-    "reggae":     "Reggae",
-}
-
-
-def _classify_family(genre: str) -> str:
-    g = genre.lower()
-    for family, keywords in _FAMILY_CHECKS:
-        if any(kw in g for kw in keywords):
-            return family
-    return "other"
+import numpy as np
 
+from app import cache
+from app.database import rpc, supabase
+from app.map.families import FAMILY_LABELS, OTHER, resolve_families
 
 _RANGE_CONFIG = {
     # (start_offset_days | None, min_total_ms)
@@ -61,16 +25,17 @@ def _time_range_params(time_range: str) -> dict:
     return {"p_start_date": start_date, "p_min_total_ms": min_ms}
 
 
+@cache.cached(cache.GENRE_MAP)
 def get_genre_map(user_id: str, time_range: str) -> dict:
     params: dict = {"p_user_id": user_id, **_time_range_params(time_range)}
 
-    rows = (
-        supabase.rpc("get_map_artists", params).execute()
-    ).data or []
+    rows = rpc("get_map_artists", params) or []
 
     artist_genres_merged: dict = defaultdict(set)
     artist_play_count: dict = defaultdict(int)
     artist_ms: dict = defaultdict(int)
+    # genre → family, read from genre_families via the RPC (classified once per genre)
+    family_of: dict = {}
 
     for row in rows:
         name = row.get("artist_name", "")
@@ -78,8 +43,10 @@ def get_genre_map(user_id: str, time_range: str) -> dict:
             continue
         artist_play_count[name] = row.get("play_count", 0)
         artist_ms[name] = row.get("total_ms_played", 0)
-        for genre in (row.get("genres") or []):
+        genres = row.get("genres") or []
+        for genre, family in zip(genres, resolve_families(genres, row.get("families"))):
             artist_genres_merged[name].add(genre)
+            family_of[genre] = family
 
     genre_artist_pairs: set = set()
     genre_to_artists: dict = defaultdict(set)
@@ -91,9 +58,9 @@ def get_genre_map(user_id: str, time_range: str) -> dict:
 
     # Classify and immediately drop "other" — unclassified genres add noise without structure
     genre_family: dict = {
-        g: _classify_family(g)
+        g: family_of[g]
         for g in genre_to_artists
-        if _classify_family(g) != "other"
+        if family_of[g] != OTHER
     }
     # Rebuild genre_to_artists keeping only classified genres
     genre_to_artists = {g: genre_to_artists[g] for g in genre_family}
@@ -138,14 +105,14 @@ def get_genre_map(user_id: str, time_range: str) -> dict:
         family_after[fam] += 1
     print("[genre_map] subgenre reduction per family:")
     for fam in sorted(set(list(family_before.keys()) + list(family_after.keys()))):
-        label = _FAMILY_LABELS.get(fam, fam)
+        label = FAMILY_LABELS.get(fam, fam)
         print(f"  {label}: {family_before.get(fam, 0)} → {family_after.get(fam, 0)}")
 
     # ── Orphaned artists: all their subgenres were filtered out ───────────────
     artists_with_subgenres = {a for _, a in genre_artist_pairs}
     all_classified_artists = {
         a for a in artist_genres_merged
-        if any(_classify_family(g) != "other" for g in artist_genres_merged[a])
+        if any(family_of[g] != OTHER for g in artist_genres_merged[a])
     }
     orphaned: set = all_classified_artists - artists_with_subgenres
 
@@ -154,8 +121,8 @@ def get_genre_map(user_id: str, time_range: str) -> dict:
     for a in orphaned:
         votes: dict = defaultdict(int)
         for g in artist_genres_merged[a]:
-            fam = _classify_family(g)
-            if fam != "other":
+            fam = family_of[g]
+            if fam != OTHER:
                 votes[fam] += 1
         if votes:
             orphan_family[a] = max(votes, key=lambda f: votes[f])
@@ -178,7 +145,7 @@ def get_genre_map(user_id: str, time_range: str) -> dict:
     parent_nodes = [
         {
             "id": f"parent:{family}",
-            "label": _FAMILY_LABELS.get(family, family.title()),
+            "label": FAMILY_LABELS.get(family, family.title()),
             "family": family,
             "total_ms": family_ms[family],
         }
@@ -236,7 +203,158 @@ def get_genre_map(user_id: str, time_range: str) -> dict:
     }
 
 
-def get_artist_map(user_id: str, time_range: str) -> dict:
+# ── Level-of-detail genre map ────────────────────────────────────────────────
+# The LOD endpoints serve slices of the full genre map. The full graph
+# (get_genre_map) and every slice derived from it are cached per (user, range)
+# in the GENRE_MAP namespace, so expanding families one at a time costs one
+# RPC, not one per click, and an import invalidates them all together.
+LOD_CACHE_TTL_SECS = 300
+
+
+def get_genre_map_families(user_id: str, time_range: str) -> dict:
+    """
+    Top LOD level: one node per genre family with aggregate weights, plus
+    family↔family links summed from the subgenre affinity links that cross families.
+    """
+    def build() -> dict:
+        data = get_genre_map(user_id, time_range)
+        genre_family = {g["id"]: g["family"] for g in data["genre_nodes"]}
+
+        subgenre_count: dict = defaultdict(int)
+        for g in data["genre_nodes"]:
+            subgenre_count[g["family"]] += 1
+
+        family_artists: dict = defaultdict(set)
+        for link in data["genre_artist_links"]:
+            family_artists[genre_family[link["source"]]].add(link["target"])
+        for link in data["parent_artist_links"]:
+            family_artists[link["source"].removeprefix("parent:")].add(link["target"])
+
+        family_shared: dict = defaultdict(int)
+        for link in data["genre_affinity_links"]:
+            fam_a, fam_b = sorted((genre_family[link["source"]], genre_family[link["target"]]))
+            if fam_a != fam_b:
+                family_shared[(fam_a, fam_b)] += link["shared"]
+
+        return {
+            "family_nodes": [
+                {
+                    **p,
+                    "subgenre_count": subgenre_count[p["family"]],
+                    "artist_count": len(family_artists[p["family"]]),
+                }
+                for p in sorted(data["parent_nodes"], key=lambda p: p["total_ms"], reverse=True)
+            ],
+            "family_links": [
+                {"source": f"parent:{a}", "target": f"parent:{b}", "shared": shared}
+                for (a, b), shared in family_shared.items()
+            ],
+        }
+
+    params = {"level": "families", "time_range": time_range}
+    return cache.get_or_set(cache.GENRE_MAP, user_id, params, build, ttl=LOD_CACHE_TTL_SECS)
+
+
+def get_genre_map_family(user_id: str, time_range: str, family: str) -> Optional[dict]:
+    """
+    Second LOD level: the subgenres and artists under one family, in the same
+    node/link shape as get_genre_map(). Returns None if the user has no such family.
+    """
+    def build() -> Optional[dict]:
+        data = get_genre_map(user_id, time_range)
+        parent_id = f"parent:{family}"
+        parent = next((p for p in data["parent_nodes"] if p["id"] == parent_id), None)
+        if parent is None:
+            return None
+
+        genre_ids = {g["id"] for g in data["genre_nodes"] if g["family"] == family}
+        genre_artist_links = [l for l in data["genre_artist_links"] if l["source"] in genre_ids]
+        parent_artist_links = [l for l in data["parent_artist_links"] if l["source"] == parent_id]
+        artist_ids = {l["target"] for l in genre_artist_links} | {l["target"] for l in parent_artist_links}
+
+        return {
+            "parent_node": parent,
+            "genre_nodes": [g for g in data["genre_nodes"] if g["id"] in genre_ids],
+            "artist_nodes": [a for a in data["artist_nodes"] if a["id"] in artist_ids],
+            "parent_genre_links": [l for l in data["parent_genre_links"] if l["source"] == parent_id],
+            "genre_artist_links": genre_artist_links,
+            "parent_artist_links": parent_artist_links,
+            "genre_affinity_links": [
+                l for l in data["genre_affinity_links"]
+                if l["source"] in genre_ids and l["target"] in genre_ids
+            ],
+        }
+
+    params = {"level": "family", "time_range": time_range, "family": family}
+    return cache.get_or_set(cache.GENRE_MAP, user_id, params, build, ttl=LOD_CACHE_TTL_SECS)
+
+
+ARTIST_LINK_TOP_K = 5
+SIMILARITY_METRICS = {"jaccard", "cosine"}
+
+
+def _top_k_artist_links(artists: List[dict], top_k: int, metric: str) -> List[dict]:
+    """
+    Link each artist to its top_k most similar artists by shared genres.
+
+    Builds a dense artist×genre incidence matrix (top lists are ≤ 50 artists),
+    scores every pair with one matrix product, and keeps only each artist's
+    best top_k neighbours. An edge survives if either endpoint ranks the other
+    in its top_k, so the result holds at most len(artists) * top_k links
+    regardless of how broad the shared genres are.
+    """
+    genre_sets = [set(a.get("genres") or []) for a in artists]
+    genre_index: dict = {}
+    for genres in genre_sets:
+        for g in genres:
+            genre_index.setdefault(g, len(genre_index))
+    if len(artists) < 2 or not genre_index:
+        return []
+
+    incidence = np.zeros((len(artists), len(genre_index)), dtype=np.float32)
+    for i, genres in enumerate(genre_sets):
+        incidence[i, [genre_index[g] for g in genres]] = 1.0
+
+    shared = incidence @ incidence.T
+    sizes = incidence.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if metric == "cosine":
+            scores = shared / np.sqrt(np.outer(sizes, sizes))
+        else:
+            scores = shared / (sizes[:, None] + sizes[None, :] - shared)
+    scores = np.nan_to_num(scores)
+    np.fill_diagonal(scores, 0.0)
+
+    k = min(top_k, len(artists) - 1)
+    neighbours = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+
+    pairs: set = set()
+    for i, row in enumerate(neighbours):
+        for j in row:
+            if scores[i, j] > 0:
+                pairs.add((min(i, int(j)), max(i, int(j))))
+
+    links = []
+    for i, j in pairs:
+        shared_genres = sorted(genre_sets[i] & genre_sets[j])
+        links.append({
+            "source": artists[i]["spotify_artist_id"],
+            "target": artists[j]["spotify_artist_id"],
+            "shared_genres": shared_genres,
+            "n": len(shared_genres),
+            "score": round(float(scores[i, j]), 4),
+        })
+    links.sort(key=lambda l: l["score"], reverse=True)
+    return links
+
+
+@cache.cached(cache.ARTIST_MAP)
+def get_artist_map(
+    user_id: str,
+    time_range: str,
+    top_k: int = ARTIST_LINK_TOP_K,
+    metric: str = "jaccard",
+) -> dict:
     artists_result = (
         supabase.table("top_artists")
         .select("spotify_artist_id, artist_name, artist_image_url, rank, genres")
@@ -280,20 +398,7 @@ def get_artist_map(user_id: str, time_range: str) -> dict:
                 "artist_id": artist_rec["spotify_artist_id"],
             })
 
-    artist_links: List[dict] = []
-    for i, j in combinations(range(len(artists)), 2):
-        a_i = artists[i]
-        a_j = artists[j]
-        genres_i = set(a_i.get("genres") or [])
-        genres_j = set(a_j.get("genres") or [])
-        shared = list(genres_i & genres_j)
-        if shared:
-            artist_links.append({
-                "source": a_i["spotify_artist_id"],
-                "target": a_j["spotify_artist_id"],
-                "shared_genres": shared,
-                "n": len(shared),
-            })
+    artist_links = _top_k_artist_links(artists, top_k=top_k, metric=metric)
 
     return {
         "artist_nodes": artist_nodes,
@@ -0,0 +1,288 @@
+"""
+Per-request accounting of upstream calls, exported as Prometheus metrics.
+
+MetricsMiddleware opens a RequestStats for every request. The supabase-py
+HTTP client, the direct Postgres backend and each Spotify client's session
+report their calls into it through record(), with the time, bytes received
+and rows returned. The totals so far go out in a Server-Timing header. The
+request's latency is recorded when the last body chunk is sent, so
+background tasks the response runs afterwards don't count; the upstream
+totals go into the per-route histograms rendered at /metrics once the app
+returns.
+
+Work handed to a thread pool only counts towards the request if it is
+wrapped with bind(); anything else is labelled route="background".
+"""
+
+import bisect
+import contextvars
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence
+
+import requests
+
+UPSTREAMS = ("db", "rpc", "spotify")
+BACKGROUND_ROUTE = "background"
+# Unmatched paths share one label so 404 probes can't blow up cardinality.
+UNMATCHED_ROUTE = "unmatched"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CALL_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250)
+BYTES_BUCKETS = (1_024, 10_240, 102_400, 1_048_576, 10_485_760)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Sequence[str]):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: tuple, value: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labels, labels)} {value:g}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: Sequence[str], buckets: Sequence[float]):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # labels -> per-bucket counts (not cumulative), then sum and count
+        self._series: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: tuple, value: float) -> None:
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * len(self.buckets) + [0.0, 0]
+            i = bisect.bisect_left(self.buckets, value)
+            if i < len(self.buckets):
+                series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series):
+                    cumulative += count
+                    le = _labels(self.labels, labels, f'le="{bound:g}"')
+                    lines.append(f"{self.name}_bucket{le} {cumulative}")
+                le = _labels(self.labels, labels, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{le} {series[-1]}")
+                lines.append(f"{self.name}_sum{_labels(self.labels, labels)} {series[-2]:g}")
+                lines.append(f"{self.name}_count{_labels(self.labels, labels)} {series[-1]}")
+        return lines
+
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Request latency by route.",
+    ("method", "route", "status"), LATENCY_BUCKETS,
+)
+UPSTREAM_CALL_SECONDS = Histogram(
+    "upstream_call_duration_seconds", "Latency of individual upstream calls.",
+    ("route", "upstream"), LATENCY_BUCKETS,
+)
+UPSTREAM_SECONDS = Histogram(
+    "upstream_seconds_per_request", "Time spent in each upstream per request.",
+    ("route", "upstream"), LATENCY_BUCKETS,
+)
+UPSTREAM_CALLS = Histogram(
+    "upstream_calls_per_request", "Upstream calls made per request.",
+    ("route", "upstream"), CALL_BUCKETS,
+)
+UPSTREAM_BYTES = Histogram(
+    "upstream_bytes_per_request", "Upstream response bytes received per request.",
+    ("route", "upstream"), BYTES_BUCKETS,
+)
+UPSTREAM_ROWS = Counter(
+    "upstream_rows_total", "Rows returned by database calls.",
+    ("route", "upstream"),
+)
+
+REGISTRY = [REQUEST_SECONDS, UPSTREAM_CALL_SECONDS, UPSTREAM_SECONDS, UPSTREAM_CALLS, UPSTREAM_BYTES, UPSTREAM_ROWS]
+
+
+class RequestStats:
+    """Upstream totals for one request: [calls, seconds, bytes, rows] per upstream."""
+
+    def __init__(self, scope: dict):
+        self.scope = scope
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+        self.totals = {upstream: [0, 0.0, 0, 0] for upstream in UPSTREAMS}
+        self._lock = threading.Lock()
+
+    @property
+    def route(self) -> str:
+        # FastAPI stores the matched APIRoute in the scope during routing
+        route = self.scope.get("route")
+        return getattr(route, "path", None) or UNMATCHED_ROUTE
+
+    def add(self, upstream: str, seconds: float, nbytes: int, rows: int) -> None:
+        with self._lock:
+            t = self.totals[upstream]
+            t[0] += 1
+            t[1] += seconds
+            t[2] += nbytes
+            t[3] += rows
+
+    def server_timing(self) -> str:
+        parts = []
+        for upstream, (calls, seconds, nbytes, _) in self.totals.items():
+            if calls:
+                parts.append(f'{upstream};dur={seconds * 1000:.1f};desc="{calls} calls, {nbytes / 1024:.0f} KB"')
+        parts.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.1f}")
+        return ", ".join(parts)
+
+    def observe_latency(self, method: str, status: int) -> None:
+        """Record the request's latency, once, when its response is complete."""
+        if self.finished is None:
+            self.finished = time.perf_counter()
+            REQUEST_SECONDS.observe((method, self.route, str(status)), self.finished - self.started)
+
+    def observe_upstreams(self) -> None:
+        route = self.route
+        for upstream, (calls, seconds, nbytes, _) in self.totals.items():
+            UPSTREAM_CALLS.observe((route, upstream), calls)
+            if calls:
+                UPSTREAM_SECONDS.observe((route, upstream), seconds)
+                UPSTREAM_BYTES.observe((route, upstream), nbytes)
+
+
+_current: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar("request_stats", default=None)
+
+
+def record(upstream: str, seconds: float, nbytes: int = 0, rows: int = 0) -> None:
+    """Account one upstream call to the current request."""
+    stats = _current.get()
+    route = stats.route if stats else BACKGROUND_ROUTE
+    UPSTREAM_CALL_SECONDS.observe((route, upstream), seconds)
+    if rows:
+        UPSTREAM_ROWS.inc((route, upstream), rows)
+    if stats:
+        stats.add(upstream, seconds, nbytes, rows)
+
+
+def bind(fn: Callable) -> Callable:
+    """Wrap fn so calls it makes from a worker thread count towards the current request."""
+    stats = _current.get()
+    if stats is None:
+        return fn
+
+    def bound(*args, **kwargs):
+        token = _current.set(stats)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _current.reset(token)
+    return bound
+
+
+def render() -> str:
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """ASGI middleware that opens a RequestStats per HTTP request and reports it."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope)
+        token = _current.set(stats)
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", stats.server_timing().encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+            # Starlette runs the response's background tasks after this, inside the app call
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                stats.observe_latency(scope["method"], status)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            stats.observe_latency(scope["method"], status)  # no-op unless the body never finished
+            stats.observe_upstreams()
+
+
+def _postgrest_rows(response) -> int:
+    # PostgREST reports the returned range as "first-last/total" or "*/total"
+    content_range = response.headers.get("content-range", "")
+    span = content_range.split("/")[0]
+    if "-" in span:
+        first, last = span.split("-", 1)
+        try:
+            return int(last) - int(first) + 1
+        except ValueError:
+            return 0
+    if content_range:
+        return 0
+    return 1 if response.content else 0
+
+
+def instrument_postgrest(session) -> None:
+    """Report every request made through a postgrest-py httpx client."""
+    def on_response(response) -> None:
+        response.read()  # elapsed is only set once the body is consumed
+        upstream = "rpc" if "/rpc/" in response.request.url.path else "db"
+        record(upstream, response.elapsed.total_seconds(), len(response.content), _postgrest_rows(response))
+
+    hooks = session.event_hooks
+    hooks["response"].append(on_response)
+    session.event_hooks = hooks
+
+
+def _on_spotify_response(response: requests.Response, *args, **kwargs) -> None:
+    started = time.perf_counter()
+    nbytes = len(response.content)
+    record("spotify", response.elapsed.total_seconds() + time.perf_counter() - started, nbytes)
+
+
+def spotify_session() -> requests.Session:
+    """A requests session for spotipy clients that reports every call."""
+    session = requests.Session()
+    session.hooks["response"].append(_on_spotify_response)
+    return session
@@ -0,0 +1,181 @@
+"""
+On-demand profiling of individual requests.
+
+An admin (ADMIN_SPOTIFY_IDS) adds `X-Profile: 1` to a request — and, to
+reproduce another user's slow call on their data, `X-Profile-User: <spotify
+id>` to run a GET as that user (see get_current_user). The handler then runs
+under pyinstrument's sampling profiler with tracemalloc on. A speedscope
+profile (open it at https://www.speedscope.app for a flamegraph) and a JSON
+summary with the top allocations, tagged with route and user, are written to
+PROFILE_DIR; the response names them in `X-Profile-Id`.
+
+Requests without the header only pay for a scan of their header list.
+tracemalloc is process-wide, so allocations made by concurrent requests
+show up in the summary too.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Optional
+
+from app.auth.session import (
+    PROFILE_HEADER,
+    PROFILE_USER_HEADER,
+    PROFILING_STATE,
+    decode_session_token,
+    is_admin,
+)
+from app.config import settings
+
+SAMPLE_INTERVAL_SECS = 0.001
+TOP_ALLOCATIONS = 25
+
+_PROFILE_HEADER = PROFILE_HEADER.encode()
+_PROFILE_USER_HEADER = PROFILE_USER_HEADER.encode()
+_SLUG = re.compile(r"[^A-Za-z0-9]+")
+
+_tracing_lock = threading.Lock()
+_tracing_requests = 0
+_tracing_started = False
+
+
+def _start_tracing() -> None:
+    global _tracing_requests, _tracing_started
+    with _tracing_lock:
+        if _tracing_requests == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracing_started = True
+        _tracing_requests += 1
+
+
+def _stop_tracing() -> None:
+    global _tracing_requests, _tracing_started
+    with _tracing_lock:
+        _tracing_requests -= 1
+        if _tracing_requests == 0 and _tracing_started:
+            tracemalloc.stop()
+            _tracing_started = False
+
+
+def _header(scope: dict, name: bytes) -> Optional[str]:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+def _admin_id(scope: dict) -> Optional[str]:
+    """Spotify id of the caller if they are an admin, else None."""
+    authorization = _header(scope, b"authorization") or ""
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        spotify_id = decode_session_token(token).get("sub")
+    except Exception:
+        return None
+    return spotify_id if is_admin(spotify_id) else None
+
+
+def _allocations(before: tracemalloc.Snapshot, after: tracemalloc.Snapshot) -> list:
+    """Net allocations during the request by source line, largest first."""
+    stats = [s for s in after.compare_to(before, "lineno") if s.size_diff > 0]
+    return [
+        {
+            "where": f"{s.traceback[0].filename}:{s.traceback[0].lineno}",
+            "size_kb": round(s.size_diff / 1024, 1),
+            "count": s.count_diff,
+        }
+        for s in stats[:TOP_ALLOCATIONS]
+    ]
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that profiles requests carrying X-Profile from an admin."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not any(key == _PROFILE_HEADER for key, _ in scope["headers"]):
+            await self.app(scope, receive, send)
+            return
+
+        admin = _admin_id(scope)
+        if admin is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            from pyinstrument import Profiler
+            from pyinstrument.renderers import SpeedscopeRenderer
+        except ImportError:
+            print("Profiling requested but pyinstrument is not installed")
+            await self.app(scope, receive, send)
+            return
+
+        user = _header(scope, _PROFILE_USER_HEADER) if scope["method"] == "GET" else None
+        user = user or admin
+        tags = {"status": 500, "id": None}
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                route = getattr(scope.get("route"), "path", None) or scope["path"]
+                stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+                tags["id"] = f"{stamp}_{_SLUG.sub('-', route).strip('-')}_{_SLUG.sub('-', user)}"
+                tags["route"] = route
+                tags["status"] = message["status"]
+                message = {**message, "headers": [*message.get("headers", []), (b"x-profile-id", tags["id"].encode())]}
+            await send(message)
+
+        _start_tracing()
+        tracemalloc.reset_peak()
+        memory_before = tracemalloc.get_traced_memory()[0]
+        snapshot_before = tracemalloc.take_snapshot()
+        profiler = Profiler(interval=SAMPLE_INTERVAL_SECS, async_mode="enabled")
+        started = time.perf_counter()
+        profiler.start()
+        # get_current_user honours X-Profile-User only when this is set
+        scope.setdefault("state", {})[PROFILING_STATE] = True
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            profiler.stop()
+            duration = time.perf_counter() - started
+            memory_after, peak = tracemalloc.get_traced_memory()
+            snapshot_after = tracemalloc.take_snapshot()
+            _stop_tracing()
+
+            if tags["id"]:
+                summary = {
+                    "id": tags["id"],
+                    "route": tags["route"],
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "query": scope["query_string"].decode("latin-1"),
+                    "user": user,
+                    "admin": admin,
+                    "status": tags["status"],
+                    "duration_ms": round(duration * 1000, 1),
+                    "sample_interval_ms": SAMPLE_INTERVAL_SECS * 1000,
+                    "memory": {
+                        "net_kb": round((memory_after - memory_before) / 1024, 1),
+                        "peak_kb": round((peak - memory_before) / 1024, 1),
+                    },
+                    "allocations": _allocations(snapshot_before, snapshot_after),
+                }
+                try:
+                    os.makedirs(settings.profile_dir, exist_ok=True)
+                    base = os.path.join(settings.profile_dir, tags["id"])
+                    with open(f"{base}.speedscope.json", "w") as f:
+                        f.write(profiler.output(SpeedscopeRenderer()))
+                    with open(f"{base}.json", "w") as f:
+                        json.dump(summary, f, indent=2)
+                    print(f"[profile] {tags['route']} for {user}: {summary['duration_ms']} ms → {base}.speedscope.json")
+                except Exception as e:
+                    print(f"Failed to save profile {tags['id']}: {e}")
@@ -0,0 +1,80 @@
+import asyncio
+import threading
+import time
+from typing import Optional
+
+
+class _Bucket:
+    """Token accounting shared by the blocking and asyncio limiters."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+
+    def _take(self, tokens: float) -> float:
+        """Take tokens if available and return 0, else return seconds to wait."""
+        now = time.monotonic()
+        start = max(self._updated, self._paused_until)
+        if now > start:
+            self._tokens = min(self.capacity, self._tokens + (now - start) * self.rate)
+        self._updated = max(now, self._updated)
+        if now >= self._paused_until and self._tokens >= tokens:
+            self._tokens -= tokens
+            return 0.0
+        return max(self._paused_until - now, (tokens - self._tokens) / self.rate)
+
+    def _pause(self, seconds: float) -> None:
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0.0
+
+
+class TokenBucket(_Bucket):
+    """
+    Thread-safe token-bucket rate limiter.
+
+    Tokens refill continuously at `rate` per second up to `capacity`; acquire()
+    blocks until enough are available. pause() stops all callers for a while —
+    used when an upstream answers 429 with a Retry-After.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        super().__init__(rate, capacity)
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0) -> None:
+        while True:
+            with self._lock:
+                wait = self._take(tokens)
+            if not wait:
+                return
+            time.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """Block every caller for `seconds` and restart from an empty bucket."""
+        with self._lock:
+            self._pause(seconds)
+
+
+class AsyncTokenBucket(_Bucket):
+    """
+    asyncio counterpart of TokenBucket, for callers sharing one event loop.
+
+    Waiters are served in arrival order. With capacity=1 requests are spaced
+    exactly 1/rate seconds apart, never bursting above the allowance.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        super().__init__(rate, capacity)
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        async with self._lock:
+            while wait := self._take(tokens):
+                await asyncio.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """Hold every caller for `seconds` and restart from an empty bucket."""
+        self._pause(seconds)
@@ -1,26 +1,79 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request
 
-from app.auth.session import get_current_user
+from app.auth.session import get_current_user, is_profiled_as
 from app.auth.spotify import get_spotify_client_for_user
+from app.cache import DATA_HISTORY, DATA_RECOMMENDATIONS, DATA_TOP
+from app.conditional import etag
 from app.recommendations import service
 
 router = APIRouter(prefix="/recommendations", tags=["recommendations"])
 
 
-@router.get("/")
+# Live recommendations (no pool yet) are filtered against history and top lists.
+@router.get("/", dependencies=[Depends(etag(DATA_RECOMMENDATIONS, DATA_HISTORY, DATA_TOP))])
 async def get_recommendations(
+    request: Request,
+    background_tasks: BackgroundTasks,
     user: dict = Depends(get_current_user),
 ):
     """
     Return up to 5 filtered song recommendations seeded from the user's
-    medium-term top tracks and long-term top artists.
+    listening history, co-listening neighbours and Spotify related artists.
 
-    Filters out tracks the user already knows (all stored top tracks across
-    all time ranges + 50 recently played). Returns 404 with 'no_new_tracks'
-    if no unseen tracks can be found.
+    Served from the precomputed candidate pool when it exists. Otherwise the
+    recommendations are computed live and the pool is built in the background,
+    except when an admin is profiling the request as this user.
+
+    Filters out tracks the user already knows (everything in their imported
+    streaming history, all stored top tracks across all time ranges + 50
+    recently played). Returns 404 with 'no_new_tracks' if no unseen tracks
+    can be found.
     """
+    page = service.get_pool_page(user_id=user["id"], limit=service.RESULT_LIMIT)
+    if page["items"]:
+        return page["items"]
+
     sp = get_spotify_client_for_user(user)
     results = service.get_recommendations(sp=sp, user_id=user["id"])
+    if not is_profiled_as(request):
+        background_tasks.add_task(service.refresh_candidate_pool, sp, user["id"])
     if results is None:
         raise HTTPException(status_code=404, detail="no_new_tracks")
     return results
+
+
+@router.get("/pool", dependencies=[Depends(etag(DATA_RECOMMENDATIONS))])
+async def get_recommendation_pool(
+    cursor: int = Query(0, ge=0),
+    limit: int = Query(service.PAGE_LIMIT, ge=1, le=100),
+    user: dict = Depends(get_current_user),
+):
+    """
+    Page through the user's precomputed candidate pool.
+
+    Pass the returned `next_cursor` to fetch the following page; it is null
+    once the pool is exhausted.
+    """
+    return service.get_pool_page(user_id=user["id"], cursor=cursor, limit=limit)
+
+
+@router.post("/refresh", status_code=202)
+async def refresh_recommendation_pool(
+    background_tasks: BackgroundTasks,
+    user: dict = Depends(get_current_user),
+):
+    """Rebuild the candidate pool in the background."""
+    sp = get_spotify_client_for_user(user)
+    background_tasks.add_task(service.refresh_candidate_pool, sp, user["id"], force=True)
+    return {"status": "scheduled"}
+
+
+@router.post("/{spotify_track_id}/dismiss")
+async def dismiss_recommendation(
+    spotify_track_id: str,
+    user: dict = Depends(get_current_user),
+):
+    """Remove a track from the pool; it won't be recommended again."""
+    if not service.dismiss_recommendation(user_id=user["id"], spotify_track_id=spotify_track_id):
+        raise HTTPException(status_code=404, detail="track not in recommendation pool")
+    return {"dismissed": spotify_track_id}
@@ -0,0 +1,58 @@
+import hashlib
+from typing import Iterable
+
+import numpy as np
+
+from app import cache
+from app.cache import TTLCache
+from app.database import rpc
+
+# Per-user seen sets keyed by the user's history data version, so an import
+# handled by any node makes every node rebuild the set on its next read.
+_seen_cache = TTLCache(maxsize=2_000, ttl=3600)
+
+
+def _hash_track_id(track_id: str) -> int:
+    return int.from_bytes(hashlib.blake2b(track_id.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _hash_all(track_ids: Iterable[str]) -> np.ndarray:
+    return np.unique(np.fromiter((_hash_track_id(t) for t in track_ids if t), dtype=np.uint64))
+
+
+class SeenTracks:
+    """
+    Compact membership set of Spotify track ids: a sorted array of 64-bit hashes.
+
+    8 bytes per track and a binary search per lookup, so a user's whole
+    streaming history fits in a few hundred KB. A hash collision can only
+    cause a false "seen", which just drops one candidate.
+    """
+
+    def __init__(self, hashes: np.ndarray):
+        self._hashes = hashes
+
+    @classmethod
+    def from_ids(cls, track_ids: Iterable[str]) -> "SeenTracks":
+        return cls(_hash_all(track_ids))
+
+    def union(self, track_ids: Iterable[str]) -> "SeenTracks":
+        return SeenTracks(np.union1d(self._hashes, _hash_all(track_ids)))
+
+    def __contains__(self, track_id: str) -> bool:
+        h = np.uint64(_hash_track_id(track_id))
+        i = np.searchsorted(self._hashes, h)
+        return bool(i < len(self._hashes) and self._hashes[i] == h)
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+
+def _load_history_track_ids(user_id: str) -> list:
+    return rpc("history_distinct_track_ids", {"p_user_id": user_id}) or []
+
+
+def get_seen_tracks(user_id: str) -> SeenTracks:
+    """Every track id in the user's streaming history, cached in-process per history version."""
+    key = (user_id, cache.data_versions(user_id).get(cache.DATA_HISTORY, 0))
+    return _seen_cache.get_or_set(key, lambda: SeenTracks.from_ids(_load_history_track_ids(user_id)))
@@ -1,32 +1,79 @@
-from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Callable, List, Optional
 
 import spotipy
 
-from app.database import supabase
+from app import cache, metrics
+from app.cache import TTLCache
+from app.database import rpc, supabase
+from app.recommendations.seen import SeenTracks, get_seen_tracks
 
 ALL_RANGES = ["short_term", "medium_term", "long_term"]
+RESULT_LIMIT = 5
+LOCAL_SEED_DAYS = 90
 
+# Candidate pool — scored tracks precomputed per user and served page by page
+POOL_SIZE = 300
+PAGE_LIMIT = 20
+POOL_REFRESH_DEBOUNCE_SECS = 120  # syncing all three ranges triggers one rebuild, not three
 
-def _build_seen_ids(sp: spotipy.Spotify, user_id: str) -> set:
-    seen: set = set()
+# Bounded pool shared by all requests — caps concurrent Spotify round-trips per worker
+SPOTIFY_FANOUT_WORKERS = 8
+_pool = ThreadPoolExecutor(max_workers=SPOTIFY_FANOUT_WORKERS, thread_name_prefix="spotify-fanout")
+
+# Related artists and artist top tracks don't depend on the user — share them
+_related_artists_cache = TTLCache(maxsize=5_000, ttl=6 * 3600)
+_artist_top_tracks_cache = TTLCache(maxsize=5_000, ttl=6 * 3600)
+_recent_pool_refreshes = TTLCache(maxsize=10_000, ttl=POOL_REFRESH_DEBOUNCE_SECS)
+
+
+def _safe(call: Callable[[], dict]) -> Optional[dict]:
+    try:
+        return call()
+    except Exception:
+        return None
 
-    for range_ in ALL_RANGES:
-        result = (
-            supabase.table("top_tracks")
-            .select("spotify_track_id")
-            .eq("user_id", user_id)
-            .eq("time_range", range_)
-            .execute()
-        )
-        seen.update(r["spotify_track_id"] for r in (result.data or []))
+
+def _related_artists(sp: spotipy.Spotify, artist_id: str) -> Optional[dict]:
+    cached = _related_artists_cache.get(artist_id)
+    if cached is not None:
+        return cached
+    related = _safe(lambda: sp.artist_related_artists(artist_id))
+    if related is not None:
+        _related_artists_cache.set(artist_id, related)
+    return related
+
+
+def _artist_top_tracks(sp: spotipy.Spotify, artist_id: str) -> Optional[dict]:
+    cached = _artist_top_tracks_cache.get(artist_id)
+    if cached is not None:
+        return cached
+    tracks = _safe(lambda: sp.artist_top_tracks(artist_id))
+    if tracks is not None:
+        _artist_top_tracks_cache.set(artist_id, tracks)
+    return tracks
+
+
+def _build_seen_ids(sp: spotipy.Spotify, user_id: str) -> SeenTracks:
+    extra: set = set()
+
+    result = (
+        supabase.table("top_tracks")
+        .select("spotify_track_id")
+        .eq("user_id", user_id)
+        .in_("time_range", ALL_RANGES)
+        .execute()
+    )
+    extra.update(r["spotify_track_id"] for r in (result.data or []))
 
     try:
         recent = sp.current_user_recently_played(limit=50)
-        seen.update(item["track"]["id"] for item in recent.get("items", []))
+        extra.update(item["track"]["id"] for item in recent.get("items", []))
     except Exception:
         pass
 
-    return seen
+    return get_seen_tracks(user_id).union(extra)
 
 
 def _format_track(track: dict) -> dict:
@@ -42,69 +89,235 @@ def _format_track(track: dict) -> dict:
     }
 
 
-def get_recommendations(
+def _format_item_track(row: dict) -> dict:
+    return {
+        "track_name":    row["track_name"],
+        "artist_name":   row["artist_name"],
+        "album_name":    row.get("album_name"),
+        "album_art_url": None,
+        "spotify_url":   f"https://open.spotify.com/track/{row['spotify_track_id']}",
+        "preview_url":   None,
+        "popularity":    None,
+    }
+
+
+def _local_candidates(user_id: str, seen_ids: SeenTracks, limit: int) -> List[dict]:
+    """
+    Candidates from the offline co-listening model (scripts/build_item_similarity.py):
+    neighbours of the user's most-played tracks from the last 90 days, falling
+    back to all-time favourites. No Spotify calls.
+
+    Returns [{spotify_track_id, score, source, track}] best first.
+    """
+    rows: List[dict] = []
+    for seed_days in (LOCAL_SEED_DAYS, None):
+        try:
+            rows = rpc("recommend_similar_tracks", {
+                "p_user_id": user_id,
+                "p_seed_days": seed_days,
+                "p_limit": limit * 2,
+            }) or []
+        except Exception as e:
+            print(f"Local recommendation error: {e}")
+            return []
+        if rows:
+            break
+
+    return [
+        {
+            "spotify_track_id": row["spotify_track_id"],
+            "score": row.get("score"),
+            "source": "co_listening",
+            "track": _format_item_track(row),
+        }
+        for row in rows
+        if row.get("track_name") and row["spotify_track_id"] not in seen_ids
+    ][:limit]
+
+
+def _spotify_candidates(
     sp: spotipy.Spotify,
-    user_id: str,
-) -> Optional[List[dict]]:
+    seen_ids: SeenTracks,
+    exclude: set,
+    limit: int,
+    seed_artists: int = 3,
+    related_per_seed: int = 6,
+    candidate_artists: int = 10,
+) -> List[dict]:
     """
-    Build recommendations via related artists since Spotify deprecated
-    the /recommendations endpoint in Nov 2024.
+    Candidates via Spotify related artists. Each stage fans its calls out over
+    the shared bounded pool; related-artist and top-track responses are cached.
 
-    Flow:
-      1. Fetch user's top artists (long_term for strongest signal)
-      2. For each top artist, fetch related artists from Spotify
-      3. Pull top tracks from those related artists
-      4. Filter against seen_ids (all stored top tracks + recently played)
-      5. Return first 5 unseen tracks
+    Returns [{spotify_track_id, score, source, track}] in candidate-artist order.
     """
-    # Step 1 — top artists as seed sources
+    # Top artists as seed sources, all ranges at once; prefer long_term
+    ranges = ("long_term", "medium_term", "short_term")
+    top_responses = _pool.map(
+        metrics.bind(lambda time_range: _safe(lambda: sp.current_user_top_artists(limit=max(5, seed_artists), time_range=time_range))),
+        ranges,
+    )
     top_artist_ids: List[str] = []
-    for time_range in ("long_term", "medium_term", "short_term"):
-        try:
-            resp = sp.current_user_top_artists(limit=5, time_range=time_range)
-            top_artist_ids = [a["id"] for a in resp.get("items", [])]
-            if top_artist_ids:
-                break
-        except Exception:
-            pass
+    for resp in top_responses:
+        top_artist_ids = [a["id"] for a in (resp or {}).get("items", [])]
+        if top_artist_ids:
+            break
 
     if not top_artist_ids:
-        return None
+        return []
 
-    seen_ids = _build_seen_ids(sp, user_id)
     top_artist_id_set = set(top_artist_ids)
 
-    # Step 2 — collect related artist IDs (skip artists user already knows)
+    # Collect related artist IDs (skip artists user already knows)
     candidate_artist_ids: List[str] = []
-    for artist_id in top_artist_ids[:3]:
-        try:
-            related = sp.artist_related_artists(artist_id)
-            for a in related.get("artists", [])[:6]:
-                if a["id"] not in top_artist_id_set and a["id"] not in candidate_artist_ids:
-                    candidate_artist_ids.append(a["id"])
-        except Exception:
-            pass
-
-    if not candidate_artist_ids:
-        return None
+    for related in _pool.map(metrics.bind(lambda artist_id: _related_artists(sp, artist_id)), top_artist_ids[:seed_artists]):
+        for a in (related or {}).get("artists", [])[:related_per_seed]:
+            if a["id"] not in top_artist_id_set and a["id"] not in candidate_artist_ids:
+                candidate_artist_ids.append(a["id"])
+
+    # Pull top tracks from related artists concurrently, then filter seen
+    # tracks in candidate order so results match the serial version
+    track_responses = _pool.map(
+        metrics.bind(lambda artist_id: _artist_top_tracks(sp, artist_id)),
+        candidate_artist_ids[:candidate_artists],
+    )
 
-    # Step 3 & 4 — pull top tracks from related artists, filter seen
     results: List[dict] = []
-    seen_result_ids: set = set()
+    taken = set(exclude)
+    for tracks_resp in track_responses:
+        for track in (tracks_resp or {}).get("tracks", []):
+            if track["id"] in seen_ids or track["id"] in taken:
+                continue
+            taken.add(track["id"])
+            results.append({
+                "spotify_track_id": track["id"],
+                "score": None,
+                "source": "related_artists",
+                "track": _format_track(track),
+            })
+            if len(results) >= limit:
+                return results
+    return results
 
-    for artist_id in candidate_artist_ids[:10]:
-        if len(results) >= 5:
-            break
-        try:
-            tracks_resp = sp.artist_top_tracks(artist_id)
-            for track in tracks_resp.get("tracks", []):
-                if track["id"] in seen_ids or track["id"] in seen_result_ids:
-                    continue
-                seen_result_ids.add(track["id"])
-                results.append(_format_track(track))
-                if len(results) >= 5:
-                    break
-        except Exception:
-            pass
-
-    return results if results else None
+
+def _build_candidates(sp: spotipy.Spotify, user_id: str, limit: int, **spotify_fanout) -> List[dict]:
+    """Local co-listening candidates first, topped up from Spotify related artists."""
+    seen_ids = _build_seen_ids(sp, user_id)
+
+    candidates = _local_candidates(user_id, seen_ids, limit=limit)
+    if len(candidates) < limit:
+        candidates += _spotify_candidates(
+            sp,
+            seen_ids,
+            exclude={c["spotify_track_id"] for c in candidates},
+            limit=limit - len(candidates),
+            **spotify_fanout,
+        )
+    return candidates
+
+
+def get_recommendations(
+    sp: spotipy.Spotify,
+    user_id: str,
+) -> Optional[List[dict]]:
+    """
+    Build recommendations from the local co-listening model first, topping up
+    via Spotify related artists (Spotify deprecated /recommendations in Nov 2024
+    and increasingly restricts related-artists).
+
+    Flow:
+      1. Build seen_ids (full streaming history + stored top tracks + recently played)
+      2. Take unseen neighbours of the user's favourite tracks from item_similarity
+      3. If fewer than 5, fetch user's top artists (long_term for strongest signal)
+      4. For each top artist, fetch related artists from Spotify
+      5. Pull top tracks from those related artists, filtered against seen_ids
+      6. Return the first 5 unseen tracks
+    """
+    candidates = _build_candidates(sp, user_id, limit=RESULT_LIMIT)
+    return [c["track"] for c in candidates] or None
+
+
+def refresh_candidate_pool(sp: spotipy.Spotify, user_id: str, force: bool = False) -> Optional[int]:
+    """
+    Rebuild the user's recommendation_pool with up to POOL_SIZE scored tracks.
+
+    Dismissed tracks stay dismissed — they are kept in the pool table and
+    excluded from the new candidates. Unless forced, a refresh within
+    POOL_REFRESH_DEBOUNCE_SECS of the previous one is skipped.
+
+    Returns the number of pooled tracks, or None if the refresh was skipped.
+    """
+    if not force and _recent_pool_refreshes.get(user_id):
+        return None
+    _recent_pool_refreshes.set(user_id, True)
+
+    dismissed = {
+        r["spotify_track_id"]
+        for r in (
+            supabase.table("recommendation_pool")
+            .select("spotify_track_id")
+            .eq("user_id", user_id)
+            .not_.is_("dismissed_at", "null")
+            .execute()
+        ).data or []
+    }
+
+    candidates = _build_candidates(
+        sp, user_id, limit=POOL_SIZE + len(dismissed),
+        seed_artists=5, related_per_seed=20, candidate_artists=40,
+    )
+    candidates = [c for c in candidates if c["spotify_track_id"] not in dismissed][:POOL_SIZE]
+
+    rows = [
+        {
+            "spotify_track_id": c["spotify_track_id"],
+            "rank": rank,
+            "score": c["score"],
+            "source": c["source"],
+            "track": c["track"],
+        }
+        for rank, c in enumerate(candidates, start=1)
+    ]
+
+    # One transaction, so readers never see a half-built or empty pool
+    rpc("replace_recommendation_pool", {"p_user_id": user_id, "p_rows": rows})
+    cache.bump([cache.DATA_RECOMMENDATIONS], user_id)
+    return len(rows)
+
+
+def get_pool_page(user_id: str, cursor: int = 0, limit: int = PAGE_LIMIT) -> dict:
+    """
+    Read one page of the user's candidate pool, ordered by rank.
+
+    `cursor` is the rank of the last item already shown (0 for the first page);
+    `next_cursor` is None once the pool is exhausted.
+    """
+    rows = (
+        supabase.table("recommendation_pool")
+        .select("spotify_track_id, rank, source, track")
+        .eq("user_id", user_id)
+        .is_("dismissed_at", "null")
+        .gt("rank", cursor)
+        .order("rank")
+        .limit(limit + 1)
+        .execute()
+    ).data or []
+
+    page = rows[:limit]
+    return {
+        "items": [{**r["track"], "spotify_track_id": r["spotify_track_id"], "source": r["source"]} for r in page],
+        "next_cursor": page[-1]["rank"] if len(rows) > limit else None,
+    }
+
+
+def dismiss_recommendation(user_id: str, spotify_track_id: str) -> bool:
+    """Mark a pooled track as dismissed so it is never served or re-pooled. Returns False if not pooled."""
+    result = (
+        supabase.table("recommendation_pool")
+        .update({"dismissed_at": datetime.now(tz=timezone.utc).isoformat()})
+        .eq("user_id", user_id)
+        .eq("spotify_track_id", spotify_track_id)
+        .execute()
+    )
+    if result.data:
+        cache.bump([cache.DATA_RECOMMENDATIONS], user_id)
+    return bool(result.data)
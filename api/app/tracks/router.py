@@ -1,7 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
 
 from app.auth.session import get_current_user
 from app.auth.spotify import get_spotify_client_for_user
+from app.cache import DATA_HISTORY, DATA_TOP
+from app.conditional import etag
+from app.recommendations.service import refresh_candidate_pool
 from app.tracks import service
 from app.tracks.models import SyncResult, TrackOut
 
@@ -17,6 +20,7 @@ def _validate_range(range: str) -> None:
 
 @router.post("/sync", response_model=SyncResult)
 async def sync_tracks(
+    background_tasks: BackgroundTasks,
     range: str = Query("short_term"),
     user: dict = Depends(get_current_user),
 ):
@@ -24,10 +28,15 @@ async def sync_tracks(
     _validate_range(range)
     sp = get_spotify_client_for_user(user)
     tracks = service.sync_top_tracks(sp=sp, user_id=user["id"], time_range=range)
+    background_tasks.add_task(refresh_candidate_pool, sp, user["id"])
     return {"synced": len(tracks), "time_range": range}
 
 
-@router.get("/", response_model=list[TrackOut])
+@router.get(
+    "/",
+    response_model=list[TrackOut],
+    dependencies=[Depends(etag(DATA_TOP, DATA_HISTORY, rolling=True))],
+)
 async def get_tracks(
     range: str = Query("short_term"),
     user: dict = Depends(get_current_user),
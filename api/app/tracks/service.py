@@ -4,7 +4,8 @@ from typing import List, Optional
 
 import spotipy
 
-from app.database import supabase
+from app import cache
+from app.database import rpc, scan, supabase
 
 TIME_RANGES = {"short_term", "medium_term", "long_term"}
 
@@ -87,6 +88,8 @@ def sync_top_tracks(sp: spotipy.Spotify, user_id: str, time_range: str) -> List[
     result = supabase.table("top_tracks").insert(rows).execute()
 
     _sync_genre_snapshots(user_id=user_id, time_range=time_range, tracks=rows)
+    _record_track_artists(raw_tracks)
+    cache.bump([cache.DATA_TOP], user_id)
 
     supabase.table("users").update({
         "last_synced_at": datetime.now(tz=timezone.utc).isoformat()
@@ -95,6 +98,23 @@ def sync_top_tracks(sp: spotipy.Spotify, user_id: str, time_range: str) -> List[
     return result.data
 
 
+def _record_track_artists(raw_tracks: List[dict]) -> None:
+    """Save the primary artist of synced tracks so the genre enricher never looks them up."""
+    now = datetime.now(tz=timezone.utc).isoformat()
+    rows = [
+        {
+            "spotify_track_id": item["id"],
+            "spotify_artist_id": item["artists"][0]["id"],
+            "artist_name": item["artists"][0]["name"],
+            "resolved_at": now,
+        }
+        for item in raw_tracks
+        if item.get("id") and item.get("artists")
+    ]
+    if rows:
+        supabase.table("track_artist").upsert(rows, on_conflict="spotify_track_id").execute()
+
+
 def _sync_genre_snapshots(user_id: str, time_range: str, tracks: List[dict]) -> None:
     """
     Recalculate and replace genre percentage rows for a user and time range.
@@ -163,18 +183,12 @@ def get_top_tracks(user_id: str, time_range: str, sp: Optional[spotipy.Spotify]
         track_ids = [t["spotify_track_id"] for t in tracks]
         track_uris = [f"spotify:track:{tid}" for tid in track_ids]
         cutoff = _get_date_cutoff(time_range)
-        sh_query = (
-            supabase.table("streaming_history")
-            .select("spotify_track_uri, ms_played, played_at")
-            .eq("user_id", user_id)
-            .in_("spotify_track_uri", track_uris)
-            .limit(50000)
-        )
-        if cutoff:
-            sh_query = sh_query.gte("played_at", cutoff.isoformat())
-        sh_result = sh_query.execute()
+        def where(query):
+            query = query.eq("user_id", user_id).in_("spotify_track_uri", track_uris)
+            return query.gte("played_at", cutoff.isoformat()) if cutoff else query
+
         stats_by_id: dict = {}
-        for row in sh_result.data or []:
+        for row in scan("streaming_history", "spotify_track_uri, ms_played, played_at", where=where):
             tid = row["spotify_track_uri"].replace("spotify:track:", "")
             if tid not in stats_by_id:
                 stats_by_id[tid] = {"play_count": 0, "ms_total": 0, "first": row["played_at"]}
@@ -191,12 +205,12 @@ def get_top_tracks(user_id: str, time_range: str, sp: Optional[spotipy.Spotify]
                 track["first_listened"] = s["first"][:10]
 
         if time_range == "long_term":
-            history_top = supabase.rpc("history_top_tracks", {
+            history_top = rpc("history_top_tracks", {
                 "p_user_id": str(user_id),
                 "p_limit": 50,
-            }).execute()
+            })
             existing_ids = {t["spotify_track_id"] for t in tracks}
-            for ht in history_top.data or []:
+            for ht in history_top or []:
                 track_id = ht["spotify_track_uri"].replace("spotify:track:", "")
                 if track_id not in existing_ids:
                     tracks.append({
@@ -1,12 +1,17 @@
 from fastapi import APIRouter, Depends
 
 from app.auth.session import get_current_user
+from app.conditional import etag
 from app.users.models import UserOut
 
 router = APIRouter(prefix="/users", tags=["users"])
 
 
-@router.get("/me", response_model=UserOut)
+@router.get(
+    "/me",
+    response_model=UserOut,
+    dependencies=[Depends(etag(user_fields=UserOut.model_fields))],
+)
 async def get_me(user: dict = Depends(get_current_user)):
     """Return the authenticated user's profile."""
     return user
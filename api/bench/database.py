@@ -0,0 +1,170 @@
+"""
+Local Postgres for benchmarks: applies the real schema, migrations and RPCs,
+then bulk-loads a synthetic dataset with COPY.
+
+PostgREST (bench/docker-compose.yml) serves this database to the app exactly
+as Supabase would; the roles below are the subset of Supabase's it needs.
+"""
+
+import json
+import re
+from pathlib import Path
+from typing import Callable, Iterator, List
+
+import numpy as np
+import psycopg
+
+from bench.synthetic import Catalog, UserPlays, history_rows, now_utc, plays_per_user, top_rows
+
+API_DIR = Path(__file__).resolve().parent.parent
+SCHEMA_FILES = (
+    [API_DIR / "supabase" / "schema.sql"]
+    + sorted((API_DIR / "migrations").glob("*.sql"))
+    + [API_DIR / "supabase" / "rpc_get_map_artists.sql"]
+)
+
+ROLES_SQL = """
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'anon') THEN
+        CREATE ROLE anon NOLOGIN;
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'service_role') THEN
+        CREATE ROLE service_role NOLOGIN BYPASSRLS;
+    END IF;
+END
+$$;
+GRANT USAGE ON SCHEMA public TO anon, service_role;
+GRANT ALL ON ALL TABLES IN SCHEMA public TO service_role;
+GRANT ALL ON ALL SEQUENCES IN SCHEMA public TO service_role;
+GRANT EXECUTE ON ALL FUNCTIONS IN SCHEMA public TO service_role;
+"""
+
+# Tokens that change how `;` is read: comments, quoted strings, dollar quotes.
+_TOKEN = re.compile(r"--[^\n]*|/\*.*?\*/|'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|(\$[A-Za-z_]*\$)|;", re.S)
+
+
+def split_statements(sql: str) -> Iterator[str]:
+    """Split a SQL script on top-level semicolons, respecting quotes and $$ bodies."""
+    start = pos = 0
+    while True:
+        match = _TOKEN.search(sql, pos)
+        if not match:
+            break
+        if match.group(1):
+            end = sql.find(match.group(1), match.end())
+            pos = len(sql) if end < 0 else end + len(match.group(1))
+            continue
+        pos = match.end()
+        if match.group(0) == ";":
+            statement = sql[start:pos].strip()
+            start = pos
+            if statement.strip(";").strip():
+                yield statement
+    tail = sql[start:].strip()
+    if tail:
+        yield tail
+
+
+def apply_schema(conn: psycopg.Connection, log: Callable[[str], None] = print) -> List[str]:
+    """
+    Run every schema file in order. Statements are executed one at a time so a
+    Supabase-only statement doesn't roll back the rest of its file; failures
+    are returned (and logged) rather than raised.
+    """
+    failures = []
+    for path in SCHEMA_FILES:
+        for statement in split_statements(path.read_text()):
+            try:
+                conn.execute(statement)
+            except psycopg.Error as e:
+                failures.append(f"{path.name}: {str(e).splitlines()[0]}")
+                log(f"  skipped in {path.name}: {str(e).splitlines()[0]}")
+    conn.execute(ROLES_SQL)
+    return failures
+
+
+def reset(conn: psycopg.Connection) -> None:
+    conn.execute("DROP SCHEMA IF EXISTS public CASCADE")
+    conn.execute("CREATE SCHEMA public")
+
+
+def _copy(conn: psycopg.Connection, table: str, columns: str, rows) -> int:
+    n = 0
+    with conn.cursor() as cur, cur.copy(f"COPY {table} ({columns}) FROM STDIN") as copy:
+        for row in rows:
+            copy.write_row(row)
+            n += 1
+    return n
+
+
+def load_dataset(conn: psycopg.Connection, params: dict, log: Callable[[str], None] = print) -> None:
+    """Load the catalog and every user's history and top lists for `params`."""
+    catalog = Catalog(params)
+    now = now_utc()
+
+    conn.execute("CREATE TABLE IF NOT EXISTS bench_dataset (id BOOLEAN PRIMARY KEY DEFAULT TRUE, params JSONB)")
+    conn.execute(
+        "INSERT INTO bench_dataset (id, params) VALUES (TRUE, %s) "
+        "ON CONFLICT (id) DO UPDATE SET params = EXCLUDED.params",
+        (json.dumps(params),),
+    )
+
+    _copy(conn, "artist_genres", "artist_name, spotify_artist_id, genres", zip(
+        catalog.artist_names, catalog.artist_ids, catalog.artist_genres,
+    ))
+    _copy(conn, "genre_families", "genre, family", catalog.genre_families())
+    _copy(conn, "track_artist", "spotify_track_id, spotify_artist_id, artist_name, resolved_at", (
+        (tid, catalog.artist_ids[a], catalog.artist_names[a], now)
+        for tid, a in zip(catalog.track_ids, catalog.track_artist)
+    ))
+    log(f"  catalog: {len(catalog.artist_ids):,} artists, {len(catalog.track_ids):,} tracks, "
+        f"{len(catalog.genres):,} genres")
+
+    rng = np.random.default_rng(params["seed"] + 2)
+    for n, n_plays in enumerate(plays_per_user(params), start=1):
+        user_id = conn.execute(
+            "INSERT INTO users (spotify_id, display_name, email, refresh_token) "
+            "VALUES (%s, %s, %s, 'bench-refresh-token') RETURNING id",
+            (f"bench-user-{n}", f"Bench User {n}", f"bench{n}@example.com"),
+        ).fetchone()[0]
+        plays = UserPlays(catalog, rng, n_plays, params["years"], now)
+        with conn.transaction():
+            loaded = _copy(
+                conn, "streaming_history",
+                "user_id, played_at, ms_played, track_name, artist_name, album_name, spotify_track_uri",
+                history_rows(catalog, user_id, plays),
+            )
+        tops = top_rows(catalog, user_id, plays, now)
+        _copy(conn, "top_tracks", "user_id, spotify_track_id, track_name, artist_name, album_name, "
+              "album_art_url, popularity, time_range, rank, genres, snapshot_at", tops["top_tracks"])
+        _copy(conn, "top_artists", "user_id, spotify_artist_id, artist_name, artist_image_url, genres, "
+              "popularity, followers, time_range, rank, snapshot_at", tops["top_artists"])
+        _copy(conn, "genre_snapshots", "user_id, time_range, genre, percentage, snapshot_at", tops["genre_snapshots"])
+        log(f"  user {n}/{params['users']}: {loaded:,} plays")
+
+    conn.execute("ANALYZE")
+    conn.execute("NOTIFY pgrst, 'reload schema'")
+
+
+def dataset_params(conn: psycopg.Connection) -> dict:
+    """Parameters the loaded dataset was generated with."""
+    row = conn.execute("SELECT params FROM bench_dataset").fetchone()
+    if not row:
+        raise RuntimeError("No benchmark dataset loaded — run `bench_api.py seed` first")
+    return row[0]
+
+
+def bench_users(conn: psycopg.Connection) -> List[dict]:
+    """Every synthetic user with their play count and top artist, heaviest first."""
+    rows = conn.execute(
+        "SELECT u.id, u.spotify_id, "
+        "       (SELECT COUNT(*) FROM streaming_history h WHERE h.user_id = u.id), "
+        "       (SELECT artist_name FROM top_artists t WHERE t.user_id = u.id AND t.time_range = 'long_term' "
+        "         ORDER BY rank LIMIT 1) "
+        "FROM users u WHERE u.spotify_id LIKE 'bench-user-%' ORDER BY 3 DESC"
+    ).fetchall()
+    return [
+        {"id": str(user_id), "spotify_id": spotify_id, "plays": plays, "top_artist": top_artist}
+        for user_id, spotify_id, plays, top_artist in rows
+    ]
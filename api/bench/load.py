@@ -0,0 +1,212 @@
+"""
+Concurrent-load scenarios modelled on real dashboard traffic.
+
+Virtual users loop through a scenario (login → sync → dashboard → history →
+map) against the app served by a real uvicorn worker; each step fires its
+requests concurrently, as the frontend's hooks do on page load. Concurrency is
+ramped in stages and each stage reports throughput, errors, latency and how
+long the worker's event loop was blocked — synchronous Supabase and Spotify
+calls inside `async def` routes stall every other request on that worker.
+"""
+
+import asyncio
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+import httpx
+import numpy as np
+
+# Each scenario is a list of steps; the requests in a step run concurrently.
+# "{user}" is the virtual user's Spotify id.
+LOGIN = [("GET", "/auth/callback?code={user}")]
+SYNC = [
+    ("POST", "/tracks/sync?range=short_term"),
+    ("POST", "/artists/sync?range=short_term"),
+]
+DASHBOARD = [
+    ("GET", "/users/me"),
+    ("GET", "/tracks/?range=short_term"),
+    ("GET", "/artists/?range=short_term"),
+    ("GET", "/genres/?range=short_term"),
+    ("GET", "/recommendations/"),
+]
+HISTORY = [
+    ("GET", "/import/status"),
+    ("GET", "/history/stats"),
+    ("GET", "/history/yearly"),
+    ("GET", "/history/heatmap"),
+    ("GET", "/history/patterns"),
+    ("GET", "/history/top-artists"),
+    ("GET", "/history/top-tracks"),
+]
+MAP = [
+    ("GET", "/map/genres/families?range=short_term"),
+    ("GET", "/map/artists?range=short_term"),
+]
+
+SCENARIOS = {
+    # Everyone opening the app after a release: fresh login and sync first
+    "release": [LOGIN, SYNC, DASHBOARD, HISTORY, MAP],
+    # Returning users browsing without syncing
+    "browse": [LOGIN, DASHBOARD, HISTORY, MAP],
+    "dashboard": [LOGIN, DASHBOARD],
+}
+
+LOOP_PROBE_SECS = 0.01
+# Lag below this is scheduler noise, not a blocked loop.
+BLOCKED_LAG_SECS = 0.005
+
+
+class LoopMonitor:
+    """
+    Measures event-loop lag from inside the app's loop: a task sleeps
+    LOOP_PROBE_SECS and records how late it wakes up. Register start() and
+    stop() as app startup and shutdown handlers.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._lags: List[float] = []
+        self._task = None
+
+    async def start(self) -> None:
+        self._task = asyncio.get_running_loop().create_task(self._probe())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+
+    async def _probe(self) -> None:
+        while True:
+            expected = time.perf_counter() + LOOP_PROBE_SECS
+            await asyncio.sleep(LOOP_PROBE_SECS)
+            lag = time.perf_counter() - expected
+            with self._lock:
+                self._lags.append(max(0.0, lag))
+
+    def take(self) -> List[float]:
+        """Lags recorded since the last call."""
+        with self._lock:
+            lags, self._lags = self._lags, []
+        return lags
+
+
+class Stage:
+    """Samples collected while running at one concurrency level."""
+
+    def __init__(self, concurrency: int):
+        self.concurrency = concurrency
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.scenarios = 0
+        self.elapsed = 0.0
+        self.lags: List[float] = []
+        self.db_calls = 0
+
+
+async def _request(client: httpx.AsyncClient, stage: Stage, method: str, path: str, headers: dict) -> Optional[httpx.Response]:
+    route = path.split("?")[0]
+    started = time.perf_counter()
+    try:
+        response = await client.request(method, f"/api/v1{path}", headers=headers)
+    except httpx.HTTPError:
+        stage.errors[route] += 1
+        stage.latencies[route].append(time.perf_counter() - started)
+        return None
+    stage.latencies[route].append(time.perf_counter() - started)
+    # 404 is a valid answer (e.g. no recommendations left); redirects are the login
+    if response.status_code >= 400 and response.status_code != 404:
+        stage.errors[route] += 1
+    return response
+
+
+async def _virtual_user(client: httpx.AsyncClient, stage: Stage, scenario: list, spotify_id: str,
+                        deadline: float, think_secs: float) -> None:
+    while time.perf_counter() < deadline:
+        headers: dict = {}
+        for step in scenario:
+            responses = await asyncio.gather(*(
+                _request(client, stage, method, path.format(user=spotify_id), headers)
+                for method, path in step
+            ))
+            if step is LOGIN:
+                location = responses[0].headers.get("location", "") if responses[0] is not None else ""
+                token = parse_qs(urlparse(location).query).get("token", [None])[0]
+                if not token:
+                    break
+                headers = {"Authorization": f"Bearer {token}"}
+            if think_secs:
+                await asyncio.sleep(think_secs)
+        else:
+            stage.scenarios += 1
+
+
+async def run_stage(base_url: str, scenario: list, spotify_ids: List[str], concurrency: int,
+                    duration_secs: float, think_secs: float, monitor: LoopMonitor, traffic) -> Stage:
+    stage = Stage(concurrency)
+    limits = httpx.Limits(max_connections=concurrency * 8, max_keepalive_connections=concurrency * 8)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        monitor.take()
+        traffic.reset()
+        started = time.perf_counter()
+        deadline = started + duration_secs
+        await asyncio.gather(*(
+            _virtual_user(client, stage, scenario, spotify_ids[i % len(spotify_ids)], deadline, think_secs)
+            for i in range(concurrency)
+        ))
+        stage.elapsed = time.perf_counter() - started
+        stage.lags = monitor.take()
+        stage.db_calls = traffic.calls
+    return stage
+
+
+def summarize(stage: Stage) -> dict:
+    latencies = [x for xs in stage.latencies.values() for x in xs]
+    requests = len(latencies)
+    errors = sum(stage.errors.values())
+    lags = np.array(stage.lags or [0.0])
+    blocked = float(lags[lags > BLOCKED_LAG_SECS].sum())
+    return {
+        "concurrency": stage.concurrency,
+        "requests": requests,
+        "rps": requests / stage.elapsed if stage.elapsed else 0.0,
+        "scenarios_per_sec": stage.scenarios / stage.elapsed if stage.elapsed else 0.0,
+        "error_pct": errors / requests * 100 if requests else 0.0,
+        "p50_ms": float(np.percentile(latencies, 50)) * 1000 if latencies else 0.0,
+        "p95_ms": float(np.percentile(latencies, 95)) * 1000 if latencies else 0.0,
+        "lag_p99_ms": float(np.percentile(lags, 99)) * 1000,
+        "lag_max_ms": float(lags.max()) * 1000,
+        "blocked_pct": blocked / stage.elapsed * 100 if stage.elapsed else 0.0,
+        "db_calls_per_sec": stage.db_calls / stage.elapsed if stage.elapsed else 0.0,
+    }
+
+
+def format_stages(rows: List[dict]) -> str:
+    header = (f"{'users':>5} {'req/s':>8} {'scen/s':>7} {'err %':>6} {'p50 ms':>8} {'p95 ms':>8} "
+              f"{'lag p99':>8} {'lag max':>8} {'blocked':>8} {'db/s':>7}")
+    lines = [header, "-" * len(header)]
+    for r in rows:
+        lines.append(
+            f"{r['concurrency']:>5} {r['rps']:>8.1f} {r['scenarios_per_sec']:>7.2f} {r['error_pct']:>6.1f} "
+            f"{r['p50_ms']:>8.0f} {r['p95_ms']:>8.0f} {r['lag_p99_ms']:>8.0f} {r['lag_max_ms']:>8.0f} "
+            f"{r['blocked_pct']:>7.0f}% {r['db_calls_per_sec']:>7.0f}"
+        )
+    return "\n".join(lines)
+
+
+def format_routes(stage: Stage) -> str:
+    """Per-route latency at one stage, slowest p95 first."""
+    rows = sorted(
+        ((route, np.array(xs) * 1000, stage.errors.get(route, 0)) for route, xs in stage.latencies.items()),
+        key=lambda r: np.percentile(r[1], 95),
+        reverse=True,
+    )
+    header = f"{'route':<32} {'n':>6} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} {'errors':>6}"
+    lines = [header, "-" * len(header)]
+    for route, ms, errors in rows:
+        lines.append(f"{route:<32} {len(ms):>6} {np.percentile(ms, 50):>8.0f} {np.percentile(ms, 95):>8.0f} "
+                     f"{ms.max():>8.0f} {errors:>6}")
+    return "\n".join(lines)
@@ -0,0 +1,261 @@
+"""
+Micro-benchmarks for the pure-Python work done per request.
+
+Each case builds a fixed-seed dataset shaped like a heavy user's (from the
+synthetic catalog), stubs the data access the function does, and returns a
+zero-argument callable to time. Results are compared against a saved baseline
+after scaling by a calibration loop, so a baseline recorded on one machine
+still flags algorithmic regressions on another.
+"""
+
+import contextlib
+import io
+import os
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from bench.synthetic import DEFAULTS, Catalog
+
+SEED = 7
+MIN_TIME_SECS = 0.2
+REPEAT = 7
+
+# Baselines are machine-relative timings, so each checkout records its own.
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "micro_baseline.json")
+
+_TITLE_SUFFIXES = ["", "", "", " - Remastered 2011", " (Radio Edit)", " - Live", " [Explicit]", " - Single Version",
+                   " (feat. Someone)", " - Sped Up"]
+# How the same tag arrives from Spotify, Last.fm and imports.
+_TAG_VARIANTS = [str, str, str.title, str.upper, lambda g: f" {g} ", lambda g: "Hip-Hop", lambda g: "RnB"]
+
+CASES: Dict[str, Callable[[], Callable[[], object]]] = {}
+
+
+def case(name: str):
+    def register(setup: Callable[[], Callable[[], object]]):
+        CASES[name] = setup
+        return setup
+    return register
+
+
+class _FakeQuery:
+    """Stands in for a supabase-py query builder: every filter is a no-op."""
+
+    def __init__(self, data):
+        self.data = data
+
+    def __getattr__(self, _name):
+        return lambda *args, **kwargs: self
+
+    def execute(self):
+        return self
+
+
+class _FakeSupabase:
+    def __init__(self, tables: Dict[str, list]):
+        self.tables = tables
+
+    def table(self, name: str) -> _FakeQuery:
+        # Fresh row dicts per query: services annotate the rows they read
+        return _FakeQuery([dict(row) for row in self.tables.get(name, [])])
+
+
+def _catalog() -> Catalog:
+    return Catalog({**DEFAULTS, "seed": SEED, "artists": 3_000, "genres": 600})
+
+
+def _map_rows(catalog: Catalog, rng: np.random.Generator, n: int) -> List[dict]:
+    """get_map_artists rows for n artists, with families as stored by genre_families."""
+    from app.map.families import classify_family
+
+    rows = []
+    for a in rng.choice(len(catalog.artist_ids), n, replace=False):
+        genres = catalog.artist_genres[a]
+        rows.append({
+            "artist_name": catalog.artist_names[a],
+            "play_count": int(rng.integers(1, 2_000)),
+            "total_ms_played": int(rng.integers(600_000, 400_000_000)),
+            "genres": genres,
+            "families": [classify_family(g) for g in genres],
+        })
+    return rows
+
+
+@case("map.get_genre_map")
+def _genre_map():
+    from app.map import service
+
+    rows = _map_rows(_catalog(), np.random.default_rng(SEED), 1_000)
+    service.rpc = lambda fn, params: rows
+
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return service.get_genre_map.__wrapped__("bench-user", "long_term")  # uncached
+    return run
+
+
+@case("map.top_k_artist_links")
+def _artist_links():
+    from app.map import service
+
+    catalog = _catalog()
+    artists = [
+        {"spotify_artist_id": catalog.artist_ids[a], "genres": catalog.artist_genres[a]}
+        for a in range(50)
+    ]
+    return lambda: service._top_k_artist_links(artists, top_k=service.ARTIST_LINK_TOP_K, metric="jaccard")
+
+
+@case("families.classify_family")
+def _classify_family():
+    from app.map.families import classify_family
+
+    rng = np.random.default_rng(SEED)
+    genres = [g for genres in _catalog().artist_genres for g in genres]
+    genres = [genres[i] for i in rng.integers(0, len(genres), 5_000)]
+    classify = classify_family.__wrapped__  # uncached: measures the matcher itself
+    return lambda: [classify(g) for g in genres]
+
+
+@case("genres.bucket_genres")
+def _bucket():
+    from app.genres.service import _bucket_genres
+
+    rng = np.random.default_rng(SEED)
+    catalog = _catalog()
+    weights = rng.pareto(1.5, len(catalog.genres))
+    weights = weights / weights.sum() * 100
+    genres = [{"genre": g, "percentage": round(float(w), 1), "snapshot_at": "2024-01-01"}
+              for g, w in zip(catalog.genres, weights)]
+    return lambda: _bucket_genres(genres, "2024-01-01")
+
+
+@case("genres.normalize_genre")
+def _normalize_genre():
+    from app.genres.service import _normalize_genre
+
+    rng = np.random.default_rng(SEED)
+    catalog = _catalog()
+    tags = [
+        _TAG_VARIANTS[rng.integers(len(_TAG_VARIANTS))](catalog.genres[rng.integers(len(catalog.genres))])
+        for _ in range(20_000)
+    ]
+    return lambda: [_normalize_genre(t) for t in tags]
+
+
+@case("genres.history_fold")
+def _genres_history():
+    from app.genres import service
+
+    catalog = _catalog()
+    rng = np.random.default_rng(SEED)
+    artists = rng.choice(len(catalog.artist_ids), 800, replace=False)
+    plays = [{"artist_key": int(artists[i]) + 1, "ms_played": int(ms)}
+             for i, ms in zip(rng.integers(0, len(artists), 50_000), rng.integers(30_000, 300_000, 50_000))]
+    genre_rows = [{"artist_key": int(a) + 1, "genres": catalog.artist_genres[a]} for a in artists]
+    service.scan = lambda *args, **kwargs: iter(plays)
+    service.supabase = _FakeSupabase({"artist_genres": genre_rows})
+    return lambda: service._get_genres_from_history("bench-user", "long_term", "2024-01-01")
+
+
+@case("history.normalize_track_identity")
+def _track_identity():
+    from app.history.service import _normalize_track_identity
+
+    catalog = _catalog()
+    rng = np.random.default_rng(SEED)
+    pairs = []
+    for t in rng.integers(0, len(catalog.track_ids), 10_000):
+        suffix = _TITLE_SUFFIXES[rng.integers(len(_TITLE_SUFFIXES))]
+        pairs.append((catalog.track_names[t] + suffix, catalog.artist_names[catalog.track_artist[t]]))
+    return lambda: [_normalize_track_identity(title, artist) for title, artist in pairs]
+
+
+@case("tracks.get_top_tracks")
+def _top_tracks():
+    from app.tracks import service
+
+    catalog = _catalog()
+    rng = np.random.default_rng(SEED)
+    top = rng.choice(len(catalog.track_ids), 50, replace=False)
+    tracks = [
+        {"spotify_track_id": catalog.track_ids[t], "track_name": catalog.track_names[t],
+         "artist_name": catalog.artist_names[catalog.track_artist[t]], "rank": rank,
+         "album_art_url": "https://i.scdn.co/image/x"}
+        for rank, t in enumerate(top, start=1)
+    ]
+    plays = [
+        {"spotify_track_uri": f"spotify:track:{catalog.track_ids[top[i]]}", "ms_played": int(ms),
+         "played_at": f"20{20 + i % 5}-0{1 + i % 9}-1{i % 10}T12:00:00+00:00"}
+        for i, ms in zip(rng.integers(0, 50, 40_000), rng.integers(30_000, 300_000, 40_000))
+    ]
+    history_top = [
+        {"spotify_track_uri": f"spotify:track:{catalog.track_ids[t]}", "track_name": catalog.track_names[t],
+         "artist_name": catalog.artist_names[catalog.track_artist[t]], "plays": 100, "total_ms": 10_000_000}
+        for t in rng.choice(len(catalog.track_ids), 50, replace=False)
+    ]
+    service.supabase = _FakeSupabase({"top_tracks": tracks})
+    service.scan = lambda *args, **kwargs: iter(plays)
+    service.rpc = lambda fn, params: history_top
+    return lambda: service.get_top_tracks("bench-user", "long_term", sp=None)
+
+
+def calibrate() -> float:
+    """Seconds for a fixed pure-Python workload — the machine-speed reference."""
+    def work():
+        d: dict = {}
+        for i in range(200_000):
+            d[i % 1000] = d.get(i % 1000, 0) + len(str(i))
+        return d
+    return measure(work)["best"]
+
+
+def measure(fn: Callable[[], object], min_time: float = MIN_TIME_SECS, repeat: int = REPEAT) -> dict:
+    """Best and median seconds per call over `repeat` rounds of at least `min_time` each."""
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time / 4 or loops >= 1 << 20:
+            break
+        loops *= 2
+    loops = max(1, int(loops * (min_time / max(elapsed, 1e-9))))
+
+    rounds = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        rounds.append((time.perf_counter() - started) / loops)
+    return {"best": min(rounds), "median": float(np.median(rounds)), "loops": loops}
+
+
+def run(names: List[str], repeat: int = REPEAT, log=print) -> Dict[str, dict]:
+    results = {}
+    for name in names:
+        fn = CASES[name]()
+        fn()  # warm caches and imports
+        results[name] = measure(fn, repeat=repeat)
+        log(f"  {name:<36} best {results[name]['best'] * 1000:>9.3f} ms   median {results[name]['median'] * 1000:>9.3f} ms")
+    return results
+
+
+def compare(results: Dict[str, dict], calibration: float, baseline: dict, threshold: float) -> List[str]:
+    """Cases slower than baseline by more than `threshold` (a fraction) after speed scaling."""
+    scale = calibration / baseline["calibration"]
+    regressions = []
+    for name, r in results.items():
+        base = baseline["cases"].get(name)
+        if not base:
+            continue
+        expected = base["best"] * scale
+        if r["best"] > expected * (1 + threshold):
+            regressions.append(
+                f"{name}: {r['best'] * 1000:.3f} ms vs {expected * 1000:.3f} ms expected "
+                f"(+{(r['best'] / expected - 1) * 100:.0f}%)"
+            )
+    return regressions
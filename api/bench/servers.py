@@ -0,0 +1,224 @@
+"""
+Local stand-ins the benchmarked app talks to over HTTP:
+
+  * a recording proxy in front of PostgREST, mounted at /rest/v1 like Supabase,
+    that counts round-trips and bytes so each endpoint's DB traffic is visible
+  * a fake Spotify Web API + accounts service serving the synthetic catalog
+
+Both run in-process on background uvicorn threads.
+"""
+
+import asyncio
+import socket
+import threading
+import time
+import zlib
+from typing import List, Optional
+from urllib.parse import parse_qs
+
+import httpx
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from bench.synthetic import Catalog
+
+# Hop-by-hop or body-encoding headers that must not be copied through the proxy.
+_DROP_HEADERS = {"host", "content-length", "content-encoding", "transfer-encoding", "connection"}
+
+
+class DbTraffic:
+    """Round-trips and bytes through the PostgREST proxy since the last reset()."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.calls = 0
+            self.bytes_in = 0
+            self.bytes_out = 0
+
+    def record(self, sent: int, received: int) -> None:
+        with self._lock:
+            self.calls += 1
+            self.bytes_out += sent
+            self.bytes_in += received
+
+
+def postgrest_proxy(upstream: str, traffic: DbTraffic) -> Starlette:
+    client = httpx.AsyncClient(base_url=upstream, timeout=120)
+
+    async def forward(request: Request) -> Response:
+        body = await request.body()
+        query = request.url.query
+        upstream_response = await client.request(
+            request.method,
+            "/" + request.path_params["path"] + (f"?{query}" if query else ""),
+            headers={k: v for k, v in request.headers.items() if k.lower() not in _DROP_HEADERS},
+            content=body,
+        )
+        traffic.record(len(body), len(upstream_response.content))
+        return Response(
+            upstream_response.content,
+            status_code=upstream_response.status_code,
+            headers={k: v for k, v in upstream_response.headers.items() if k.lower() not in _DROP_HEADERS},
+        )
+
+    methods = ["GET", "POST", "PATCH", "PUT", "DELETE", "HEAD"]
+    return Starlette(routes=[Route("/rest/v1/{path:path}", forward, methods=methods)])
+
+
+def fake_spotify(catalog: Catalog, latency_ms: float = 0) -> Starlette:
+    """Spotify Web API endpoints used by the app, answered from the synthetic catalog."""
+    n_artists = len(catalog.artist_ids)
+    artist_index = {aid: i for i, aid in enumerate(catalog.artist_ids)}
+    track_index = {tid: i for i, tid in enumerate(catalog.track_ids)}
+
+    def artist_json(a: int) -> dict:
+        return {
+            "id": catalog.artist_ids[a],
+            "name": catalog.artist_names[a],
+            "genres": catalog.artist_genres[a],
+            "popularity": int(catalog.artist_popularity[a]),
+            "followers": {"total": int(catalog.artist_popularity[a]) * 1_000},
+            "images": [{"url": f"https://i.scdn.co/image/artist-{catalog.artist_ids[a]}", "height": 640, "width": 640}],
+            "type": "artist",
+        }
+
+    def track_json(t: int) -> dict:
+        a = int(catalog.track_artist[t])
+        tid = catalog.track_ids[t]
+        return {
+            "id": tid,
+            "name": catalog.track_names[t],
+            "uri": f"spotify:track:{tid}",
+            "popularity": int(catalog.artist_popularity[a]),
+            "duration_ms": 180_000,
+            "preview_url": None,
+            "external_urls": {"spotify": f"https://open.spotify.com/track/{tid}"},
+            "artists": [{"id": catalog.artist_ids[a], "name": catalog.artist_names[a]}],
+            "album": {
+                "name": catalog.album_name(t),
+                "images": [{"url": f"https://i.scdn.co/image/album-{tid}", "height": 640, "width": 640}],
+            },
+            "type": "track",
+        }
+
+    def pick(request: Request, n: int, size: int) -> List[int]:
+        """A stable selection per (path, query, token) so repeated calls agree."""
+        key = f"{request.url.path}?{request.url.query}|{request.headers.get('authorization', '')}"
+        start = zlib.crc32(key.encode()) % size
+        return [(start + i * 7) % size for i in range(min(n, size))]
+
+    async def delay() -> None:
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+
+    async def token(request: Request) -> JSONResponse:
+        """Authorization codes are Spotify user ids; the access token carries the id to /v1/me."""
+        await delay()
+        form = {k: v[0] for k, v in parse_qs((await request.body()).decode()).items()}
+        body = {
+            "access_token": f"bench-access:{form.get('code', 'bench-user-1')}:{time.monotonic_ns()}",
+            "token_type": "Bearer",
+            "expires_in": 3600,
+            "scope": "user-top-read user-read-recently-played user-read-private user-read-email",
+        }
+        if form.get("grant_type") == "authorization_code":
+            body["refresh_token"] = "bench-refresh-token"
+        return JSONResponse(body)
+
+    async def me(request: Request) -> JSONResponse:
+        await delay()
+        token = request.headers.get("authorization", "").removeprefix("Bearer ")
+        spotify_id = token.split(":")[1] if token.count(":") >= 2 else "bench-user-1"
+        n = spotify_id.rsplit("-", 1)[-1]
+        return JSONResponse({"id": spotify_id, "display_name": f"Bench User {n}", "email": f"bench{n}@example.com",
+                             "images": []})
+
+    async def top(request: Request) -> JSONResponse:
+        await delay()
+        limit = int(request.query_params.get("limit", 20))
+        if request.path_params["kind"] == "artists":
+            items = [artist_json(a) for a in pick(request, limit, n_artists)]
+        else:
+            items = [track_json(t) for t in pick(request, limit, len(catalog.track_ids))]
+        return JSONResponse({"items": items, "total": len(items), "limit": limit, "offset": 0, "next": None})
+
+    async def recently_played(request: Request) -> JSONResponse:
+        await delay()
+        limit = int(request.query_params.get("limit", 20))
+        items = [{"track": track_json(t), "played_at": "2024-01-01T00:00:00Z"}
+                 for t in pick(request, limit, len(catalog.track_ids))]
+        return JSONResponse({"items": items, "next": None})
+
+    async def tracks(request: Request) -> JSONResponse:
+        await delay()
+        ids = request.query_params.get("ids", "").split(",")
+        return JSONResponse({"tracks": [track_json(track_index[i]) if i in track_index else None for i in ids]})
+
+    async def artists(request: Request) -> JSONResponse:
+        await delay()
+        ids = request.query_params.get("ids", "").split(",")
+        return JSONResponse({"artists": [artist_json(artist_index[i]) if i in artist_index else None for i in ids]})
+
+    async def artist(request: Request) -> JSONResponse:
+        await delay()
+        a = artist_index.get(request.path_params["id"])
+        if a is None:
+            return JSONResponse({"error": {"status": 404, "message": "Not found"}}, status_code=404)
+        return JSONResponse(artist_json(a))
+
+    async def related_artists(request: Request) -> JSONResponse:
+        await delay()
+        return JSONResponse({"artists": [artist_json(a) for a in pick(request, 20, n_artists)]})
+
+    async def artist_top_tracks(request: Request) -> JSONResponse:
+        await delay()
+        a = artist_index.get(request.path_params["id"], 0)
+        start, count = int(catalog.track_start[a]), int(catalog.track_count[a])
+        return JSONResponse({"tracks": [track_json(t) for t in range(start, start + min(count, 10))]})
+
+    return Starlette(routes=[
+        Route("/api/token", token, methods=["POST"]),
+        Route("/v1/me", me),
+        Route("/v1/me/top/{kind}", top),
+        Route("/v1/me/player/recently-played", recently_played),
+        Route("/v1/tracks", tracks),
+        Route("/v1/artists", artists),
+        Route("/v1/artists/{id}", artist),
+        Route("/v1/artists/{id}/related-artists", related_artists),
+        Route("/v1/artists/{id}/top-tracks", artist_top_tracks),
+    ])
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class BackgroundServer:
+    """Run an ASGI app with uvicorn on a daemon thread."""
+
+    def __init__(self, app, port: Optional[int] = None):
+        self.port = port or free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self._server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="warning"))
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    def start(self) -> "BackgroundServer":
+        self._thread.start()
+        while not self._server.started:
+            if not self._thread.is_alive():
+                raise RuntimeError(f"Server on port {self.port} failed to start")
+            time.sleep(0.01)
+        return self
+
+    def stop(self) -> None:
+        self._server.should_exit = True
+        self._thread.join(timeout=5)
@@ -0,0 +1,220 @@
+"""
+Synthetic listening data for benchmarks.
+
+A Catalog (artists, tracks, genres) is derived from the seed alone, so the
+fake Spotify server can rebuild exactly the catalog the database was loaded
+with. Per-user plays follow the shapes that make the real endpoints expensive:
+a few heavy users, Zipf-skewed artist and genre popularity, a diurnal listening
+curve and several years of history.
+"""
+
+import string
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from app.map.families import FAMILY_CHECKS, classify_family
+
+DEFAULTS = {
+    "seed": 42,
+    "users": 20,
+    "plays": 1_000_000,
+    "artists": 5_000,
+    "genres": 400,
+    "genre_skew": 1.2,   # Zipf exponent of genre popularity across artists
+    "years": 5,
+}
+
+TRACKS_PER_ARTIST = 8
+MIN_PLAYS_PER_USER = 100
+TOP_LIMIT = 50
+
+# Relative share of plays per hour of day (local time), evening-heavy.
+HOUR_WEIGHTS = np.array([
+    3, 2, 1, 1, 1, 1, 2, 4, 6, 6, 5, 5,
+    6, 6, 6, 6, 7, 8, 9, 10, 10, 9, 7, 5,
+], dtype=float)
+
+# (time_range, window in days) — mirrors tracks/artists services.
+RANGES = [("short_term", 28), ("medium_term", 180), ("long_term", None)]
+
+_ID_ALPHABET = np.array(list(string.ascii_letters + string.digits))
+_GENRE_PREFIXES = ["", "", "modern", "uk", "deep", "melodic", "experimental", "classic", "underground", "chill", "alt"]
+_NAME_WORDS = [
+    "velvet", "static", "paper", "northern", "glass", "midnight", "honey", "neon", "hollow", "silver",
+    "wild", "lunar", "coral", "quiet", "golden", "electric", "broken", "crystal", "desert", "ocean",
+    "echo", "river", "fever", "orchard", "signal", "ghost", "harbor", "bloom", "parade", "machine",
+]
+
+
+def _spotify_ids(rng: np.random.Generator, n: int) -> List[str]:
+    """n distinct 22-character base62 ids, like Spotify's."""
+    chars = _ID_ALPHABET[rng.integers(0, len(_ID_ALPHABET), size=(n, 22))]
+    return ["".join(row) for row in chars]
+
+
+def _zipf_weights(n: int, skew: float) -> np.ndarray:
+    weights = 1.0 / np.arange(1, n + 1) ** skew
+    return weights / weights.sum()
+
+
+def _genre_names(rng: np.random.Generator, n: int) -> List[str]:
+    keywords = [kw for _, kws in FAMILY_CHECKS for kw in kws]
+    names: List[str] = []
+    seen = set()
+    while len(names) < n:
+        name = f"{rng.choice(_GENRE_PREFIXES)} {rng.choice(keywords)}".strip()
+        if name in seen:
+            name = f"{name} {len(names)}"
+        seen.add(name)
+        names.append(name)
+    return names
+
+
+def _artist_names(rng: np.random.Generator, n: int) -> List[str]:
+    names: List[str] = []
+    taken: Counter = Counter()
+    for _ in range(n):
+        a, b = rng.choice(_NAME_WORDS, size=2, replace=False)
+        base = f"The {a.title()} {b.title()}s" if rng.random() < 0.3 else f"{a.title()} {b.title()}"
+        taken[base] += 1
+        names.append(base if taken[base] == 1 else f"{base} {taken[base]}")
+    return names
+
+
+class Catalog:
+    """Artists, tracks and genres shared by every synthetic user."""
+
+    def __init__(self, params: dict):
+        rng = np.random.default_rng(params["seed"])
+        n_artists = params["artists"]
+
+        self.genres = _genre_names(rng, params["genres"])
+        genre_weights = _zipf_weights(len(self.genres), params["genre_skew"])
+
+        self.artist_ids = _spotify_ids(rng, n_artists)
+        self.artist_names = _artist_names(rng, n_artists)
+        self.artist_genres = [
+            [self.genres[g] for g in rng.choice(len(self.genres), rng.integers(1, 5), replace=False, p=genre_weights)]
+            for _ in range(n_artists)
+        ]
+        self.artist_weights = _zipf_weights(n_artists, 1.0)[rng.permutation(n_artists)]
+        self.artist_popularity = np.clip((self.artist_weights / self.artist_weights.max()) ** 0.25 * 100, 1, 100).astype(int)
+
+        counts = 1 + rng.poisson(TRACKS_PER_ARTIST - 1, size=n_artists)
+        self.track_count = counts
+        self.track_start = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        self.track_artist = np.repeat(np.arange(n_artists), counts)
+        self.track_ids = _spotify_ids(rng, int(counts.sum()))
+        words = rng.choice(_NAME_WORDS, size=(len(self.track_ids), 2))
+        self.track_names = [f"{a.title()} {b.title()}" for a, b in words]
+
+    def album_name(self, track: int) -> str:
+        artist = self.track_artist[track]
+        return f"{self.artist_names[artist]} Vol. {1 + (track - self.track_start[artist]) // 4}"
+
+    def genre_families(self) -> List[Tuple[str, str]]:
+        return [(g, classify_family(g)) for g in self.genres]
+
+
+class UserPlays:
+    """One synthetic user's streaming history as parallel arrays."""
+
+    def __init__(self, catalog: Catalog, rng: np.random.Generator, n_plays: int, years: int, now: datetime):
+        n_artists = len(catalog.artist_ids)
+        n_fav = int(min(n_artists, max(50, rng.lognormal(5.5, 0.6))))
+        favourites = rng.choice(n_artists, n_fav, replace=False, p=catalog.artist_weights)
+        artists = favourites[rng.choice(n_fav, n_plays, p=_zipf_weights(n_fav, 1.1))]
+
+        # Earlier tracks of an artist (the "singles") get most of the plays.
+        skew = rng.random(n_plays) ** 2
+        tracks = catalog.track_start[artists] + (catalog.track_count[artists] * skew).astype(int)
+
+        span_days = years * 365
+        days = rng.integers(0, span_days, n_plays)
+        hours = rng.choice(24, n_plays, p=HOUR_WEIGHTS / HOUR_WEIGHTS.sum())
+        secs = rng.integers(0, 3600, n_plays)
+        start = now - timedelta(days=span_days)
+        offsets = (days * 86_400 + hours * 3_600 + secs).astype(np.int64)
+
+        offsets, keep = np.unique(offsets, return_index=True)
+        self.offsets = offsets
+        self.start = start
+        self.tracks = tracks[keep]
+        self.ms_played = np.clip(rng.lognormal(np.log(170_000), 0.5, len(keep)), 30_000, 900_000).astype(int)
+
+    def played_at(self, i: int) -> datetime:
+        return self.start + timedelta(seconds=int(self.offsets[i]))
+
+    def window(self, days, now: datetime) -> np.ndarray:
+        """Indexes of plays within the last `days` (all plays when None)."""
+        if days is None:
+            return np.arange(len(self.tracks))
+        cutoff = (now - timedelta(days=days) - self.start).total_seconds()
+        return np.nonzero(self.offsets >= cutoff)[0]
+
+
+def plays_per_user(params: dict) -> List[int]:
+    """Split the total play count across users with a heavy-tailed distribution."""
+    rng = np.random.default_rng(params["seed"] + 1)
+    weights = rng.lognormal(0, 1.0, params["users"])
+    counts = (weights / weights.sum() * params["plays"]).astype(int)
+    return [max(MIN_PLAYS_PER_USER, int(c)) for c in counts]
+
+
+def history_rows(catalog: Catalog, user_id: str, plays: UserPlays) -> Iterator[tuple]:
+    for i, track in enumerate(plays.tracks):
+        artist = catalog.track_artist[track]
+        yield (
+            user_id,
+            plays.played_at(i),
+            int(plays.ms_played[i]),
+            catalog.track_names[track],
+            catalog.artist_names[artist],
+            catalog.album_name(track),
+            f"spotify:track:{catalog.track_ids[track]}",
+        )
+
+
+def top_rows(catalog: Catalog, user_id: str, plays: UserPlays, now: datetime) -> Dict[str, List[tuple]]:
+    """top_tracks, top_artists and genre_snapshots rows, as a Spotify sync would leave them."""
+    rows: Dict[str, List[tuple]] = {"top_tracks": [], "top_artists": [], "genre_snapshots": []}
+    for time_range, days in RANGES:
+        idx = plays.window(days, now)
+        if not len(idx):
+            continue
+        track_counts = np.bincount(plays.tracks[idx], minlength=len(catalog.track_ids))
+        top_tracks = np.argsort(-track_counts)[:TOP_LIMIT]
+        top_tracks = top_tracks[track_counts[top_tracks] > 0]
+
+        artist_ms = np.bincount(catalog.track_artist[plays.tracks[idx]], weights=plays.ms_played[idx],
+                                minlength=len(catalog.artist_ids))
+        top_artists = np.argsort(-artist_ms)[:TOP_LIMIT]
+        top_artists = top_artists[artist_ms[top_artists] > 0]
+
+        genre_counts: Counter = Counter()
+        for rank, track in enumerate(top_tracks, start=1):
+            artist = catalog.track_artist[track]
+            genres = catalog.artist_genres[artist]
+            genre_counts.update(genres)
+            rows["top_tracks"].append((
+                user_id, catalog.track_ids[track], catalog.track_names[track], catalog.artist_names[artist],
+                catalog.album_name(track), None, int(catalog.artist_popularity[artist]), time_range, rank,
+                genres, now,
+            ))
+        for rank, artist in enumerate(top_artists, start=1):
+            rows["top_artists"].append((
+                user_id, catalog.artist_ids[artist], catalog.artist_names[artist], None,
+                catalog.artist_genres[artist], int(catalog.artist_popularity[artist]),
+                int(catalog.artist_popularity[artist]) * 1_000, time_range, rank, now,
+            ))
+        total = sum(genre_counts.values())
+        for genre, count in genre_counts.items():
+            rows["genre_snapshots"].append((user_id, time_range, genre, round(count / total * 100, 2), now))
+    return rows
+
+
+def now_utc() -> datetime:
+    return datetime.now(timezone.utc).replace(microsecond=0)
@@ -0,0 +1,30 @@
+-- Persist the genre → family classification so get_map_artists can return it
+-- precomputed and the map endpoint does no string matching at request time.
+-- Run this in the Supabase SQL editor, then populate it with:
+--   python3 scripts/classify_genre_families.py
+
+CREATE TABLE IF NOT EXISTS genre_families (
+    genre          TEXT        PRIMARY KEY,  -- lowercase genre tag
+    family         TEXT        NOT NULL,     -- see app/map/families.py, 'other' if unmatched
+    classified_at  TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_genre_families_family
+    ON genre_families (family);
+
+ALTER TABLE genre_families ENABLE ROW LEVEL SECURITY;
+
+-- Distinct genre tags across artist_genres that have no family row yet.
+CREATE OR REPLACE FUNCTION unclassified_genres()
+RETURNS TABLE (genre TEXT)
+LANGUAGE sql STABLE SECURITY DEFINER AS $$
+    SELECT DISTINCT LOWER(g) AS genre
+    FROM artist_genres ag, unnest(ag.genres) AS g
+    WHERE NOT EXISTS (
+        SELECT 1 FROM genre_families gf WHERE gf.genre = LOWER(g)
+    );
+$$;
+
+-- get_map_artists now also returns `families`, aligned index-for-index with
+-- `genres`. Re-run supabase/rpc_get_map_artists.sql after this migration.
+DROP FUNCTION IF EXISTS get_map_artists(UUID, TIMESTAMPTZ, BIGINT);
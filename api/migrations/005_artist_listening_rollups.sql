@@ -0,0 +1,82 @@
+-- Per-artist daily listening rollups for get_map_artists.
+-- Run this in the Supabase SQL editor, then re-run supabase/rpc_get_map_artists.sql.
+--
+-- get_map_artists used to join every qualifying streaming_history row to
+-- artist_genres on LOWER(artist_name) and group by the genres array. It now
+-- sums a (user, artist_key, day) rollup maintained on insert and joins
+-- artist_genres once per artist on an indexed normalized key.
+
+-- Normalized artist key: lowercase, trimmed. Used on both sides of the join.
+CREATE OR REPLACE FUNCTION normalize_artist_key(p_name TEXT)
+RETURNS TEXT LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+    SELECT LOWER(BTRIM(p_name));
+$$;
+
+ALTER TABLE artist_genres
+  ADD COLUMN IF NOT EXISTS artist_key TEXT
+    GENERATED ALWAYS AS (normalize_artist_key(artist_name)) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_artist_genres_artist_key
+    ON artist_genres (artist_key);
+
+-- ─────────────────────────────────────────────
+-- artist_listening_daily
+-- Only plays >= 30s are counted, matching the map's "meaningful play" rule.
+-- ─────────────────────────────────────────────
+CREATE TABLE IF NOT EXISTS artist_listening_daily (
+    user_id      UUID    NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    artist_key   TEXT    NOT NULL,
+    day          DATE    NOT NULL,
+    artist_name  TEXT    NOT NULL,  -- first display variant seen for this key
+    play_count   BIGINT  NOT NULL DEFAULT 0,
+    total_ms     BIGINT  NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, artist_key, day)
+);
+
+CREATE INDEX IF NOT EXISTS idx_artist_listening_daily_user_day
+    ON artist_listening_daily (user_id, day);
+
+ALTER TABLE artist_listening_daily ENABLE ROW LEVEL SECURITY;
+
+-- Statement-level trigger: one aggregate upsert per import batch, not per row.
+-- streaming_history upserts use ON CONFLICT DO NOTHING, so new_rows holds
+-- only genuinely inserted plays and nothing is double counted.
+CREATE OR REPLACE FUNCTION rollup_artist_listening()
+RETURNS TRIGGER LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO artist_listening_daily AS d
+           (user_id, artist_key, day, artist_name, play_count, total_ms)
+    SELECT user_id,
+           normalize_artist_key(artist_name),
+           (played_at AT TIME ZONE 'UTC')::date,
+           MIN(artist_name),
+           COUNT(*),
+           SUM(ms_played)
+    FROM new_rows
+    WHERE ms_played >= 30000 AND artist_name IS NOT NULL
+    GROUP BY 1, 2, 3
+    ON CONFLICT (user_id, artist_key, day) DO UPDATE
+       SET play_count = d.play_count + EXCLUDED.play_count,
+           total_ms   = d.total_ms   + EXCLUDED.total_ms;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_streaming_history_rollup ON streaming_history;
+CREATE TRIGGER trg_streaming_history_rollup
+    AFTER INSERT ON streaming_history
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION rollup_artist_listening();
+
+-- Backfill from existing history (safe to re-run: rebuilds from scratch).
+TRUNCATE artist_listening_daily;
+INSERT INTO artist_listening_daily (user_id, artist_key, day, artist_name, play_count, total_ms)
+SELECT user_id,
+       normalize_artist_key(artist_name),
+       (played_at AT TIME ZONE 'UTC')::date,
+       MIN(artist_name),
+       COUNT(*),
+       SUM(ms_played)
+FROM streaming_history
+WHERE ms_played >= 30000 AND artist_name IS NOT NULL
+GROUP BY 1, 2, 3;
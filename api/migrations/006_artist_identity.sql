@@ -0,0 +1,236 @@
+-- Stable integer identity for artists across streaming_history, top_artists
+-- and artist_genres. Run this in the Supabase SQL editor after 005, then
+-- re-run supabase/rpc_get_map_artists.sql.
+--
+-- Artist matching used to be done on raw names (ILIKE, LOWER(), lowercase
+-- dict keys), none of which could use an index. Every name variant now maps
+-- to one artist_key via artist_name_variants, and the tables carry that key
+-- in an indexed BIGINT column filled by BEFORE INSERT triggers.
+
+-- ─────────────────────────────────────────────
+-- artist_identities / artist_name_variants
+-- ─────────────────────────────────────────────
+CREATE TABLE IF NOT EXISTS artist_identities (
+    artist_key         BIGINT      GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+    display_name       TEXT        NOT NULL,
+    spotify_artist_id  TEXT        UNIQUE,
+    created_at         TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS artist_name_variants (
+    name_norm   TEXT    PRIMARY KEY,  -- normalize_artist_key(name)
+    artist_key  BIGINT  NOT NULL REFERENCES artist_identities(artist_key) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_artist_name_variants_key
+    ON artist_name_variants (artist_key);
+
+ALTER TABLE artist_identities     ENABLE ROW LEVEL SECURITY;
+ALTER TABLE artist_name_variants  ENABLE ROW LEVEL SECURITY;
+
+-- Return the artist_key for a name (creating the identity if it is new).
+-- A known Spotify artist id links the variant to that identity, and is
+-- recorded on an existing identity that doesn't have one yet.
+CREATE OR REPLACE FUNCTION resolve_artist_key(p_name TEXT, p_spotify_artist_id TEXT DEFAULT NULL)
+RETURNS BIGINT LANGUAGE plpgsql AS $$
+DECLARE
+    v_norm TEXT := normalize_artist_key(p_name);
+    v_key  BIGINT;
+BEGIN
+    IF v_norm IS NULL OR v_norm = '' THEN
+        RETURN NULL;
+    END IF;
+
+    SELECT artist_key INTO v_key FROM artist_name_variants WHERE name_norm = v_norm;
+
+    IF v_key IS NOT NULL THEN
+        IF p_spotify_artist_id IS NOT NULL THEN
+            UPDATE artist_identities
+               SET spotify_artist_id = p_spotify_artist_id
+             WHERE artist_key = v_key
+               AND spotify_artist_id IS NULL
+               AND NOT EXISTS (
+                   SELECT 1 FROM artist_identities WHERE spotify_artist_id = p_spotify_artist_id
+               );
+        END IF;
+        RETURN v_key;
+    END IF;
+
+    IF p_spotify_artist_id IS NOT NULL THEN
+        SELECT artist_key INTO v_key FROM artist_identities WHERE spotify_artist_id = p_spotify_artist_id;
+    END IF;
+
+    IF v_key IS NULL THEN
+        INSERT INTO artist_identities (display_name, spotify_artist_id)
+        VALUES (BTRIM(p_name), p_spotify_artist_id)
+        RETURNING artist_key INTO v_key;
+    END IF;
+
+    INSERT INTO artist_name_variants (name_norm, artist_key)
+    VALUES (v_norm, v_key)
+    ON CONFLICT (name_norm) DO NOTHING;
+
+    -- a concurrent insert may have won the variant row — return its key
+    SELECT artist_key INTO v_key FROM artist_name_variants WHERE name_norm = v_norm;
+    RETURN v_key;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION set_artist_key_from_name()
+RETURNS TRIGGER LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.artist_key := resolve_artist_key(NEW.artist_name);
+    RETURN NEW;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION set_artist_key_from_spotify()
+RETURNS TRIGGER LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.artist_key := resolve_artist_key(NEW.artist_name, NEW.spotify_artist_id);
+    RETURN NEW;
+END;
+$$;
+
+-- Seed identities: Spotify-identified names first so their ids stick.
+SELECT resolve_artist_key(artist_name, spotify_artist_id)
+FROM (SELECT DISTINCT artist_name, spotify_artist_id FROM top_artists) t;
+
+SELECT resolve_artist_key(artist_name, spotify_artist_id)
+FROM (SELECT DISTINCT artist_name, spotify_artist_id FROM artist_genres) t;
+
+SELECT resolve_artist_key(artist_name)
+FROM (SELECT DISTINCT artist_name FROM streaming_history) t;
+
+-- ─────────────────────────────────────────────
+-- streaming_history.artist_key
+-- ─────────────────────────────────────────────
+ALTER TABLE streaming_history ADD COLUMN IF NOT EXISTS artist_key BIGINT
+    REFERENCES artist_identities(artist_key);
+
+UPDATE streaming_history sh
+   SET artist_key = v.artist_key
+  FROM artist_name_variants v
+ WHERE v.name_norm = normalize_artist_key(sh.artist_name)
+   AND sh.artist_key IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_sh_user_artist_key
+    ON streaming_history (user_id, artist_key);
+
+DROP TRIGGER IF EXISTS trg_streaming_history_artist_key ON streaming_history;
+CREATE TRIGGER trg_streaming_history_artist_key
+    BEFORE INSERT OR UPDATE OF artist_name ON streaming_history
+    FOR EACH ROW EXECUTE FUNCTION set_artist_key_from_name();
+
+-- ─────────────────────────────────────────────
+-- top_artists.artist_key
+-- ─────────────────────────────────────────────
+ALTER TABLE top_artists ADD COLUMN IF NOT EXISTS artist_key BIGINT
+    REFERENCES artist_identities(artist_key);
+
+UPDATE top_artists ta
+   SET artist_key = v.artist_key
+  FROM artist_name_variants v
+ WHERE v.name_norm = normalize_artist_key(ta.artist_name)
+   AND ta.artist_key IS NULL;
+
+DROP TRIGGER IF EXISTS trg_top_artists_artist_key ON top_artists;
+CREATE TRIGGER trg_top_artists_artist_key
+    BEFORE INSERT OR UPDATE OF artist_name, spotify_artist_id ON top_artists
+    FOR EACH ROW EXECUTE FUNCTION set_artist_key_from_spotify();
+
+-- ─────────────────────────────────────────────
+-- artist_genres.artist_key — replaces the TEXT key from migration 005
+-- ─────────────────────────────────────────────
+ALTER TABLE artist_genres DROP COLUMN IF EXISTS artist_key;
+ALTER TABLE artist_genres ADD COLUMN artist_key BIGINT
+    REFERENCES artist_identities(artist_key);
+
+UPDATE artist_genres ag
+   SET artist_key = v.artist_key
+  FROM artist_name_variants v
+ WHERE v.name_norm = normalize_artist_key(ag.artist_name);
+
+CREATE INDEX IF NOT EXISTS idx_artist_genres_artist_key
+    ON artist_genres (artist_key);
+
+DROP TRIGGER IF EXISTS trg_artist_genres_artist_key ON artist_genres;
+CREATE TRIGGER trg_artist_genres_artist_key
+    BEFORE INSERT OR UPDATE OF artist_name, spotify_artist_id ON artist_genres
+    FOR EACH ROW EXECUTE FUNCTION set_artist_key_from_spotify();
+
+-- ─────────────────────────────────────────────
+-- artist_listening_daily — rekeyed on the integer artist_key
+-- ─────────────────────────────────────────────
+DROP TABLE IF EXISTS artist_listening_daily;
+CREATE TABLE artist_listening_daily (
+    user_id      UUID    NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    artist_key   BIGINT  NOT NULL REFERENCES artist_identities(artist_key),
+    day          DATE    NOT NULL,
+    play_count   BIGINT  NOT NULL DEFAULT 0,
+    total_ms     BIGINT  NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, artist_key, day)
+);
+
+CREATE INDEX IF NOT EXISTS idx_artist_listening_daily_user_day
+    ON artist_listening_daily (user_id, day);
+
+ALTER TABLE artist_listening_daily ENABLE ROW LEVEL SECURITY;
+
+CREATE OR REPLACE FUNCTION rollup_artist_listening()
+RETURNS TRIGGER LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO artist_listening_daily AS d
+           (user_id, artist_key, day, play_count, total_ms)
+    SELECT user_id,
+           artist_key,
+           (played_at AT TIME ZONE 'UTC')::date,
+           COUNT(*),
+           SUM(ms_played)
+    FROM new_rows
+    WHERE ms_played >= 30000 AND artist_key IS NOT NULL
+    GROUP BY 1, 2, 3
+    ON CONFLICT (user_id, artist_key, day) DO UPDATE
+       SET play_count = d.play_count + EXCLUDED.play_count,
+           total_ms   = d.total_ms   + EXCLUDED.total_ms;
+    RETURN NULL;
+END;
+$$;
+
+INSERT INTO artist_listening_daily (user_id, artist_key, day, play_count, total_ms)
+SELECT user_id,
+       artist_key,
+       (played_at AT TIME ZONE 'UTC')::date,
+       COUNT(*),
+       SUM(ms_played)
+FROM streaming_history
+WHERE ms_played >= 30000 AND artist_key IS NOT NULL
+GROUP BY 1, 2, 3;
+
+-- ── Top artists grouped by identity instead of raw name ─────────────────────
+CREATE OR REPLACE FUNCTION history_top_artists(
+  p_user_id text,
+  p_year    int  DEFAULT NULL,
+  p_limit   int  DEFAULT 25
+)
+RETURNS jsonb LANGUAGE sql STABLE SECURITY DEFINER AS $$
+  SELECT COALESCE(jsonb_agg(row), '[]'::jsonb)
+  FROM (
+    SELECT jsonb_build_object(
+      'artist_key',     sh.artist_key,
+      'artist_name',    MIN(sh.artist_name),
+      'plays',          COUNT(*),
+      'total_ms',       SUM(sh.ms_played),
+      'unique_tracks',  COUNT(DISTINCT sh.spotify_track_uri)
+    ) AS row
+    FROM streaming_history sh
+    WHERE
+      sh.user_id      = p_user_id
+      AND sh.artist_key IS NOT NULL
+      AND sh.track_name IS NOT NULL
+      AND (p_year IS NULL OR EXTRACT(YEAR FROM sh.played_at) = p_year)
+    GROUP BY sh.artist_key
+    ORDER BY SUM(sh.ms_played) DESC
+    LIMIT p_limit
+  ) t;
+$$;
@@ -0,0 +1,13 @@
+-- Distinct Spotify track ids a user has ever streamed.
+-- Backs the in-process seen-track set the recommender filters against.
+-- Run this in the Supabase SQL editor.
+
+CREATE OR REPLACE FUNCTION history_distinct_track_ids(p_user_id UUID)
+RETURNS TABLE (spotify_track_id TEXT)
+LANGUAGE sql STABLE SECURITY DEFINER AS $$
+    SELECT DISTINCT sh.spotify_track_id
+    FROM streaming_history sh
+    WHERE sh.user_id = p_user_id
+      AND sh.spotify_track_id IS NOT NULL
+      AND sh.spotify_track_id <> '';
+$$;
@@ -0,0 +1,153 @@
+-- Offline item-item recommender built from co-listening sessions across all users.
+-- Run this in the Supabase SQL editor, then build it with:
+--   python3 scripts/build_item_similarity.py --full
+-- and refresh incrementally (e.g. nightly) with:
+--   python3 scripts/build_item_similarity.py
+
+CREATE INDEX IF NOT EXISTS idx_sh_user_track_id
+    ON streaming_history (user_id, spotify_track_id);
+
+-- ─────────────────────────────────────────────
+-- item_tracks — per-track session counts + display metadata
+-- ─────────────────────────────────────────────
+CREATE TABLE IF NOT EXISTS item_tracks (
+    spotify_track_id  TEXT    PRIMARY KEY,
+    track_name        TEXT,
+    artist_name       TEXT,
+    album_name        TEXT,
+    sessions          BIGINT  NOT NULL DEFAULT 0
+);
+
+-- ─────────────────────────────────────────────
+-- track_cooccurrence — sessions in which both tracks were played (track_a < track_b)
+-- ─────────────────────────────────────────────
+CREATE TABLE IF NOT EXISTS track_cooccurrence (
+    track_a   TEXT    NOT NULL,
+    track_b   TEXT    NOT NULL,
+    sessions  BIGINT  NOT NULL DEFAULT 0,
+    PRIMARY KEY (track_a, track_b),
+    CHECK (track_a < track_b)
+);
+
+CREATE INDEX IF NOT EXISTS idx_track_cooccurrence_b
+    ON track_cooccurrence (track_b);
+
+-- ─────────────────────────────────────────────
+-- item_similarity — materialized top-k neighbours (cosine over sessions)
+-- ─────────────────────────────────────────────
+CREATE TABLE IF NOT EXISTS item_similarity (
+    spotify_track_id  TEXT  NOT NULL,
+    similar_track_id  TEXT  NOT NULL,
+    score             REAL  NOT NULL,
+    PRIMARY KEY (spotify_track_id, similar_track_id)
+);
+
+CREATE TABLE IF NOT EXISTS item_similarity_state (
+    id            BOOLEAN     PRIMARY KEY DEFAULT TRUE CHECK (id),
+    watermark     TIMESTAMPTZ,  -- latest played_at folded into the counts
+    refreshed_at  TIMESTAMPTZ
+);
+
+ALTER TABLE item_tracks            ENABLE ROW LEVEL SECURITY;
+ALTER TABLE track_cooccurrence     ENABLE ROW LEVEL SECURITY;
+ALTER TABLE item_similarity        ENABLE ROW LEVEL SECURITY;
+ALTER TABLE item_similarity_state  ENABLE ROW LEVEL SECURITY;
+
+-- Wipe all recommender state before a full rebuild.
+CREATE OR REPLACE FUNCTION reset_item_similarity()
+RETURNS void LANGUAGE sql SECURITY DEFINER AS $$
+    TRUNCATE item_tracks, track_cooccurrence, item_similarity, item_similarity_state;
+$$;
+
+-- Add session counts from an incremental batch (counts are summed, not replaced).
+CREATE OR REPLACE FUNCTION merge_item_cooccurrence(p_tracks JSONB, p_pairs JSONB)
+RETURNS void LANGUAGE sql SECURITY DEFINER AS $$
+    INSERT INTO item_tracks AS it (spotify_track_id, track_name, artist_name, album_name, sessions)
+    SELECT spotify_track_id, track_name, artist_name, album_name, sessions
+    FROM jsonb_to_recordset(p_tracks)
+         AS t(spotify_track_id TEXT, track_name TEXT, artist_name TEXT, album_name TEXT, sessions BIGINT)
+    ON CONFLICT (spotify_track_id) DO UPDATE
+       SET sessions    = it.sessions + EXCLUDED.sessions,
+           track_name  = COALESCE(it.track_name, EXCLUDED.track_name),
+           artist_name = COALESCE(it.artist_name, EXCLUDED.artist_name),
+           album_name  = COALESCE(it.album_name, EXCLUDED.album_name);
+
+    INSERT INTO track_cooccurrence AS c (track_a, track_b, sessions)
+    SELECT track_a, track_b, sessions
+    FROM jsonb_to_recordset(p_pairs) AS p(track_a TEXT, track_b TEXT, sessions BIGINT)
+    ON CONFLICT (track_a, track_b) DO UPDATE
+       SET sessions = c.sessions + EXCLUDED.sessions;
+$$;
+
+-- Recompute the top-k neighbour lists of the given tracks from the counts.
+CREATE OR REPLACE FUNCTION refresh_item_similarity(p_track_ids TEXT[], p_k INT DEFAULT 50)
+RETURNS void LANGUAGE sql SECURITY DEFINER AS $$
+    DELETE FROM item_similarity WHERE spotify_track_id = ANY(p_track_ids);
+
+    INSERT INTO item_similarity (spotify_track_id, similar_track_id, score)
+    SELECT src, dst, score
+    FROM (
+        SELECT src, dst, score,
+               ROW_NUMBER() OVER (PARTITION BY src ORDER BY score DESC) AS rn
+        FROM (
+            SELECT c.track_a AS src, c.track_b AS dst,
+                   c.sessions / SQRT(ta.sessions::float8 * tb.sessions) AS score
+            FROM track_cooccurrence c
+            JOIN item_tracks ta ON ta.spotify_track_id = c.track_a
+            JOIN item_tracks tb ON tb.spotify_track_id = c.track_b
+            WHERE c.track_a = ANY(p_track_ids)
+            UNION ALL
+            SELECT c.track_b, c.track_a,
+                   c.sessions / SQRT(ta.sessions::float8 * tb.sessions)
+            FROM track_cooccurrence c
+            JOIN item_tracks ta ON ta.spotify_track_id = c.track_a
+            JOIN item_tracks tb ON tb.spotify_track_id = c.track_b
+            WHERE c.track_b = ANY(p_track_ids)
+        ) pairs
+    ) ranked
+    WHERE rn <= p_k;
+$$;
+
+-- Candidates for a user: neighbours of their most-listened recent tracks,
+-- summed over seeds, excluding anything already in their history.
+-- p_seed_days NULL seeds from all-time listening.
+CREATE OR REPLACE FUNCTION recommend_similar_tracks(
+    p_user_id     UUID,
+    p_seed_days   INT DEFAULT 90,
+    p_seed_limit  INT DEFAULT 25,
+    p_limit       INT DEFAULT 50
+)
+RETURNS TABLE (
+    spotify_track_id  TEXT,
+    track_name        TEXT,
+    artist_name       TEXT,
+    album_name        TEXT,
+    score             FLOAT8
+)
+LANGUAGE sql STABLE SECURITY DEFINER AS $$
+    WITH seeds AS (
+        SELECT sh.spotify_track_id
+        FROM streaming_history sh
+        WHERE sh.user_id = p_user_id
+          AND sh.ms_played >= 30000
+          AND (p_seed_days IS NULL OR sh.played_at >= NOW() - make_interval(days => p_seed_days))
+        GROUP BY sh.spotify_track_id
+        ORDER BY SUM(sh.ms_played) DESC
+        LIMIT p_seed_limit
+    ),
+    candidates AS (
+        SELECT s.similar_track_id, SUM(s.score) AS score
+        FROM item_similarity s
+        JOIN seeds ON seeds.spotify_track_id = s.spotify_track_id
+        GROUP BY s.similar_track_id
+    )
+    SELECT c.similar_track_id, it.track_name, it.artist_name, it.album_name, c.score
+    FROM candidates c
+    JOIN item_tracks it ON it.spotify_track_id = c.similar_track_id
+    WHERE NOT EXISTS (
+        SELECT 1 FROM streaming_history sh
+        WHERE sh.user_id = p_user_id AND sh.spotify_track_id = c.similar_track_id
+    )
+    ORDER BY c.score DESC
+    LIMIT p_limit;
+$$;
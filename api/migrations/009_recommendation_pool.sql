@@ -0,0 +1,22 @@
+-- Per-user pool of precomputed recommendation candidates.
+-- Refreshed in the background after sync (or by scripts/refresh_recommendation_pools.py)
+-- and served page by page with a rank cursor. Run this in the Supabase SQL editor.
+
+CREATE TABLE IF NOT EXISTS recommendation_pool (
+    user_id           UUID        NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    spotify_track_id  TEXT        NOT NULL,
+    rank              INT         NOT NULL,
+    score             REAL,                 -- co-listening score; NULL for Spotify-sourced tracks
+    source            TEXT        NOT NULL, -- 'co_listening' | 'related_artists'
+    track             JSONB       NOT NULL, -- formatted Recommendation payload
+    dismissed_at      TIMESTAMPTZ,          -- set by POST /recommendations/{id}/dismiss
+    created_at        TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (user_id, spotify_track_id)
+);
+
+-- Serving path: WHERE user_id = ? AND dismissed_at IS NULL AND rank > cursor ORDER BY rank
+CREATE INDEX IF NOT EXISTS idx_recommendation_pool_serving
+    ON recommendation_pool (user_id, rank)
+    WHERE dismissed_at IS NULL;
+
+ALTER TABLE recommendation_pool ENABLE ROW LEVEL SECURITY;
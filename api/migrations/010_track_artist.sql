@@ -0,0 +1,86 @@
+-- Persistent track → primary artist mapping.
+-- Run this in the Supabase SQL editor.
+--
+-- enrich_artist_genres.py used to re-fetch every distinct track through the
+-- Spotify /tracks endpoint on each run just to learn its primary artist id.
+-- Imports now register new track ids here as pending (resolved_at IS NULL),
+-- top-track sync records the artist it already knows, and the enricher only
+-- resolves what is still pending.
+
+CREATE TABLE IF NOT EXISTS track_artist (
+    spotify_track_id   TEXT        PRIMARY KEY,
+    spotify_artist_id  TEXT,                  -- primary artist; NULL if Spotify doesn't know the track
+    artist_name        TEXT,
+    resolved_at        TIMESTAMPTZ,           -- NULL = not looked up yet
+    created_at         TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_track_artist_pending
+    ON track_artist (spotify_track_id)
+    WHERE resolved_at IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_track_artist_artist
+    ON track_artist (spotify_artist_id);
+
+ALTER TABLE track_artist ENABLE ROW LEVEL SECURITY;
+
+-- Statement-level: one insert per import batch. Existing mappings are untouched.
+CREATE OR REPLACE FUNCTION register_history_tracks()
+RETURNS TRIGGER LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO track_artist (spotify_track_id)
+    SELECT DISTINCT spotify_track_id
+    FROM new_rows
+    WHERE spotify_track_uri LIKE 'spotify:track:%'
+    ON CONFLICT (spotify_track_id) DO NOTHING;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_streaming_history_track_artist ON streaming_history;
+CREATE TRIGGER trg_streaming_history_track_artist
+    AFTER INSERT ON streaming_history
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION register_history_tracks();
+
+-- Backfill pending rows for everything already imported.
+INSERT INTO track_artist (spotify_track_id)
+SELECT DISTINCT spotify_track_id
+FROM streaming_history
+WHERE spotify_track_uri LIKE 'spotify:track:%'
+ON CONFLICT (spotify_track_id) DO NOTHING;
+
+-- Track ids in a user's history that still need a Spotify lookup.
+-- Returned as one JSONB array so PostgREST's row cap doesn't truncate it.
+CREATE OR REPLACE FUNCTION unresolved_track_ids(p_user_id UUID)
+RETURNS jsonb LANGUAGE sql STABLE SECURITY DEFINER AS $$
+    SELECT COALESCE(jsonb_agg(t.spotify_track_id), '[]'::jsonb)
+    FROM (
+        SELECT DISTINCT sh.spotify_track_id
+        FROM streaming_history sh
+        LEFT JOIN track_artist ta ON ta.spotify_track_id = sh.spotify_track_id
+        WHERE sh.user_id = p_user_id
+          AND sh.spotify_track_uri LIKE 'spotify:track:%'
+          AND ta.resolved_at IS NULL
+    ) t;
+$$;
+
+-- Distinct primary artists of the tracks in a user's history.
+CREATE OR REPLACE FUNCTION user_track_artists(p_user_id UUID)
+RETURNS jsonb LANGUAGE sql STABLE SECURITY DEFINER AS $$
+    SELECT COALESCE(jsonb_agg(jsonb_build_object(
+               'spotify_artist_id', a.spotify_artist_id,
+               'artist_name',       a.artist_name
+           )), '[]'::jsonb)
+    FROM (
+        SELECT DISTINCT ON (ta.spotify_artist_id) ta.spotify_artist_id, ta.artist_name
+        FROM track_artist ta
+        WHERE ta.spotify_artist_id IS NOT NULL
+          AND EXISTS (
+              SELECT 1 FROM streaming_history sh
+              WHERE sh.user_id = p_user_id
+                AND sh.spotify_track_id = ta.spotify_track_id
+          )
+        ORDER BY ta.spotify_artist_id
+    ) a;
+$$;
@@ -0,0 +1,94 @@
+-- Set-based, incremental cleaning of non-genre tags in artist_genres.
+-- Run this in the Supabase SQL editor, then clean with:
+--   python3 scripts/clean_genre_tags.py
+--
+-- clean_genre_tags.py used to read the whole table and send one UPDATE per
+-- changed row. The filtering now happens in a single UPDATE inside
+-- clean_genre_tags(), restricted to rows whose genres changed since the last
+-- clean (artist_genres.updated_at > watermark).
+
+ALTER TABLE artist_genres
+  ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ DEFAULT NOW();
+
+UPDATE artist_genres
+   SET updated_at = COALESCE(fetched_at, NOW())
+ WHERE updated_at IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_artist_genres_updated_at
+    ON artist_genres (updated_at);
+
+CREATE OR REPLACE FUNCTION touch_artist_genres_updated_at()
+RETURNS TRIGGER LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.updated_at := NOW();
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_artist_genres_updated_at ON artist_genres;
+CREATE TRIGGER trg_artist_genres_updated_at
+    BEFORE INSERT OR UPDATE OF genres ON artist_genres
+    FOR EACH ROW EXECUTE FUNCTION touch_artist_genres_updated_at();
+
+CREATE TABLE IF NOT EXISTS genre_clean_state (
+    id              BOOLEAN     PRIMARY KEY DEFAULT TRUE CHECK (id),
+    watermark       TIMESTAMPTZ,  -- rows updated after this haven't been cleaned
+    blocklist_hash  TEXT,         -- md5 of the blocklist the watermark applies to
+    cleaned_at      TIMESTAMPTZ
+);
+
+ALTER TABLE genre_clean_state ENABLE ROW LEVEL SECURITY;
+
+-- Remove p_blocked tags (lowercase) from every artist's genres, keeping tag
+-- order. Only rows updated since the last clean are scanned unless the
+-- blocklist changed or p_full is set.
+CREATE OR REPLACE FUNCTION clean_genre_tags(p_blocked TEXT[], p_full BOOLEAN DEFAULT FALSE)
+RETURNS jsonb LANGUAGE plpgsql SECURITY DEFINER AS $$
+DECLARE
+    v_hash     TEXT := md5(array_to_string(ARRAY(SELECT DISTINCT unnest(p_blocked) ORDER BY 1), E'\n'));
+    v_since    TIMESTAMPTZ;
+    v_cleaned  BIGINT;
+    v_emptied  BIGINT;
+BEGIN
+    IF NOT p_full THEN
+        SELECT watermark INTO v_since FROM genre_clean_state WHERE blocklist_hash = v_hash;
+    END IF;
+
+    WITH dirty AS (
+        SELECT ag.id,
+               COALESCE(
+                   array_agg(u.tag ORDER BY u.ord) FILTER (WHERE LOWER(BTRIM(u.tag)) <> ALL(p_blocked)),
+                   '{}'
+               ) AS genres
+        FROM artist_genres ag, unnest(ag.genres) WITH ORDINALITY AS u(tag, ord)
+        WHERE (v_since IS NULL OR ag.updated_at > v_since)
+        GROUP BY ag.id
+        HAVING bool_or(LOWER(BTRIM(u.tag)) = ANY(p_blocked))
+    ),
+    cleaned AS (
+        UPDATE artist_genres ag
+           SET genres = dirty.genres
+          FROM dirty
+         WHERE ag.id = dirty.id
+        RETURNING ag.genres
+    )
+    SELECT COUNT(*), COUNT(*) FILTER (WHERE cardinality(genres) = 0)
+      INTO v_cleaned, v_emptied
+      FROM cleaned;
+
+    -- NOW() is the transaction start, which is also the updated_at the
+    -- trigger just stamped on cleaned rows, so they aren't rescanned.
+    INSERT INTO genre_clean_state (id, watermark, blocklist_hash, cleaned_at)
+    VALUES (TRUE, NOW(), v_hash, NOW())
+    ON CONFLICT (id) DO UPDATE
+       SET watermark      = EXCLUDED.watermark,
+           blocklist_hash = EXCLUDED.blocklist_hash,
+           cleaned_at     = EXCLUDED.cleaned_at;
+
+    RETURN jsonb_build_object(
+        'cleaned', v_cleaned,
+        'emptied', v_emptied,
+        'since',   v_since
+    );
+END;
+$$;
@@ -0,0 +1,84 @@
+-- Global work queues for scripts/enrichment_worker.py.
+-- Run this in the Supabase SQL editor after 010 and 011.
+--
+-- The worker enriches tracks and artists seen by any user. Each queue is a
+-- query over existing tables, so work is deduped globally by their keys:
+--   tracks   track_artist rows not resolved yet (filled by imports, see 010)
+--   artists  primary artists from track_artist with no artist_genres row yet
+--   lastfm   artist_genres rows with empty genres never checked on Last.fm
+-- p_exclude lets the worker skip items that recently kept failing.
+
+ALTER TABLE artist_genres
+  ADD COLUMN IF NOT EXISTS lastfm_checked_at TIMESTAMPTZ;
+
+CREATE INDEX IF NOT EXISTS idx_artist_genres_lastfm_pending
+    ON artist_genres (artist_name)
+    WHERE genres = '{}' AND lastfm_checked_at IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_artist_genres_spotify_artist_id
+    ON artist_genres (spotify_artist_id);
+
+-- Artists with no Spotify-identified artist_genres row, by id or by name.
+-- Rows from the old name search (spotify_artist_id NULL) don't count, so
+-- they get overwritten with accurate genres.
+CREATE OR REPLACE FUNCTION pending_artists()
+RETURNS TABLE (spotify_artist_id TEXT, artist_name TEXT)
+LANGUAGE sql STABLE SECURITY DEFINER AS $$
+    SELECT DISTINCT ON (ta.spotify_artist_id) ta.spotify_artist_id, ta.artist_name
+    FROM track_artist ta
+    WHERE ta.spotify_artist_id IS NOT NULL
+      AND NOT EXISTS (
+          SELECT 1 FROM artist_genres ag
+          WHERE ag.spotify_artist_id = ta.spotify_artist_id
+             OR (LOWER(ag.artist_name) = LOWER(ta.artist_name) AND ag.spotify_artist_id IS NOT NULL)
+      )
+    ORDER BY ta.spotify_artist_id;
+$$;
+
+CREATE OR REPLACE FUNCTION pending_track_ids(p_limit INT, p_exclude TEXT[] DEFAULT '{}')
+RETURNS jsonb LANGUAGE sql STABLE SECURITY DEFINER AS $$
+    SELECT COALESCE(jsonb_agg(t.spotify_track_id), '[]'::jsonb)
+    FROM (
+        SELECT spotify_track_id
+        FROM track_artist
+        WHERE resolved_at IS NULL
+          AND spotify_track_id <> ALL(p_exclude)
+        ORDER BY created_at
+        LIMIT p_limit
+    ) t;
+$$;
+
+CREATE OR REPLACE FUNCTION unenriched_artists(p_limit INT, p_exclude TEXT[] DEFAULT '{}')
+RETURNS jsonb LANGUAGE sql STABLE SECURITY DEFINER AS $$
+    SELECT COALESCE(jsonb_agg(jsonb_build_object(
+               'spotify_artist_id', p.spotify_artist_id,
+               'artist_name',       p.artist_name
+           )), '[]'::jsonb)
+    FROM (
+        SELECT * FROM pending_artists()
+        WHERE spotify_artist_id <> ALL(p_exclude)
+        LIMIT p_limit
+    ) p;
+$$;
+
+CREATE OR REPLACE FUNCTION pending_lastfm_artists(p_limit INT, p_exclude TEXT[] DEFAULT '{}')
+RETURNS jsonb LANGUAGE sql STABLE SECURITY DEFINER AS $$
+    SELECT COALESCE(jsonb_agg(a.artist_name), '[]'::jsonb)
+    FROM (
+        SELECT artist_name
+        FROM artist_genres
+        WHERE genres = '{}'
+          AND lastfm_checked_at IS NULL
+          AND artist_name <> ALL(p_exclude)
+        LIMIT p_limit
+    ) a;
+$$;
+
+CREATE OR REPLACE FUNCTION enrichment_queue_depth()
+RETURNS jsonb LANGUAGE sql STABLE SECURITY DEFINER AS $$
+    SELECT jsonb_build_object(
+        'tracks',  (SELECT COUNT(*) FROM track_artist WHERE resolved_at IS NULL),
+        'artists', (SELECT COUNT(*) FROM pending_artists()),
+        'lastfm',  (SELECT COUNT(*) FROM artist_genres WHERE genres = '{}' AND lastfm_checked_at IS NULL)
+    );
+$$;
@@ -0,0 +1,18 @@
+-- history_distinct_track_ids() returned one row per track, so PostgREST's
+-- max-rows cap silently truncated the recommender's seen-track set for
+-- users with more than 1,000 distinct tracks. Return one JSONB array instead.
+-- Run this in the Supabase SQL editor.
+
+DROP FUNCTION IF EXISTS history_distinct_track_ids(UUID);
+
+CREATE OR REPLACE FUNCTION history_distinct_track_ids(p_user_id UUID)
+RETURNS jsonb LANGUAGE sql STABLE SECURITY DEFINER AS $$
+    SELECT COALESCE(jsonb_agg(t.spotify_track_id), '[]'::jsonb)
+    FROM (
+        SELECT DISTINCT sh.spotify_track_id
+        FROM streaming_history sh
+        WHERE sh.user_id = p_user_id
+          AND sh.spotify_track_id IS NOT NULL
+          AND sh.spotify_track_id <> ''
+    ) t;
+$$;
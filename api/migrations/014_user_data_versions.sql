@@ -0,0 +1,47 @@
+-- Per-user data-version watermarks for cache coherence across API nodes.
+-- Every write to a user's data bumps the version of its domain:
+--   history  streaming_history (imports)
+--   top      top_tracks / top_artists / genre_snapshots (syncs)
+--   genres   artist_genres / track_artist (enrichment — bumped for every user)
+-- Cached results include the versions of the domains they read in their keys,
+-- so a write on one node retires every node's stale entries without pub/sub.
+-- Run this in the Supabase SQL editor.
+
+CREATE TABLE IF NOT EXISTS user_data_versions (
+    user_id     UUID        NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    domain      TEXT        NOT NULL,
+    version     BIGINT      NOT NULL DEFAULT 0,
+    updated_at  TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (user_id, domain)
+);
+
+ALTER TABLE user_data_versions ENABLE ROW LEVEL SECURITY;
+
+-- {domain: version} for one user; missing domains are version 0.
+CREATE OR REPLACE FUNCTION get_data_versions(p_user_id UUID)
+RETURNS jsonb LANGUAGE sql STABLE SECURITY DEFINER AS $$
+    SELECT COALESCE(jsonb_object_agg(domain, version), '{}'::jsonb)
+    FROM user_data_versions
+    WHERE user_id = p_user_id;
+$$;
+
+-- Increment the given domains for one user, or for every user when
+-- p_user_id is NULL. The upsert increments in place, so concurrent bumps
+-- from several nodes never lose an update. Returns the user's new
+-- {domain: version} ('{}' when bumping everyone).
+CREATE OR REPLACE FUNCTION bump_data_versions(p_user_id UUID, p_domains TEXT[])
+RETURNS jsonb LANGUAGE sql VOLATILE SECURITY DEFINER AS $$
+    WITH bumped AS (
+        INSERT INTO user_data_versions (user_id, domain, version, updated_at)
+        SELECT u.id, d.domain, 1, NOW()
+        FROM users u
+        CROSS JOIN unnest(p_domains) AS d(domain)
+        WHERE p_user_id IS NULL OR u.id = p_user_id
+        ON CONFLICT (user_id, domain) DO UPDATE
+            SET version = user_data_versions.version + 1,
+                updated_at = NOW()
+        RETURNING user_id, domain, version
+    )
+    SELECT COALESCE(jsonb_object_agg(domain, version) FILTER (WHERE user_id = p_user_id), '{}'::jsonb)
+    FROM bumped;
+$$;
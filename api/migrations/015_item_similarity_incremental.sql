@@ -0,0 +1,55 @@
+-- Fixes for incremental item-similarity builds (migration 008).
+-- Run this in the Supabase SQL editor, then rebuild once with:
+--   python3 scripts/build_item_similarity.py --full
+--
+-- The incremental watermark was the latest played_at folded in, but imported
+-- extended history carries old played_at values, so later imports landed
+-- below it and were never counted. Plays now get an insertion sequence and
+-- the watermark is the last sequence folded in. Upserts of plays that are
+-- already stored keep their sequence, so they are not counted twice.
+
+ALTER TABLE streaming_history
+    ADD COLUMN IF NOT EXISTS inserted_seq BIGINT GENERATED ALWAYS AS IDENTITY;
+
+CREATE INDEX IF NOT EXISTS idx_sh_inserted_seq
+    ON streaming_history (inserted_seq);
+
+ALTER TABLE item_similarity_state
+    ADD COLUMN IF NOT EXISTS seq_watermark BIGINT;  -- latest inserted_seq folded into the counts
+
+-- Full rebuilds now store every pair, as incremental merges do, and both
+-- paths drop pairs below p_min_sessions only when picking neighbours, so the
+-- same plays give the same neighbour lists however they were built.
+DROP FUNCTION IF EXISTS refresh_item_similarity(TEXT[], INT);
+
+CREATE OR REPLACE FUNCTION refresh_item_similarity(
+    p_track_ids     TEXT[],
+    p_k             INT DEFAULT 50,
+    p_min_sessions  INT DEFAULT 2
+)
+RETURNS void LANGUAGE sql SECURITY DEFINER AS $$
+    DELETE FROM item_similarity WHERE spotify_track_id = ANY(p_track_ids);
+
+    INSERT INTO item_similarity (spotify_track_id, similar_track_id, score)
+    SELECT src, dst, score
+    FROM (
+        SELECT src, dst, score,
+               ROW_NUMBER() OVER (PARTITION BY src ORDER BY score DESC) AS rn
+        FROM (
+            SELECT c.track_a AS src, c.track_b AS dst,
+                   c.sessions / SQRT(ta.sessions::float8 * tb.sessions) AS score
+            FROM track_cooccurrence c
+            JOIN item_tracks ta ON ta.spotify_track_id = c.track_a
+            JOIN item_tracks tb ON tb.spotify_track_id = c.track_b
+            WHERE c.track_a = ANY(p_track_ids) AND c.sessions >= p_min_sessions
+            UNION ALL
+            SELECT c.track_b, c.track_a,
+                   c.sessions / SQRT(ta.sessions::float8 * tb.sessions)
+            FROM track_cooccurrence c
+            JOIN item_tracks ta ON ta.spotify_track_id = c.track_a
+            JOIN item_tracks tb ON tb.spotify_track_id = c.track_b
+            WHERE c.track_b = ANY(p_track_ids) AND c.sessions >= p_min_sessions
+        ) pairs
+    ) ranked
+    WHERE rn <= p_k;
+$$;
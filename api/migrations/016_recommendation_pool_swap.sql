@@ -0,0 +1,33 @@
+-- Swap a user's recommendation_pool in one transaction.
+-- refresh_candidate_pool deleted the old pool and upserted the new one in
+-- separate requests, so a concurrent read could find the pool empty and fall
+-- back to the slow live path, and a failed upsert left it empty. Readers now
+-- see either the old pool or the new one. Run this in the Supabase SQL editor.
+
+-- p_rows: [{spotify_track_id, rank, score, source, track}, ...]
+-- Upserts the new candidates, then drops the undismissed rows that are not
+-- among them. Dismissed rows are kept and never overwritten.
+CREATE OR REPLACE FUNCTION replace_recommendation_pool(p_user_id UUID, p_rows JSONB)
+RETURNS int LANGUAGE sql VOLATILE SECURITY DEFINER AS $$
+    INSERT INTO recommendation_pool AS p (user_id, spotify_track_id, rank, score, source, track, created_at)
+    SELECT p_user_id, r.spotify_track_id, r.rank, r.score, r.source, r.track, NOW()
+    FROM jsonb_to_recordset(p_rows)
+         AS r(spotify_track_id TEXT, rank INT, score REAL, source TEXT, track JSONB)
+    ON CONFLICT (user_id, spotify_track_id) DO UPDATE
+       SET rank       = EXCLUDED.rank,
+           score      = EXCLUDED.score,
+           source     = EXCLUDED.source,
+           track      = EXCLUDED.track,
+           created_at = EXCLUDED.created_at
+       WHERE p.dismissed_at IS NULL;
+
+    DELETE FROM recommendation_pool p
+    WHERE p.user_id = p_user_id
+      AND p.dismissed_at IS NULL
+      AND NOT EXISTS (
+          SELECT 1 FROM jsonb_to_recordset(p_rows) AS r(spotify_track_id TEXT)
+          WHERE r.spotify_track_id = p.spotify_track_id
+      );
+
+    SELECT jsonb_array_length(p_rows);
+$$;
@@ -0,0 +1,70 @@
+-- Make the clean_genre_tags() watermark (migration 011) safe against
+-- concurrent writers. Run this in the Supabase SQL editor.
+--
+-- The watermark was NOW(), the start of the cleaning transaction. A writer
+-- that stamped updated_at before that but committed after the clean read its
+-- snapshot was behind the watermark and never cleaned. updated_at now
+-- records the wall-clock time of the write, and the watermark is set ten
+-- minutes before the clean started. Rows in that overlap are scanned
+-- twice, which is harmless because rows without blocked tags aren't
+-- rewritten.
+
+CREATE OR REPLACE FUNCTION touch_artist_genres_updated_at()
+RETURNS TRIGGER LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.updated_at := clock_timestamp();
+    RETURN NEW;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION clean_genre_tags(p_blocked TEXT[], p_full BOOLEAN DEFAULT FALSE)
+RETURNS jsonb LANGUAGE plpgsql SECURITY DEFINER AS $$
+DECLARE
+    -- Longer than any artist_genres write transaction runs
+    c_overlap  CONSTANT INTERVAL := INTERVAL '10 minutes';
+    v_hash     TEXT := md5(array_to_string(ARRAY(SELECT DISTINCT unnest(p_blocked) ORDER BY 1), E'\n'));
+    v_started  TIMESTAMPTZ := clock_timestamp();
+    v_since    TIMESTAMPTZ;
+    v_cleaned  BIGINT;
+    v_emptied  BIGINT;
+BEGIN
+    IF NOT p_full THEN
+        SELECT watermark INTO v_since FROM genre_clean_state WHERE blocklist_hash = v_hash;
+    END IF;
+
+    WITH dirty AS (
+        SELECT ag.id,
+               COALESCE(
+                   array_agg(u.tag ORDER BY u.ord) FILTER (WHERE LOWER(BTRIM(u.tag)) <> ALL(p_blocked)),
+                   '{}'
+               ) AS genres
+        FROM artist_genres ag, unnest(ag.genres) WITH ORDINALITY AS u(tag, ord)
+        WHERE (v_since IS NULL OR ag.updated_at > v_since)
+        GROUP BY ag.id
+        HAVING bool_or(LOWER(BTRIM(u.tag)) = ANY(p_blocked))
+    ),
+    cleaned AS (
+        UPDATE artist_genres ag
+           SET genres = dirty.genres
+          FROM dirty
+         WHERE ag.id = dirty.id
+        RETURNING ag.genres
+    )
+    SELECT COUNT(*), COUNT(*) FILTER (WHERE cardinality(genres) = 0)
+      INTO v_cleaned, v_emptied
+      FROM cleaned;
+
+    INSERT INTO genre_clean_state (id, watermark, blocklist_hash, cleaned_at)
+    VALUES (TRUE, v_started - c_overlap, v_hash, NOW())
+    ON CONFLICT (id) DO UPDATE
+       SET watermark      = EXCLUDED.watermark,
+           blocklist_hash = EXCLUDED.blocklist_hash,
+           cleaned_at     = EXCLUDED.cleaned_at;
+
+    RETURN jsonb_build_object(
+        'cleaned', v_cleaned,
+        'emptied', v_emptied,
+        'since',   v_since
+    );
+END;
+$$;
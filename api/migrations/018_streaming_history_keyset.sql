@@ -0,0 +1,12 @@
+-- Index for the per-user keyset scans in app.database.scan().
+-- Run this in the Supabase SQL editor.
+--
+-- Service reads stream a user's plays with
+--   WHERE user_id = ? [AND ...] AND id > last ORDER BY id LIMIT n
+-- None of the existing streaming_history indexes ends in id, so each page
+-- walked the user's whole (user_id, ...) index range and sorted it. With
+-- (user_id, id) every page is a seek to the last key followed by a short
+-- range read.
+
+CREATE INDEX IF NOT EXISTS idx_sh_user_id_keyset
+    ON streaming_history (user_id, id);
@@ -0,0 +1,64 @@
+-- Shared data versions for writes that affect every user (migration 014).
+-- Run this in the Supabase SQL editor.
+--
+-- Enrichment bumped `genres` for everyone by upserting a row per user and
+-- domain, so every enrichment batch wrote O(users) rows. Writes that affect
+-- everyone now increment one row per domain here instead, and a user's
+-- version of a domain is their own version plus the shared one. Both only
+-- ever increase, so any bump to either changes the sum.
+
+CREATE TABLE IF NOT EXISTS global_data_versions (
+    domain      TEXT        PRIMARY KEY,
+    version     BIGINT      NOT NULL DEFAULT 0,
+    updated_at  TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+ALTER TABLE global_data_versions ENABLE ROW LEVEL SECURITY;
+
+-- {domain: version} for one user, own and shared versions combined; missing
+-- domains are version 0.
+CREATE OR REPLACE FUNCTION get_data_versions(p_user_id UUID)
+RETURNS jsonb LANGUAGE sql STABLE SECURITY DEFINER AS $$
+    SELECT COALESCE(jsonb_object_agg(domain, version), '{}'::jsonb)
+    FROM (
+        SELECT domain, SUM(version)::bigint AS version
+        FROM (
+            SELECT domain, version FROM user_data_versions WHERE user_id = p_user_id
+            UNION ALL
+            SELECT domain, version FROM global_data_versions
+        ) v
+        GROUP BY domain
+    ) merged;
+$$;
+
+-- Increment the given domains for one user, or the shared versions when
+-- p_user_id is NULL — one row per domain however many users there are.
+-- Returns the user's new combined {domain: version} ('{}' when bumping
+-- everyone). Both upserts increment in place, so concurrent bumps from
+-- several nodes never lose an update.
+CREATE OR REPLACE FUNCTION bump_data_versions(p_user_id UUID, p_domains TEXT[])
+RETURNS jsonb LANGUAGE sql VOLATILE SECURITY DEFINER AS $$
+    WITH user_bumped AS (
+        INSERT INTO user_data_versions (user_id, domain, version, updated_at)
+        SELECT p_user_id, d.domain, 1, NOW()
+        FROM unnest(p_domains) AS d(domain)
+        WHERE p_user_id IS NOT NULL
+        ON CONFLICT (user_id, domain) DO UPDATE
+            SET version = user_data_versions.version + 1,
+                updated_at = NOW()
+        RETURNING domain, version
+    ), global_bumped AS (
+        INSERT INTO global_data_versions (domain, version, updated_at)
+        SELECT d.domain, 1, NOW()
+        FROM unnest(p_domains) AS d(domain)
+        WHERE p_user_id IS NULL
+        ON CONFLICT (domain) DO UPDATE
+            SET version = global_data_versions.version + 1,
+                updated_at = NOW()
+        RETURNING domain
+    )
+    SELECT COALESCE(jsonb_object_agg(b.domain, b.version + COALESCE(g.version, 0)), '{}'::jsonb)
+    FROM user_bumped b
+    LEFT JOIN global_data_versions g ON g.domain = b.domain;
+$$;
+
@@ -0,0 +1,19 @@
+-- unclassified_genres() returned one row per genre, so PostgREST's max-rows
+-- cap silently truncated it at 1,000 and classify_genre_families.py left the
+-- rest unclassified. Return one JSONB array instead, as migration 013 does
+-- for history_distinct_track_ids.
+-- Run this in the Supabase SQL editor.
+
+DROP FUNCTION IF EXISTS unclassified_genres();
+
+CREATE OR REPLACE FUNCTION unclassified_genres()
+RETURNS jsonb LANGUAGE sql STABLE SECURITY DEFINER AS $$
+    SELECT COALESCE(jsonb_agg(t.genre ORDER BY t.genre), '[]'::jsonb)
+    FROM (
+        SELECT DISTINCT LOWER(g) AS genre
+        FROM artist_genres ag, unnest(ag.genres) AS g
+        WHERE NOT EXISTS (
+            SELECT 1 FROM genre_families gf WHERE gf.genre = LOWER(g)
+        )
+    ) t;
+$$;
@@ -0,0 +1,26 @@
+-- pending_artists() (migration 012) matched artist_genres by
+-- LOWER(artist_name) inside an OR, which no index can serve, so every
+-- worker cycle's enrichment_queue_depth() and unenriched_artists() probed
+-- artist_genres with scans. artist_name is stored lowercase, so compare it
+-- to LOWER(ta.artist_name) directly, and split the OR into two NOT EXISTS:
+-- one probes idx_artist_genres_spotify_artist_id, the other the unique
+-- artist_name index.
+-- Run this in the Supabase SQL editor.
+
+CREATE OR REPLACE FUNCTION pending_artists()
+RETURNS TABLE (spotify_artist_id TEXT, artist_name TEXT)
+LANGUAGE sql STABLE SECURITY DEFINER AS $$
+    SELECT DISTINCT ON (ta.spotify_artist_id) ta.spotify_artist_id, ta.artist_name
+    FROM track_artist ta
+    WHERE ta.spotify_artist_id IS NOT NULL
+      AND NOT EXISTS (
+          SELECT 1 FROM artist_genres ag
+          WHERE ag.spotify_artist_id = ta.spotify_artist_id
+      )
+      AND NOT EXISTS (
+          SELECT 1 FROM artist_genres ag
+          WHERE ag.artist_name = LOWER(ta.artist_name)
+            AND ag.spotify_artist_id IS NOT NULL
+      )
+    ORDER BY ta.spotify_artist_id;
+$$;
@@ -0,0 +1,137 @@
+"""
+Benchmark every API endpoint against a synthetic dataset.
+
+`seed` builds a local Postgres with the real schema, migrations and RPCs and
+loads generated listening history (bench/synthetic.py). `run` serves the real
+FastAPI app in-process against that database through PostgREST, with Spotify
+replaced by a local fake, and reports p50/p95/p99 latency, DB round-trips and
+bytes per endpoint. Save a run with --out and pass it to --compare before a
+deploy to fail on regressions.
+
+Usage:
+    cd api
+    docker compose -f bench/docker-compose.yml up -d
+    python3 scripts/bench_api.py seed --reset [--users 20] [--plays 1000000] [--artists 5000]
+                                      [--genres 400] [--genre-skew 1.2] [--years 5] [--seed 42]
+    python3 scripts/bench_api.py run [--iterations 5] [--users-sample 3] [--only map]
+                                     [--direct] [--include-writes] [--spotify-latency-ms 0]
+                                     [--out bench.json] [--compare baseline.json] [--max-regression 0.2]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import psycopg  # noqa: E402
+
+from bench import harness  # noqa: E402
+from bench.database import apply_schema, bench_users, dataset_params, load_dataset, reset  # noqa: E402
+from bench.synthetic import DEFAULTS  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+
+def seed(args: argparse.Namespace) -> None:
+    params = {key: getattr(args, key) for key in DEFAULTS}
+    started = time.monotonic()
+    with psycopg.connect(args.dsn, autocommit=True) as conn:
+        if args.reset:
+            print("Resetting schema...")
+            reset(conn)
+        print("Applying schema and migrations...")
+        failures = apply_schema(conn)
+        print(f"Loading dataset {params}...")
+        load_dataset(conn, params)
+    print(f"\nDone in {time.monotonic() - started:.0f}s ({len(failures)} schema statements skipped).")
+
+
+def run(args: argparse.Namespace) -> None:
+    with psycopg.connect(args.dsn) as conn:
+        params = dataset_params(conn)
+        users = bench_users(conn)
+    if args.users_sample < len(users):
+        # Spread the sample from the heaviest to the lightest user
+        step = (len(users) - 1) / max(1, args.users_sample - 1)
+        users = [users[round(i * step)] for i in range(args.users_sample)]
+
+    app, traffic, servers = harness.start_stack(
+        params, args.dsn, args.postgrest_url, direct=args.direct, spotify_latency_ms=args.spotify_latency_ms,
+    )
+    for user in users:
+        user["token"] = harness.session_token(user)
+
+    endpoints = list(harness.ENDPOINTS)
+    if args.include_writes:
+        endpoints += harness.WRITE_ENDPOINTS
+    endpoints = [e for e in endpoints if not args.only or args.only in e[0]]
+
+    print(f"Dataset {params}")
+    print(f"Benchmarking {len(endpoints)} endpoints × {len(users)} users × {args.iterations} iterations "
+          f"({'direct Postgres' if args.direct else 'PostgREST'})...")
+    try:
+        with TestClient(app) as client:
+            samples = harness.run(client, users, endpoints, traffic, args.iterations, args.warmup)
+    finally:
+        for server in servers:
+            server.stop()
+
+    summary = harness.summarize(samples)
+    print()
+    print(harness.format_table(summary))
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"params": params, "direct": args.direct, "endpoints": summary}, f, indent=2)
+        print(f"\nSaved to {args.out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["endpoints"]
+        regressions = harness.compare(summary, baseline, args.max_regression)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) vs {args.compare}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\nNo regressions vs {args.compare}.")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark API endpoints on synthetic data")
+    parser.add_argument("--dsn", default=harness.DATABASE_DSN, help="Local benchmark Postgres")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    s = commands.add_parser("seed", help="Apply the schema and load a synthetic dataset")
+    s.add_argument("--reset", action="store_true", help="Drop and recreate the public schema first")
+    s.add_argument("--seed", type=int, default=DEFAULTS["seed"])
+    s.add_argument("--users", type=int, default=DEFAULTS["users"])
+    s.add_argument("--plays", type=int, default=DEFAULTS["plays"], help="Total plays across all users")
+    s.add_argument("--artists", type=int, default=DEFAULTS["artists"])
+    s.add_argument("--genres", type=int, default=DEFAULTS["genres"])
+    s.add_argument("--genre-skew", type=float, default=DEFAULTS["genre_skew"], help="Zipf exponent of genre popularity")
+    s.add_argument("--years", type=int, default=DEFAULTS["years"], help="Years of history per user")
+    s.set_defaults(func=seed)
+
+    r = commands.add_parser("run", help="Benchmark the endpoints")
+    r.add_argument("--postgrest-url", default=harness.POSTGREST_URL)
+    r.add_argument("--iterations", type=int, default=5, help="Measured requests per endpoint per user")
+    r.add_argument("--warmup", type=int, default=1, help="Unmeasured requests per endpoint per user")
+    r.add_argument("--users-sample", type=int, default=3, help="Users to benchmark, heaviest to lightest")
+    r.add_argument("--only", help="Only endpoints whose label contains this")
+    r.add_argument("--direct", action="store_true", help="Serve hot RPCs over a direct Postgres pool")
+    r.add_argument("--include-writes", action="store_true", help="Also run the sync/refresh endpoints (last)")
+    r.add_argument("--spotify-latency-ms", type=float, default=0, help="Added latency per fake Spotify call")
+    r.add_argument("--out", help="Write results as JSON")
+    r.add_argument("--compare", help="Baseline JSON from a previous --out")
+    r.add_argument("--max-regression", type=float, default=0.2, help="Allowed p95 / round-trip growth (fraction)")
+    r.set_defaults(func=run)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
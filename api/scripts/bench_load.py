@@ -0,0 +1,94 @@
+"""
+Ramp concurrent virtual users through a dashboard scenario and report how one
+API worker copes.
+
+Runs the real app under uvicorn against the benchmark database (see
+scripts/bench_api.py seed) and the fake Spotify server. Each virtual user logs
+in as one of the synthetic users and loops the scenario; every stage reports
+requests/s, scenarios/s, error rate, latency, event-loop lag and the share of
+time the loop was blocked by synchronous work.
+
+Usage:
+    cd api
+    python3 scripts/bench_load.py [--scenario release|browse|dashboard] [--ramp 1,5,10,25,50]
+                                  [--stage-secs 30] [--think-ms 0] [--spotify-latency-ms 80]
+                                  [--direct] [--out load.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import psycopg  # noqa: E402
+
+from bench import harness, load  # noqa: E402
+from bench.database import bench_users, dataset_params  # noqa: E402
+from bench.servers import BackgroundServer  # noqa: E402
+
+
+async def ramp(base_url: str, args: argparse.Namespace, spotify_ids, monitor, traffic) -> list:
+    stages = []
+    rows = []
+    print(load.format_stages([]))
+    for concurrency in [int(c) for c in args.ramp.split(",")]:
+        stage = await load.run_stage(
+            base_url, load.SCENARIOS[args.scenario], spotify_ids, concurrency,
+            args.stage_secs, args.think_ms / 1000, monitor, traffic,
+        )
+        stages.append(stage)
+        rows.append(load.summarize(stage))
+        print(load.format_stages(rows[-1:]).splitlines()[-1], flush=True)
+    return stages
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Concurrent-load scenarios against one API worker")
+    parser.add_argument("--dsn", default=harness.DATABASE_DSN)
+    parser.add_argument("--postgrest-url", default=harness.POSTGREST_URL)
+    parser.add_argument("--scenario", choices=sorted(load.SCENARIOS), default="release")
+    parser.add_argument("--ramp", default="1,5,10,25,50", help="Comma-separated virtual-user counts")
+    parser.add_argument("--stage-secs", type=float, default=30, help="Duration of each stage")
+    parser.add_argument("--think-ms", type=float, default=0, help="Pause between scenario steps")
+    parser.add_argument("--spotify-latency-ms", type=float, default=80, help="Added latency per fake Spotify call")
+    parser.add_argument("--direct", action="store_true", help="Serve hot RPCs over a direct Postgres pool")
+    parser.add_argument("--out", help="Write stage results as JSON")
+    args = parser.parse_args()
+
+    with psycopg.connect(args.dsn) as conn:
+        params = dataset_params(conn)
+        spotify_ids = [u["spotify_id"] for u in bench_users(conn)]
+
+    app, traffic, servers = harness.start_stack(
+        params, args.dsn, args.postgrest_url, direct=args.direct, spotify_latency_ms=args.spotify_latency_ms,
+    )
+    monitor = load.LoopMonitor()
+    app.add_event_handler("startup", monitor.start)
+    app.add_event_handler("shutdown", monitor.stop)
+    api = BackgroundServer(app).start()
+    servers.insert(0, api)
+
+    print(f"Scenario '{args.scenario}' on one worker, {len(spotify_ids)} synthetic users, "
+          f"{args.stage_secs:.0f}s per stage\n")
+    try:
+        stages = asyncio.run(ramp(api.url, args, spotify_ids, monitor, traffic))
+    finally:
+        for server in servers:
+            server.stop()
+
+    peak = stages[-1]
+    print(f"\nPer-route latency at {peak.concurrency} users:")
+    print(load.format_routes(peak))
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"params": params, "scenario": args.scenario, "stages": [load.summarize(s) for s in stages]},
+                      f, indent=2)
+        print(f"\nSaved to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
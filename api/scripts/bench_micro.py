@@ -0,0 +1,75 @@
+"""
+Micro-benchmarks for the CPU-heavy pure functions run per request.
+
+Feeds fixed-seed datasets through map, genre, history and track code with data
+access stubbed out (bench/micro.py). With a saved baseline, exits non-zero when
+any case is slower than the baseline by more than --threshold, after scaling
+for machine speed.
+
+Usage:
+    cd api
+    python3 scripts/bench_micro.py --save          # record a baseline
+    python3 scripts/bench_micro.py                 # compare against it
+    python3 scripts/bench_micro.py --only map --threshold 0.15
+"""
+
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench import harness  # noqa: E402
+
+# app.* reads settings at import; nothing here talks to them
+harness.configure_app_env("http://127.0.0.1:9")
+
+from bench import micro  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run micro-benchmarks against a baseline")
+    parser.add_argument("--only", help="Only cases whose name contains this")
+    parser.add_argument("--baseline", default=micro.BASELINE_PATH, help="Baseline JSON path")
+    parser.add_argument("--save", action="store_true", help="Write results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed slowdown (fraction)")
+    parser.add_argument("--repeat", type=int, default=micro.REPEAT, help="Timing rounds per case")
+    args = parser.parse_args()
+
+    names = [n for n in micro.CASES if not args.only or args.only in n]
+    calibration = micro.calibrate()
+    print(f"Calibration loop: {calibration * 1000:.2f} ms")
+    results = micro.run(names, repeat=args.repeat)
+
+    if args.save:
+        baseline = {"calibration": calibration, "cases": results}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                old = json.load(f)
+            # keep cases that weren't re-run, rescaled to this machine
+            scale = calibration / old["calibration"]
+            for name, r in old["cases"].items():
+                if name not in results:
+                    baseline["cases"][name] = {**r, "best": r["best"] * scale, "median": r["median"] * scale}
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2)
+        print(f"\nSaved baseline to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline} — run with --save first.")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = micro.compare(results, calibration, baseline, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    print(f"\nNo regressions beyond {args.threshold:.0%}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+"""
+Build the offline item-item recommender from co-listening sessions.
+
+Plays (>= 30s) from every user's streaming_history are split into sessions
+wherever a user goes SESSION_GAP_SECS without playing anything. A sparse
+track×session incidence matrix X then gives session co-occurrence counts as
+X·Xᵀ, and each track keeps its TOP_K neighbours by cosine similarity
+(co-sessions / sqrt(sessions_a · sessions_b)) among tracks co-listened in at
+least MIN_COOCCURRENCE sessions.
+
+  --full   wipe and rebuild everything from all history
+  default  incremental: fold in plays inserted since the stored watermark
+           (streaming_history.inserted_seq, migration 015 — imported history
+           carries old played_at values), add their counts, and recompute
+           neighbours only for touched tracks. A session that straddles the
+           watermark is counted as two.
+
+Usage:
+    cd api
+    python3 scripts/build_item_similarity.py [--full]
+"""
+
+import argparse
+import os
+import sys
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+from scipy import sparse  # noqa: E402
+
+from app.database import scan, supabase  # noqa: E402
+
+BATCH_SIZE = 500
+SCAN_PARTITIONS = 4
+SESSION_GAP_SECS = 30 * 60
+MAX_SESSION_TRACKS = 50    # cap long sessions so one marathon doesn't dominate
+MIN_COOCCURRENCE = 2       # pairs seen in fewer sessions are never neighbours
+TOP_K = 50
+
+
+def get_watermark() -> Optional[int]:
+    rows = supabase.table("item_similarity_state").select("seq_watermark").execute().data or []
+    return rows[0]["seq_watermark"] if rows else None
+
+
+def latest_seq() -> Optional[int]:
+    """The newest inserted_seq in streaming_history, read before loading plays."""
+    rows = (
+        supabase.table("streaming_history")
+        .select("inserted_seq")
+        .order("inserted_seq", desc=True)
+        .limit(1)
+        .execute()
+    ).data or []
+    return rows[0]["inserted_seq"] if rows else None
+
+
+def load_plays(since: Optional[int], until: int) -> List[dict]:
+    """
+    All meaningful plays across users inserted after `since` (everything when
+    None) and up to `until`, ordered by user then time. Bounding the read
+    makes `until` the exact watermark even while imports keep arriving.
+    """
+    def where(query):
+        query = query.gte("ms_played", 30000).lte("inserted_seq", until)
+        return query.gt("inserted_seq", since) if since is not None else query
+
+    columns = "user_id, played_at, spotify_track_id, track_name, artist_name, album_name"
+    if since is None:
+        rows = scan("streaming_history", columns, where=where, partitions=SCAN_PARTITIONS)
+    else:
+        rows = scan("streaming_history", columns, where=where, key="inserted_seq")
+
+    plays: List[dict] = []
+    for row in rows:
+        if row.get("spotify_track_id"):
+            plays.append(row)
+            if len(plays) % 50_000 == 0:
+                print(f"  {len(plays):,} plays loaded")
+    plays.sort(key=lambda p: (p["user_id"], p["played_at"]))
+    return plays
+
+
+def build_incidence(plays: List[dict]) -> Tuple[sparse.csr_matrix, List[str]]:
+    """Sessionize plays and return (binary track×session matrix, track ids by row)."""
+    track_ids, track_idx = np.unique([p["spotify_track_id"] for p in plays], return_inverse=True)
+    _, user_idx = np.unique([p["user_id"] for p in plays], return_inverse=True)
+    ts = np.array([
+        datetime.fromisoformat(p["played_at"].replace("Z", "+00:00")).timestamp() for p in plays
+    ])
+
+    new_session = np.ones(len(plays), dtype=bool)
+    new_session[1:] = (user_idx[1:] != user_idx[:-1]) | (np.diff(ts) > SESSION_GAP_SECS)
+    session_idx = np.cumsum(new_session) - 1
+
+    # one entry per (track, session), keeping the first MAX_SESSION_TRACKS
+    # distinct tracks played in each session: plays are in time order, so the
+    # first occurrence of a pair is its first play
+    pairs, first_play = np.unique(np.stack([session_idx, track_idx], axis=1), axis=0, return_index=True)
+    pairs = pairs[np.lexsort((first_play, pairs[:, 0]))]
+    session_start = np.searchsorted(pairs[:, 0], pairs[:, 0], side="left")
+    pairs = pairs[np.arange(len(pairs)) - session_start < MAX_SESSION_TRACKS]
+
+    matrix = sparse.csr_matrix(
+        (np.ones(len(pairs), dtype=np.float32), (pairs[:, 1], pairs[:, 0])),
+        shape=(len(track_ids), int(session_idx[-1]) + 1),
+    )
+    return matrix, track_ids.tolist()
+
+
+def cooccurrence(matrix: sparse.csr_matrix) -> Tuple[np.ndarray, sparse.csr_matrix]:
+    """Return (sessions per track, upper-triangular co-session counts)."""
+    counts = np.asarray(matrix.sum(axis=1)).ravel()
+    co = sparse.triu(matrix @ matrix.T, k=1).tocsr()
+    co.eliminate_zeros()
+    return counts, co
+
+
+def track_metadata(plays: List[dict]) -> Dict[str, dict]:
+    meta: Dict[str, dict] = {}
+    for p in plays:
+        meta.setdefault(p["spotify_track_id"], {
+            "track_name": p.get("track_name"),
+            "artist_name": p.get("artist_name"),
+            "album_name": p.get("album_name"),
+        })
+    return meta
+
+
+def pair_rows(co: sparse.csr_matrix, track_ids: List[str]) -> List[dict]:
+    coo = co.tocoo()
+    rows = []
+    for i, j, v in zip(coo.row, coo.col, coo.data):
+        a, b = sorted((track_ids[i], track_ids[j]))
+        rows.append({"track_a": a, "track_b": b, "sessions": int(v)})
+    return rows
+
+
+def top_k_rows(counts: np.ndarray, co: sparse.csr_matrix, track_ids: List[str]) -> List[dict]:
+    """Cosine-scored top-k neighbours per track, computed in one sparse pass."""
+    co = co.maximum(co.T).tocsr()
+    co.data[co.data < MIN_COOCCURRENCE] = 0
+    co.eliminate_zeros()
+    inv = sparse.diags(1.0 / np.sqrt(np.maximum(counts, 1)))
+    sim = (inv @ co @ inv).tocsr()
+
+    rows = []
+    for i in range(sim.shape[0]):
+        start, end = sim.indptr[i], sim.indptr[i + 1]
+        if start == end:
+            continue
+        cols, scores = sim.indices[start:end], sim.data[start:end]
+        best = np.argsort(-scores)[:TOP_K]
+        rows.extend(
+            {"spotify_track_id": track_ids[i], "similar_track_id": track_ids[cols[j]], "score": round(float(scores[j]), 6)}
+            for j in best
+        )
+    return rows
+
+
+def upsert(table: str, rows: List[dict], on_conflict: str) -> None:
+    for i in range(0, len(rows), BATCH_SIZE):
+        supabase.table(table).upsert(rows[i:i + BATCH_SIZE], on_conflict=on_conflict).execute()
+        done = min(i + BATCH_SIZE, len(rows))
+        if done % 50_000 < BATCH_SIZE or done == len(rows):
+            print(f"  {table}: {done:,}/{len(rows):,}")
+
+
+def save_watermark(seq: int) -> None:
+    supabase.table("item_similarity_state").upsert({
+        "id": True,
+        "seq_watermark": seq,
+        "refreshed_at": datetime.now(tz=timezone.utc).isoformat(),
+    }, on_conflict="id").execute()
+
+
+def full_rebuild() -> None:
+    until = latest_seq()
+    if until is None:
+        print("Nothing to do.")
+        return
+
+    print("Loading all plays...")
+    plays = load_plays(since=None, until=until)
+    print(f"  {len(plays):,} plays\n")
+    if not plays:
+        print("Nothing to do.")
+        return
+
+    matrix, track_ids = build_incidence(plays)
+    counts, co = cooccurrence(matrix)
+    print(f"{len(track_ids):,} tracks across {matrix.shape[1]:,} sessions, {co.nnz:,} co-listened pairs\n")
+
+    supabase.rpc("reset_item_similarity", {}).execute()
+    meta = track_metadata(plays)
+    upsert("item_tracks", [
+        {"spotify_track_id": t, **meta[t], "sessions": int(n)} for t, n in zip(track_ids, counts)
+    ], on_conflict="spotify_track_id")
+    # every pair is kept so later incremental merges add to exact counts
+    upsert("track_cooccurrence", pair_rows(co, track_ids), on_conflict="track_a,track_b")
+    upsert("item_similarity", top_k_rows(counts, co, track_ids), on_conflict="spotify_track_id,similar_track_id")
+    save_watermark(until)
+
+
+def incremental_update() -> None:
+    watermark = get_watermark()
+    if watermark is None:
+        sys.exit("No watermark yet — run with --full first.")
+
+    until = latest_seq()
+    if until is None or until <= watermark:
+        print("Nothing to do.")
+        return
+
+    print(f"Loading plays inserted after #{watermark}...")
+    plays = load_plays(since=watermark, until=until)
+    print(f"  {len(plays):,} new plays\n")
+    if not plays:
+        save_watermark(until)
+        print("Nothing to do.")
+        return
+
+    matrix, track_ids = build_incidence(plays)
+    counts, co = cooccurrence(matrix)
+    meta = track_metadata(plays)
+    tracks = [{"spotify_track_id": t, **meta[t], "sessions": int(n)} for t, n in zip(track_ids, counts)]
+    pairs = pair_rows(co, track_ids)
+    print(f"Merging {len(tracks):,} tracks and {len(pairs):,} pairs...")
+    for i in range(0, max(len(tracks), len(pairs)), BATCH_SIZE):
+        supabase.rpc("merge_item_cooccurrence", {
+            "p_tracks": tracks[i:i + BATCH_SIZE],
+            "p_pairs": pairs[i:i + BATCH_SIZE],
+        }).execute()
+
+    print("Refreshing neighbours of touched tracks...")
+    for i in range(0, len(track_ids), BATCH_SIZE):
+        supabase.rpc("refresh_item_similarity", {
+            "p_track_ids": track_ids[i:i + BATCH_SIZE],
+            "p_k": TOP_K,
+            "p_min_sessions": MIN_COOCCURRENCE,
+        }).execute()
+    save_watermark(until)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build the co-listening item-item recommender")
+    parser.add_argument("--full", action="store_true", help="Wipe and rebuild from all history")
+    args = parser.parse_args()
+
+    full_rebuild() if args.full else incremental_update()
+    print("\nDone.")
+
+
+if __name__ == "__main__":
+    main()
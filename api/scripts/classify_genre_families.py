@@ -0,0 +1,63 @@
+"""
+Classify every genre tag in artist_genres into a map family and store it in genre_families.
+
+Only genres without a genre_families row are classified, so re-runs after an
+enrichment pass are cheap. Pass --all to reclassify everything (e.g. after
+editing FAMILY_CHECKS in app/map/families.py).
+
+Usage:
+    cd api
+    python3 scripts/classify_genre_families.py [--all]
+"""
+
+import argparse
+import os
+import sys
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import scan, supabase  # noqa: E402
+from app.map.families import classify_family  # noqa: E402
+
+BATCH_SIZE = 500
+
+
+def get_all_genres() -> List[str]:
+    """Return every distinct lowercase genre tag in artist_genres."""
+    genres = set()
+    for row in scan("artist_genres", "genres"):
+        genres.update(g.lower() for g in (row.get("genres") or []))
+    return sorted(genres)
+
+
+def get_unclassified_genres() -> List[str]:
+    # One JSONB array (migration 020), so PostgREST's max-rows cap doesn't apply
+    genres = supabase.rpc("unclassified_genres", {}).execute().data or []
+    return sorted({g for g in genres if g})
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Populate genre_families from artist_genres")
+    parser.add_argument("--all", action="store_true", help="Reclassify every genre, not just new ones")
+    args = parser.parse_args()
+
+    genres = get_all_genres() if args.all else get_unclassified_genres()
+    print(f"{len(genres):,} genres to classify\n")
+
+    if not genres:
+        print("Nothing to do.")
+        return
+
+    rows = [{"genre": g, "family": classify_family(g)} for g in genres]
+    for i in range(0, len(rows), BATCH_SIZE):
+        batch = rows[i:i + BATCH_SIZE]
+        supabase.table("genre_families").upsert(batch, on_conflict="genre").execute()
+        print(f"  {min(i + BATCH_SIZE, len(rows)):,}/{len(rows):,} upserted")
+
+    other = sum(1 for r in rows if r["family"] == "other")
+    print(f"\nDone. {len(rows) - other:,} genres mapped to a family, {other:,} left as 'other'.")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,91 +3,42 @@ Fill genre gaps using Last.fm tags for artists with empty Spotify genres.
 
 Queries artist_genres for rows with empty genres, hits Last.fm's
 artist.getTopTags endpoint for each, filters to music-genre tags,
-and updates the rows in place.
+and writes the results back with batched upserts.
+
+Lookups go through app/enrichment/lastfm.py: concurrent async requests held
+at exactly Last.fm's 5 req/s allowance, with raw responses cached in a local
+sqlite file so re-runs — including after tweaking NON_GENRE_TAGS or
+MIN_TAG_COUNT — only hit the API for artists never fetched before.
 
 Usage:
     cd api
-    python3 scripts/enrich_lastfm_genres.py
+    python3 scripts/enrich_lastfm_genres.py [--refresh-cache]
 
 Requires LASTFM_API_KEY in .env.
 """
 
+import argparse
 import os
 import sys
-import time
-from typing import List, Optional
-
-import requests
+from typing import List
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.config import settings  # noqa: E402
-from app.database import supabase  # noqa: E402
-
-LASTFM_URL = "https://ws.audioscrobbler.com/2.0/"
-SLEEP_SECS = 0.2  # Last.fm allows 5 req/sec
-MIN_TAG_COUNT = 10  # ignore tags with very low counts (noise)
-
-# Tags that are not genres — Last.fm is community-sourced so these slip in
-NON_GENRE_TAGS = {
-    "seen live", "favorites", "favourite", "love", "amazing", "great",
-    "awesome", "cool", "good", "best", "beautiful", "sexy", "hot",
-    "my music", "all", "music", "songs", "albums", "bands", "artists",
-    "spotify", "youtube", "soundcloud", "heard on pandora",
-    "under 2000 listeners", "via lastfm",
-    "singer-songwriter", "singer songwriter",
-}
-
-
-PAGE_SIZE = 1_000
+from app.database import scan  # noqa: E402
+from app.enrichment.lastfm import lookup_genres, save_lastfm_genres  # noqa: E402
 
 
 def get_empty_artists() -> List[dict]:
-    """Return all artist_genres rows with empty or null genres, paginated."""
-    empty = []
-    offset = 0
-    while True:
-        rows = (
-            supabase.table("artist_genres")
-            .select("artist_name, genres")
-            .range(offset, offset + PAGE_SIZE - 1)
-            .execute()
-        ).data or []
-        for r in rows:
-            genres = r.get("genres") or []
-            if not genres:
-                empty.append(r)
-        if len(rows) < PAGE_SIZE:
-            break
-        offset += PAGE_SIZE
-    return empty
-
-
-def fetch_lastfm_tags(artist_name: str) -> Optional[List[str]]:
-    try:
-        resp = requests.get(LASTFM_URL, params={
-            "method": "artist.getTopTags",
-            "artist": artist_name,
-            "api_key": settings.lastfm_api_key,
-            "format": "json",
-            "autocorrect": 1,
-        }, timeout=5)
-        data = resp.json()
-
-        tags = data.get("toptags", {}).get("tag", [])
-        genres = []
-        for tag in tags:
-            name = tag.get("name", "").strip().lower()
-            count = int(tag.get("count", 0))
-            if count >= MIN_TAG_COUNT and name not in NON_GENRE_TAGS and len(name) > 1:
-                genres.append(name)
-        return genres or None
-    except Exception as e:
-        print(f"  Last.fm error for {artist_name!r}: {e}")
-        return None
+    """Return all artist_genres rows with empty genres."""
+    return list(scan("artist_genres", "artist_name", where=lambda q: q.eq("genres", "{}")))
 
 
 def main() -> None:
+    parser = argparse.ArgumentParser(description="Fill empty artist genres from Last.fm tags")
+    parser.add_argument("--refresh-cache", action="store_true", help="Re-fetch artists already in the local cache")
+    args = parser.parse_args()
+
     if not settings.lastfm_api_key:
         sys.exit("LASTFM_API_KEY not set in .env")
 
@@ -99,27 +50,12 @@ def main() -> None:
         print("Nothing to do.")
         return
 
-    updated = 0
-    still_empty = 0
-
-    for i, row in enumerate(artists, start=1):
-        name = row["artist_name"]
-        genres = fetch_lastfm_tags(name)
-
-        if genres:
-            supabase.table("artist_genres").update(
-                {"genres": genres}
-            ).eq("artist_name", name).execute()
-            updated += 1
-        else:
-            still_empty += 1
-
-        if i % 50 == 0 or i == total:
-            print(f"  {i:,}/{total:,} — {name!r} → {genres or []}")
+    genres_by_name = lookup_genres([row["artist_name"] for row in artists], refresh_cache=args.refresh_cache)
 
-        time.sleep(SLEEP_SECS)
+    print("\nUpserting into artist_genres...")
+    updated = save_lastfm_genres(genres_by_name)
 
-    print(f"\nDone. {updated:,} artists filled in, {still_empty:,} still empty.")
+    print(f"\nDone. {updated:,} artists filled in, {total - updated:,} still empty.")
 
 
 if __name__ == "__main__":
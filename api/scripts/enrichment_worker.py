@@ -0,0 +1,166 @@
+"""
+Long-running genre enrichment worker for all users.
+
+Each cycle drains three global queues (migration 012), deduped in the
+database so an artist shared by many users is only fetched once:
+  1. tracks   — track ids imported by any user with no known artist yet
+  2. artists  — primary artists without Spotify genres in artist_genres
+  3. lastfm   — artists whose Spotify genres came back empty
+then strips non-genre tags from whatever changed (incremental clean). The
+shared genres data version is bumped once per cycle, and only when the cycle
+wrote something, rather than by every batch.
+
+Queue depth and per-stage throughput are printed every cycle. Items that keep
+failing are skipped for RETRY_FAILED_SECS instead of blocking their queue.
+When every queue is empty the worker sleeps --poll-secs. Run one instance.
+
+Usage:
+    cd api
+    python3 scripts/enrichment_worker.py [--once] [--poll-secs 60]
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import spotipy  # noqa: E402
+
+from app import cache  # noqa: E402
+from app.cache import TTLCache  # noqa: E402
+from app.config import settings  # noqa: E402
+from app.database import supabase  # noqa: E402
+from app.enrichment.lastfm import lookup_genres, save_lastfm_genres  # noqa: E402
+from app.enrichment.spotify import (  # noqa: E402
+    REQUESTS_PER_SEC,
+    WORKERS,
+    fetch_genre_map,
+    make_client,
+    resolve_track_artists,
+    upsert_artist_genres,
+)
+from app.enrichment.tags import clean_genre_tags  # noqa: E402
+from app.ratelimit import TokenBucket  # noqa: E402
+
+TRACK_CHUNK = 2_000
+ARTIST_CHUNK = 1_000
+LASTFM_CHUNK = 250
+POLL_SECS = 60
+RETRY_FAILED_SECS = 3600
+
+STAGES = ("tracks", "artists", "lastfm")
+_failed = {stage: TTLCache(maxsize=100_000, ttl=RETRY_FAILED_SECS) for stage in STAGES}
+
+
+def _skip(stage: str, items: List[str]) -> None:
+    for item in items:
+        _failed[stage].set(item, True)
+
+
+def queue_depth() -> Dict[str, int]:
+    return supabase.rpc("enrichment_queue_depth", {}).execute().data or {}
+
+
+def run_tracks(sp: spotipy.Spotify, limiter: TokenBucket) -> int:
+    track_ids = supabase.rpc("pending_track_ids", {
+        "p_limit": TRACK_CHUNK,
+        "p_exclude": _failed["tracks"].keys(),
+    }).execute().data or []
+    if not track_ids:
+        return 0
+    resolved = set(resolve_track_artists(sp, track_ids, limiter, WORKERS))
+    _skip("tracks", [t for t in track_ids if t not in resolved])
+    return len(resolved)
+
+
+def run_artists(sp: spotipy.Spotify, limiter: TokenBucket) -> int:
+    rows = supabase.rpc("unenriched_artists", {
+        "p_limit": ARTIST_CHUNK,
+        "p_exclude": _failed["artists"].keys(),
+    }).execute().data or []
+    if not rows:
+        return 0
+    artists = [(r["spotify_artist_id"], r["artist_name"]) for r in rows]
+    genre_map = fetch_genre_map(sp, [aid for aid, _ in artists], limiter, WORKERS)
+    _skip("artists", [aid for aid, _ in artists if aid not in genre_map])
+    upsert_artist_genres(artists, genre_map, bump=False)
+    return len(genre_map)
+
+
+def run_lastfm() -> int:
+    if not settings.lastfm_api_key:
+        return 0
+    names = supabase.rpc("pending_lastfm_artists", {
+        "p_limit": LASTFM_CHUNK,
+        "p_exclude": _failed["lastfm"].keys(),
+    }).execute().data or []
+    if not names:
+        return 0
+    genres_by_name = lookup_genres(names)
+    _skip("lastfm", [n for n in names if n not in genres_by_name])
+    save_lastfm_genres(genres_by_name, bump=False)
+    return len(genres_by_name)
+
+
+def run_cycle(sp: spotipy.Spotify, limiter: TokenBucket) -> int:
+    """Run every stage once and print a status line. Returns items processed."""
+    depth = queue_depth()
+    processed: Dict[str, int] = {}
+    rates: Dict[str, float] = {}
+
+    for stage, run in (
+        ("tracks", lambda: run_tracks(sp, limiter)),
+        ("artists", lambda: run_artists(sp, limiter)),
+        ("lastfm", run_lastfm),
+    ):
+        started = time.monotonic()
+        try:
+            processed[stage] = run()
+        except Exception as e:
+            print(f"  {stage} stage error: {e}")
+            processed[stage] = 0
+        rates[stage] = processed[stage] / max(time.monotonic() - started, 1e-9)
+
+    cleaned = emptied = 0
+    if processed["artists"] or processed["lastfm"]:
+        try:
+            result = clean_genre_tags(bump=False)
+            cleaned, emptied = result.get("cleaned", 0), result.get("emptied", 0)
+        except Exception as e:
+            print(f"  clean stage error: {e}")
+
+    if any(processed.values()) or cleaned or emptied:
+        cache.bump([cache.DATA_GENRES])
+
+    queues = " ".join(f"{stage}={depth.get(stage, 0):,}" for stage in STAGES)
+    done = " ".join(f"{stage} {processed[stage]:,} ({rates[stage]:.1f}/s)" for stage in STAGES)
+    print(f"[{datetime.now():%Y-%m-%d %H:%M:%S}] queue {queues} | done {done} | cleaned {cleaned:,}")
+    return sum(processed.values())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Continuously enrich artist genres for all users")
+    parser.add_argument("--once", action="store_true", help="Drain the queues once and exit")
+    parser.add_argument("--poll-secs", type=float, default=POLL_SECS, help="Sleep between cycles when idle")
+    args = parser.parse_args()
+
+    sp = make_client()
+    limiter = TokenBucket(rate=REQUESTS_PER_SEC)
+
+    try:
+        while True:
+            if run_cycle(sp, limiter):
+                continue
+            if args.once:
+                break
+            time.sleep(args.poll_secs)
+    except KeyboardInterrupt:
+        print("\nStopped.")
+
+
+if __name__ == "__main__":
+    main()
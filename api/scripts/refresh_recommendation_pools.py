@@ -0,0 +1,77 @@
+"""
+Rebuild every user's recommendation candidate pool.
+
+Meant to run on a schedule (e.g. nightly after build_item_similarity.py) so
+pools pick up new co-listening data even for users who haven't synced.
+Users whose pool was built within --max-age-hours are skipped.
+
+Usage:
+    cd api
+    python3 scripts/refresh_recommendation_pools.py [--max-age-hours 24] [--user-id UUID]
+"""
+
+import argparse
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.auth.spotify import get_spotify_client_for_user  # noqa: E402
+from app.database import supabase  # noqa: E402
+from app.recommendations.service import refresh_candidate_pool  # noqa: E402
+
+
+def get_users(user_id: Optional[str]) -> List[dict]:
+    query = supabase.table("users").select("id, display_name, refresh_token")
+    if user_id:
+        query = query.eq("id", user_id)
+    return query.execute().data or []
+
+
+def pool_is_fresh(user_id: str, max_age: timedelta) -> bool:
+    rows = (
+        supabase.table("recommendation_pool")
+        .select("created_at")
+        .eq("user_id", user_id)
+        .is_("dismissed_at", "null")
+        .order("created_at", desc=True)
+        .limit(1)
+        .execute()
+    ).data or []
+    if not rows:
+        return False
+    created = datetime.fromisoformat(rows[0]["created_at"].replace("Z", "+00:00"))
+    return datetime.now(tz=timezone.utc) - created < max_age
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Refresh recommendation candidate pools")
+    parser.add_argument("--max-age-hours", type=float, default=24, help="Skip pools newer than this")
+    parser.add_argument("--user-id", default=None, help="Only refresh this user")
+    args = parser.parse_args()
+
+    users = get_users(args.user_id)
+    max_age = timedelta(hours=args.max_age_hours)
+    print(f"{len(users):,} users\n")
+
+    refreshed = skipped = failed = 0
+    for user in users:
+        if not args.user_id and pool_is_fresh(user["id"], max_age):
+            skipped += 1
+            continue
+        try:
+            sp = get_spotify_client_for_user(user)
+            pooled = refresh_candidate_pool(sp, user["id"], force=True)
+            print(f"  {user['id']}  {user.get('display_name', '')}: {pooled} candidates")
+            refreshed += 1
+        except Exception as e:
+            print(f"  {user['id']}: refresh failed — {e}")
+            failed += 1
+
+    print(f"\nDone. {refreshed:,} refreshed, {skipped:,} fresh, {failed:,} failed.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,13 @@
 -- Run this once in the Supabase SQL editor (replace if already created).
+-- Requires migrations 004 (genre_families), 005 and 006 (artist_listening_daily
+-- keyed by the integer artist_key from artist_identities).
 -- Returns artists the user has genuinely listened to in the given window.
 -- p_min_total_ms filters out artists below a cumulative listen-time threshold.
+-- families[i] is the genre_families classification of genres[i] (NULL if not
+-- classified yet — the API falls back to classifying it in-process).
+--
+-- Reads the per-day rollup, so cost scales with distinct (artist, day) pairs
+-- rather than plays. p_start_date is applied at day granularity (UTC).
 
 CREATE OR REPLACE FUNCTION get_map_artists(
     p_user_id        UUID,
@@ -11,23 +18,43 @@ RETURNS TABLE (
     artist_name     TEXT,
     total_ms_played BIGINT,
     play_count      BIGINT,
-    genres          TEXT[]
+    genres          TEXT[],
+    families        TEXT[]
 )
 LANGUAGE sql
+STABLE
 SECURITY DEFINER
 AS $$
+    WITH listened AS (
+        SELECT
+            d.artist_key,
+            SUM(d.total_ms)::BIGINT   AS total_ms_played,
+            SUM(d.play_count)::BIGINT AS play_count
+        FROM artist_listening_daily d
+        WHERE d.user_id = p_user_id
+          AND (p_start_date IS NULL OR d.day >= (p_start_date AT TIME ZONE 'UTC')::date)
+        GROUP BY d.artist_key
+        HAVING SUM(d.total_ms) >= p_min_total_ms
+    )
     SELECT
-        sh.artist_name,
-        SUM(sh.ms_played)::BIGINT            AS total_ms_played,
-        COUNT(*)::BIGINT                      AS play_count,
-        COALESCE(ag.genres, ARRAY[]::TEXT[]) AS genres
-    FROM streaming_history sh
-    LEFT JOIN artist_genres ag
-           ON LOWER(ag.artist_name) = LOWER(sh.artist_name)
-    WHERE sh.user_id = p_user_id
-      AND (p_start_date IS NULL OR sh.played_at >= p_start_date)
-      AND sh.ms_played >= 30000
-    GROUP BY sh.artist_name, ag.genres
-    HAVING SUM(sh.ms_played) >= p_min_total_ms
-    ORDER BY SUM(sh.ms_played) DESC;
+        ai.display_name                       AS artist_name,
+        l.total_ms_played,
+        l.play_count,
+        COALESCE(ag.genres, ARRAY[]::TEXT[]) AS genres,
+        ARRAY(
+            SELECT gf.family
+            FROM unnest(COALESCE(ag.genres, ARRAY[]::TEXT[])) WITH ORDINALITY AS u(genre, ord)
+            LEFT JOIN genre_families gf ON gf.genre = LOWER(u.genre)
+            ORDER BY u.ord
+        )                                     AS families
+    FROM listened l
+    JOIN artist_identities ai ON ai.artist_key = l.artist_key
+    LEFT JOIN LATERAL (
+        SELECT a.genres
+        FROM artist_genres a
+        WHERE a.artist_key = l.artist_key
+        ORDER BY cardinality(a.genres) DESC
+        LIMIT 1
+    ) ag ON TRUE
+    ORDER BY l.total_ms_played DESC;
 $$;
@@ -34,14 +34,14 @@ function LoadingSkeleton() {
 }
 
 function GenreView({ range }: { range: TimeRange }) {
-  const { data, isLoading, error } = useGenreMap(range)
+  const { data, isLoading, isExpanding, error } = useGenreMap(range)
   const { tracks } = useTracks(range)
   const { data: yearly } = useHistoryYearly()
   const { data: historyTopTracks } = useHistoryTopTracks(undefined, 100)
 
   if (isLoading) return <LoadingSkeleton />
 
-  if (error || !data || (!data.genre_nodes.length && !data.artist_nodes.length)) {
+  if (error || !data || !data.parent_nodes.length) {
     return (
       <div className="text-center py-20">
         <p className="text-muted text-sm mb-4">Sync your tracks first to see your music map.</p>
@@ -52,7 +52,14 @@ function GenreView({ range }: { range: TimeRange }) {
     )
   }
 
-  return <GenreMap data={data} tracks={tracks ?? []} historyTopTracks={historyTopTracks ?? []} yearly={yearly ?? []} />
+  return (
+    <div className="relative h-full">
+      <GenreMap data={data} tracks={tracks ?? []} historyTopTracks={historyTopTracks ?? []} yearly={yearly ?? []} />
+      {isExpanding && (
+        <p className="absolute top-3 left-3 text-muted text-xs pointer-events-none">Loading subgenres...</p>
+      )}
+    </div>
+  )
 }
 
 function ArtistView({ range }: { range: TimeRange }) {
@@ -1,8 +1,15 @@
 'use client'
 
-import { useRecommendations } from '@/hooks/useRecommendations'
+import { useState } from 'react'
+import { useRecommendationPool, useRecommendations } from '@/hooks/useRecommendations'
 import { RecommendationCard } from '@/components/recommendations/RecommendationCard'
 import { Skeleton } from '@/components/ui/Skeleton'
+import { Button } from '@/components/ui/Button'
+import { api } from '@/lib/api'
+import type { RecommendationPage } from '@/lib/types'
+
+// The pool is rebuilt in the background; look again after this long.
+const REFRESH_RECHECK_MS = 15_000
 
 function SkeletonCards() {
   return (
@@ -19,7 +26,37 @@ function SkeletonCards() {
 }
 
 export default function RecommendationsPage() {
-  const { recommendations, isLoading, error } = useRecommendations()
+  const pool = useRecommendationPool()
+  // Without a pool yet, fall back to live recommendations (which also start building one)
+  const poolEmpty = pool.items?.length === 0 || !!pool.error
+  const live = useRecommendations(poolEmpty)
+  const [isRefreshing, setIsRefreshing] = useState(false)
+
+  const recommendations = poolEmpty ? live.recommendations : pool.items
+  const isLoading = pool.isLoading || (poolEmpty && live.isLoading)
+  const error = poolEmpty ? live.error : undefined
+
+  async function handleDismiss(spotifyTrackId: string) {
+    const without = (pages?: RecommendationPage[]) =>
+      pages?.map((page) => ({ ...page, items: page.items.filter((i) => i.spotify_track_id !== spotifyTrackId) }))
+    await pool.mutate(without, { revalidate: false })
+    try {
+      await api.dismissRecommendation(spotifyTrackId)
+    } catch {
+      await pool.mutate()
+    }
+  }
+
+  async function handleRefresh() {
+    setIsRefreshing(true)
+    try {
+      await api.refreshRecommendations()
+      await new Promise((resolve) => setTimeout(resolve, REFRESH_RECHECK_MS))
+      await pool.mutate()
+    } finally {
+      setIsRefreshing(false)
+    }
+  }
 
   const noNewTracks =
     error?.message?.includes('no_new_tracks') ||
@@ -27,11 +64,23 @@ export default function RecommendationsPage() {
 
   return (
     <div>
-      <div className="mb-8">
-        <h1 className="font-syne font-bold text-2xl text-primary">For You</h1>
-        <p className="text-muted text-sm mt-1">
-          New tracks seeded from your listening history — nothing you&apos;ve heard before.
-        </p>
+      <div className="flex items-center justify-between mb-8">
+        <div>
+          <h1 className="font-syne font-bold text-2xl text-primary">For You</h1>
+          <p className="text-muted text-sm mt-1">
+            New tracks seeded from your listening history — nothing you&apos;ve heard before.
+          </p>
+        </div>
+        <Button onClick={handleRefresh} disabled={isRefreshing} variant="ghost" size="sm">
+          {isRefreshing ? (
+            <span className="flex items-center gap-2">
+              <span className="w-3 h-3 border border-muted border-t-transparent rounded-full animate-spin" />
+              Refreshing
+            </span>
+          ) : (
+            '↻ New picks'
+          )}
+        </Button>
       </div>
 
       {isLoading && <SkeletonCards />}
@@ -52,9 +101,23 @@ export default function RecommendationsPage() {
 
       {recommendations && recommendations.length > 0 && (
         <div className="grid grid-cols-1 sm:grid-cols-2 gap-4">
-          {recommendations.map((rec, i) => (
-            <RecommendationCard key={i} rec={rec} />
-          ))}
+          {poolEmpty
+            ? recommendations.map((rec, i) => <RecommendationCard key={i} rec={rec} />)
+            : pool.items?.map((rec) => (
+                <RecommendationCard
+                  key={rec.spotify_track_id}
+                  rec={rec}
+                  onDismiss={() => handleDismiss(rec.spotify_track_id)}
+                />
+              ))}
+        </div>
+      )}
+
+      {!poolEmpty && pool.hasMore && (
+        <div className="flex justify-center mt-8">
+          <Button onClick={pool.loadMore} disabled={pool.isLoadingMore} variant="outline" size="sm">
+            {pool.isLoadingMore ? 'Loading...' : 'Show more'}
+          </Button>
         </div>
       )}
     </div>
@@ -21,6 +21,7 @@ interface SimNode extends d3.SimulationNodeDatum {
 interface SimLink extends d3.SimulationLinkDatum<SimNode> {
   shared_genres: string[]
   n: number
+  score: number
 }
 
 const PALETTE = [
@@ -79,10 +80,19 @@ export function ArtistWeb({ data }: Props) {
       image_url: a.image_url,
     }))
 
-    // Spread in a circle so nodes don't all start at (0,0) and repel to infinity.
+    // Server-side layout gives normalized [-1, 1] coordinates — scale them to the
+    // viewport and let the simulation only settle. Otherwise spread in a circle
+    // so nodes don't all start at (0,0) and repel to infinity.
+    const hasLayout = data.artist_nodes.every((a) => a.x !== undefined && a.y !== undefined)
     nodes.forEach((node, i) => {
-      const angle = (i / nodes.length) * 2 * Math.PI
       const r = Math.min(width, height) * 0.3
+      if (hasLayout) {
+        const a = data.artist_nodes[i]
+        node.x = width / 2 + (a.x ?? 0) * r
+        node.y = height / 2 + (a.y ?? 0) * r
+        return
+      }
+      const angle = (i / nodes.length) * 2 * Math.PI
       node.x = width / 2 + Math.cos(angle) * r
       node.y = height / 2 + Math.sin(angle) * r
     })
@@ -92,6 +102,7 @@ export function ArtistWeb({ data }: Props) {
       target: l.target,
       shared_genres: l.shared_genres,
       n: l.n,
+      score: l.score,
     }))
 
     const connected = new Map<string, Set<string>>()
@@ -188,13 +199,14 @@ export function ArtistWeb({ data }: Props) {
     })
 
     const simulation = d3.forceSimulation<SimNode>(nodes)
+      .alpha(hasLayout ? 0.3 : 1)
       .alphaDecay(0.015)
       .force(
         'link',
         d3.forceLink<SimNode, SimLink>(links)
           .id((d) => d.id)
           .distance((l) => 160 + (l.n || 1) * 20)
-          .strength(0.3),
+          .strength((l) => 0.15 + (l.score || 0) * 0.3),
       )
       .force('charge', d3.forceManyBody<SimNode>().strength(-120))
       .force('center', d3.forceCenter(width / 2, height / 2).strength(0.2))
@@ -3,6 +3,7 @@
 import { useEffect, useRef, useState, useMemo } from 'react'
 import * as d3 from 'd3'
 import { useHistoryArtistTopTracks } from '@/hooks/useHistoryData'
+import { significantFamilies } from '@/lib/genreMap'
 import type { GenreMapData, TopTrack, Track, YearStat } from '@/lib/types'
 
 interface Props {
@@ -214,31 +215,20 @@ export function GenreMap({ data, tracks = [], historyTopTracks = [], yearly = []
   // ── Memoize everything that depends only on data, not on canvas dimensions ──
   const graphData = useMemo(() => {
     const rawParentNodes = data.parent_nodes ?? []
-    if (!data.genre_nodes.length && !data.artist_nodes.length) return null
-
-    const totalParentMs = rawParentNodes.reduce((sum, p) => sum + p.total_ms, 0)
-    const maxParentMs = Math.max(...rawParentNodes.map((p) => p.total_ms), 1)
-    const significantFamilies = new Set(
-      rawParentNodes
-        .filter((p) => p.total_ms >= totalParentMs * 0.025 && p.total_ms >= maxParentMs * 0.08)
-        .map((p) => p.family),
-    )
+    // Parent nodes alone are drawn while the families' subgenres load
+    if (!rawParentNodes.length && !data.genre_nodes.length && !data.artist_nodes.length) return null
 
-    let parentNodes = rawParentNodes.filter((p) => significantFamilies.has(p.family))
-    if (!parentNodes.length) {
-      parentNodes = [...rawParentNodes].sort((a, b) => b.total_ms - a.total_ms).slice(0, 6)
-      significantFamilies.clear()
-      parentNodes.forEach((p) => significantFamilies.add(p.family))
-    }
+    const shownFamilies = significantFamilies(rawParentNodes)
+    const parentNodes = rawParentNodes.filter((p) => shownFamilies.has(p.family))
     const rawGenreFamilyMap = new Map(data.genre_nodes.map((g) => [g.id, g.family]))
     const maxGenreMsByFamily = new Map<string, number>()
     data.genre_nodes.forEach((g) => {
-      if (!significantFamilies.has(g.family)) return
+      if (!shownFamilies.has(g.family)) return
       maxGenreMsByFamily.set(g.family, Math.max(maxGenreMsByFamily.get(g.family) ?? 0, g.total_ms))
     })
     const genreNodes = data.genre_nodes.filter((g) => {
       const familyMax = maxGenreMsByFamily.get(g.family) ?? 0
-      return significantFamilies.has(g.family)
+      return shownFamilies.has(g.family)
         && !isParentEquivalentSubgenre(g.id, g.family)
         && g.total_ms >= familyMax * 0.045
     })
@@ -274,7 +264,7 @@ export function GenreMap({ data, tracks = [], historyTopTracks = [], yearly = []
     const orphanFamilyMap = new Map<string, string>()
     ;(data.parent_artist_links ?? []).forEach((l) => {
       const family = l.source.replace('parent:', '')
-      if (significantFamilies.has(family)) orphanFamilyMap.set(l.target, family)
+      if (shownFamilies.has(family)) orphanFamilyMap.set(l.target, family)
     })
 
     const artistRanks = new Map(
@@ -288,7 +278,7 @@ export function GenreMap({ data, tracks = [], historyTopTracks = [], yearly = []
       const rawFamilyCounts = new Map<string, number>()
       for (const g of (a.genres ?? [])) {
         const fam = rawGenreFamilyMap.get(g)
-        if (fam && significantFamilies.has(fam)) rawFamilyCounts.set(fam, (rawFamilyCounts.get(fam) ?? 0) + 1)
+        if (fam && shownFamilies.has(fam)) rawFamilyCounts.set(fam, (rawFamilyCounts.get(fam) ?? 0) + 1)
       }
       const fallbackFamily = Array.from(rawFamilyCounts.entries()).sort((x, y) => y[1] - x[1])[0]?.[0]
       if (!keptGenres.length && !orphanFamilyMap.has(a.id) && !fallbackFamily) return []
@@ -5,9 +5,10 @@ import type { Recommendation } from '@/lib/types'
 
 interface RecommendationCardProps {
   rec: Recommendation
+  onDismiss?: () => void
 }
 
-export function RecommendationCard({ rec }: RecommendationCardProps) {
+export function RecommendationCard({ rec, onDismiss }: RecommendationCardProps) {
   return (
     <div className="bg-surface border border-border rounded-2xl overflow-hidden group flex flex-col">
       {/* Album art */}
@@ -55,6 +56,16 @@ export function RecommendationCard({ rec }: RecommendationCardProps) {
             Open in Spotify ↗
           </a>
         )}
+
+        {onDismiss && (
+          <button
+            type="button"
+            onClick={onDismiss}
+            className={`${rec.spotify_url ? '' : 'mt-auto '}text-xs text-muted hover:text-primary transition-colors`}
+          >
+            Not for me
+          </button>
+        )}
       </div>
     </div>
   )
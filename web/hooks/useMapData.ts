@@ -1,19 +1,53 @@
 'use client'
 
+import { useMemo } from 'react'
 import useSWR from 'swr'
 import { api } from '@/lib/api'
 import { isAuthenticated } from '@/lib/auth'
-import type { ArtistMapData, GenreMapData, TimeRange } from '@/lib/types'
+import { combineFamilyDetails, significantFamilies } from '@/lib/genreMap'
+import type { ArtistMapData, GenreMapData, GenreMapFamilies, GenreMapFamilyDetail, TimeRange } from '@/lib/types'
 
-export function useGenreMap(range: TimeRange) {
-  const { data, error, isLoading } = useSWR<GenreMapData>(
-    isAuthenticated() ? ['map/genres', range] : null,
-    () => api.fetchGenreMap(range),
+export function useGenreMapFamilies(range: TimeRange) {
+  const { data, error, isLoading } = useSWR<GenreMapFamilies>(
+    isAuthenticated() ? ['map/genres/families', range] : null,
+    () => api.fetchGenreMapFamilies(range),
+    { revalidateOnFocus: false, dedupingInterval: 120_000 },
+  )
+  return { data, error, isLoading }
+}
+
+export function useGenreMapFamilyDetails(range: TimeRange, families: string[]) {
+  const { data, error, isLoading } = useSWR<GenreMapFamilyDetail[]>(
+    isAuthenticated() && families.length ? ['map/genres/families', range, ...families] : null,
+    () => Promise.all(families.map((family) => api.fetchGenreMapFamily(range, family))),
     { revalidateOnFocus: false, dedupingInterval: 120_000 },
   )
   return { data, error, isLoading }
 }
 
+// Level-of-detail genre map: the small family level paints first, then only
+// the families the map actually draws are expanded, in one round of requests.
+export function useGenreMap(range: TimeRange) {
+  const families = useGenreMapFamilies(range)
+  const expand = families.data
+    ? Array.from(significantFamilies(families.data.family_nodes)).sort()
+    : []
+  const details = useGenreMapFamilyDetails(range, expand)
+
+  // Memoized: GenreMap restarts its simulation whenever `data` changes identity
+  const data = useMemo<GenreMapData | undefined>(
+    () => families.data && combineFamilyDetails(families.data, details.data ?? []),
+    [families.data, details.data],
+  )
+  return {
+    data,
+    // A failed expansion still leaves the family level to show
+    error: families.error,
+    isLoading: families.isLoading,
+    isExpanding: details.isLoading,
+  }
+}
+
 export function useArtistMap(range: TimeRange) {
   const { data, error, isLoading } = useSWR<ArtistMapData>(
     isAuthenticated() ? ['map/artists', range] : null,
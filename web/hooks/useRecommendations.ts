@@ -1,15 +1,33 @@
 'use client'
 
 import useSWR from 'swr'
+import useSWRInfinite from 'swr/infinite'
 import { api } from '@/lib/api'
 import { isAuthenticated } from '@/lib/auth'
-import type { Recommendation } from '@/lib/types'
+import type { Recommendation, RecommendationPage } from '@/lib/types'
 
-export function useRecommendations() {
+export function useRecommendations(enabled = true) {
   const { data, error, isLoading, mutate } = useSWR<Recommendation[]>(
-    isAuthenticated() ? 'recommendations' : null,
+    isAuthenticated() && enabled ? 'recommendations' : null,
     () => api.getRecommendations(),
     { revalidateOnFocus: false, dedupingInterval: 300_000 },
   )
   return { recommendations: data, error, isLoading, mutate }
 }
+
+// Pages through the precomputed candidate pool with the API's rank cursor.
+export function useRecommendationPool() {
+  const { data, error, isLoading, isValidating, size, setSize, mutate } = useSWRInfinite<RecommendationPage>(
+    (_pageIndex, previous: RecommendationPage | null) => {
+      if (!isAuthenticated()) return null
+      if (previous && previous.next_cursor === null) return null
+      return ['recommendations/pool', previous?.next_cursor ?? 0]
+    },
+    (key) => api.getRecommendationPool((key as [string, number])[1]),
+    { revalidateOnFocus: false, revalidateFirstPage: false },
+  )
+  const items = data?.flatMap((page) => page.items)
+  const hasMore = !!data && data.length > 0 && data[data.length - 1].next_cursor !== null
+  const isLoadingMore = isValidating && !!data && size > data.length
+  return { items, error, isLoading, isLoadingMore, hasMore, loadMore: () => setSize(size + 1), mutate }
+}
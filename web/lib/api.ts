@@ -1,5 +1,5 @@
 import { clearToken, getToken } from '@/lib/auth'
-import type { Artist, ArtistMapData, Genre, GenreMapData, HistoryPatterns, HistoryStats, HeatmapDay, ImportResult, ImportStatus, Recommendation, StreamingHistoryItem, SyncResult, TimeRange, TopArtist, TopTrack, Track, User, YearStat } from '@/lib/types'
+import type { Artist, ArtistMapData, Genre, GenreMapFamilies, GenreMapFamilyDetail, HistoryPatterns, HistoryStats, HeatmapDay, ImportResult, ImportStatus, Recommendation, RecommendationPage, StreamingHistoryItem, SyncResult, TimeRange, TopArtist, TopTrack, Track, User, YearStat } from '@/lib/types'
 
 const BASE_URL = process.env.NEXT_PUBLIC_API_URL ?? 'http://localhost:8000/api/v1'
 
@@ -45,6 +45,15 @@ export const api = {
   getRecommendations: () =>
     request<Recommendation[]>('/recommendations/'),
 
+  getRecommendationPool: (cursor = 0, limit = 20) =>
+    request<RecommendationPage>(`/recommendations/pool?cursor=${cursor}&limit=${limit}`),
+
+  refreshRecommendations: () =>
+    request<{ status: string }>('/recommendations/refresh', { method: 'POST' }),
+
+  dismissRecommendation: (spotifyTrackId: string) =>
+    request<{ dismissed: string }>(`/recommendations/${spotifyTrackId}/dismiss`, { method: 'POST' }),
+
   syncArtists: (range: TimeRange) =>
     request<SyncResult>(`/artists/sync?range=${range}`, { method: 'POST' }),
 
@@ -60,11 +69,14 @@ export const api = {
   getImportStatus: () =>
     request<ImportStatus | null>('/import/status'),
 
-  fetchGenreMap: (range: TimeRange) =>
-    request<GenreMapData>(`/map/genres?range=${range}`),
+  fetchGenreMapFamilies: (range: TimeRange) =>
+    request<GenreMapFamilies>(`/map/genres/families?range=${range}`),
+
+  fetchGenreMapFamily: (range: TimeRange, family: string) =>
+    request<GenreMapFamilyDetail>(`/map/genres/families/${encodeURIComponent(family)}?range=${range}`),
 
   fetchArtistMap: (range: TimeRange) =>
-    request<ArtistMapData>(`/map/artists?range=${range}`),
+    request<ArtistMapData>(`/map/artists?range=${range}&layout=true`),
 
   getHistoryStats: () =>
     request<HistoryStats>('/history/stats'),
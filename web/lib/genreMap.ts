@@ -0,0 +1,38 @@
+import type { GenreMapData, GenreMapFamilies, GenreMapFamilyDetail, ParentGenreNode } from '@/lib/types'
+
+// Families the genre map draws: at least 2.5% of all listening and 8% of the
+// biggest family, or the top 6 when none qualify.
+export function significantFamilies(parentNodes: ParentGenreNode[]): Set<string> {
+  const totalMs = parentNodes.reduce((sum, p) => sum + p.total_ms, 0)
+  const maxMs = Math.max(...parentNodes.map((p) => p.total_ms), 1)
+  const families = new Set(
+    parentNodes
+      .filter((p) => p.total_ms >= totalMs * 0.025 && p.total_ms >= maxMs * 0.08)
+      .map((p) => p.family),
+  )
+  if (families.size) return families
+  return new Set(
+    [...parentNodes].sort((a, b) => b.total_ms - a.total_ms).slice(0, 6).map((p) => p.family),
+  )
+}
+
+function uniqueBy<T>(items: T[], key: (item: T) => string): T[] {
+  const seen = new Map<string, T>()
+  items.forEach((item) => { if (!seen.has(key(item))) seen.set(key(item), item) })
+  return Array.from(seen.values())
+}
+
+// Assemble the genre map from the family level plus the families expanded so
+// far. Artists listed under several families appear once.
+export function combineFamilyDetails(families: GenreMapFamilies, details: GenreMapFamilyDetail[]): GenreMapData {
+  const link = (l: { source: string; target: string }) => `${l.source}→${l.target}`
+  return {
+    parent_nodes: families.family_nodes,
+    genre_nodes: details.flatMap((d) => d.genre_nodes),
+    artist_nodes: uniqueBy(details.flatMap((d) => d.artist_nodes), (a) => a.id),
+    parent_genre_links: details.flatMap((d) => d.parent_genre_links),
+    genre_artist_links: uniqueBy(details.flatMap((d) => d.genre_artist_links), link),
+    parent_artist_links: details.flatMap((d) => d.parent_artist_links),
+    genre_affinity_links: details.flatMap((d) => d.genre_affinity_links),
+  }
+}
@@ -68,6 +68,16 @@ export interface Recommendation {
   popularity: number | null
 }
 
+export interface PooledRecommendation extends Recommendation {
+  spotify_track_id: string
+  source: 'co_listening' | 'related_artists'
+}
+
+export interface RecommendationPage {
+  items: PooledRecommendation[]
+  next_cursor: number | null
+}
+
 export interface SyncResult {
   synced: number
   time_range: string
@@ -95,6 +105,8 @@ export interface ArtistMapNode {
   play_count?: number
   total_ms?: number
   genres: string[]
+  x?: number
+  y?: number
 }
 
 export interface TrackNode {
@@ -102,6 +114,13 @@ export interface TrackNode {
   label: string
   album_art_url: string | null
   artist_id: string
+  x?: number
+  y?: number
+}
+
+export interface MapLayout {
+  hash: string
+  cached: boolean
 }
 
 export interface GenreMapData {
@@ -112,12 +131,34 @@ export interface GenreMapData {
   genre_artist_links: { source: string; target: string }[]
   parent_artist_links: { source: string; target: string }[]
   genre_affinity_links: { source: string; target: string; shared: number }[]
+  layout?: MapLayout
+}
+
+export interface GenreFamilyNode extends ParentGenreNode {
+  subgenre_count: number
+  artist_count: number
+}
+
+export interface GenreMapFamilies {
+  family_nodes: GenreFamilyNode[]
+  family_links: { source: string; target: string; shared: number }[]
+}
+
+export interface GenreMapFamilyDetail {
+  parent_node: ParentGenreNode
+  genre_nodes: GenreNode[]
+  artist_nodes: ArtistMapNode[]
+  parent_genre_links: { source: string; target: string }[]
+  genre_artist_links: { source: string; target: string }[]
+  parent_artist_links: { source: string; target: string }[]
+  genre_affinity_links: { source: string; target: string; shared: number }[]
 }
 
 export interface ArtistMapData {
   artist_nodes: ArtistMapNode[]
   track_nodes: TrackNode[]
-  artist_links: { source: string; target: string; shared_genres: string[]; n: number }[]
+  artist_links: { source: string; target: string; shared_genres: string[]; n: number; score: number }[]
+  layout?: MapLayout
 }
 
 export interface HistoryStats {